@@ -1,99 +1,188 @@
 import streamlit as st
 import tempfile
 import os
-import pandas as pd
 import time
 import json
+import uuid
+from src.core import resources
 from src.core.prompts import system_prompt
-from src.agents.workflow import AppReact
-from src.core.database import Database
-from src.file_processor.excel_processor import ExcelProcessor
-from src.generator.app_generator import AppGenerator
-from dynaconf import Dynaconf
+from src.core.tracing import span
 
 # Page config
 st.set_page_config(page_title="Excel Query Bot", page_icon="📊", layout="wide")
 
 # Initialize session state
+st.session_state.setdefault('session_id', uuid.uuid4().hex)
 st.session_state.setdefault('db', None)
+st.session_state.setdefault('tables', [])
+st.session_state.setdefault('sources', {})
 st.session_state.setdefault('agent_workflow', None)
 st.session_state.setdefault('file_processed', False)
+st.session_state.setdefault('optimizer', None)
+st.session_state.setdefault('schema_renderer', None)
 
 # Title
 st.title("Excel Query Bot")
 
 # Sidebar with file upload
 with st.sidebar:
-    uploaded_file = st.file_uploader("Upload Excel file", type=['xlsx', 'xls'])
+    uploaded_files = st.file_uploader("Upload Excel files", type=['xlsx', 'xls'], accept_multiple_files=True)
+    key_columns_text = st.text_input(
+        "Key columns (optional)",
+        help="Comma-separated columns identifying a row, used to report updated rows when a file is uploaded again.",
+    )
     
     if st.session_state.file_processed:
         st.success("✅ File processed successfully!")
         if st.button("Upload New File"):
-            # Reset everything for new file
+            # Reset everything for new file; sources are kept so a new version
+            # of the same file is loaded as a delta
+            resources.get_table_registry(st.session_state.cfg).release(st.session_state.session_id, st.session_state.tables)
             st.session_state.db = None
+            st.session_state.tables = []
             st.session_state.agent_workflow = None
             st.session_state.file_processed = False
+            st.session_state.optimizer = None
+            st.session_state.schema_renderer = None
             st.rerun()
 
+        if st.session_state.optimizer and st.session_state.optimizer.indexes:
+            with st.expander("Index report"):
+                import pandas as pd
+                
+                st.dataframe(pd.DataFrame(st.session_state.optimizer.report()), use_container_width=True)
+
 # Process uploaded file with progress bar
-if uploaded_file and not st.session_state.file_processed:
+if uploaded_files and not st.session_state.file_processed:
     # Create progress bar
     progress_bar = st.progress(0)
     status_text = st.empty()
     
+    temp_paths = []
     try:
         # Step 1: Save file
         status_text.text("📁 Saving uploaded file...")
-        progress_bar.progress(10)
-        time.sleep(0.5)
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            temp_path = tmp_file.name
         
-        # Step 2: Load configuration
-        status_text.text("⚙️ Loading configuration...")
-        progress_bar.progress(25)
-        time.sleep(0.5)
+        for uploaded_file in uploaded_files:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_file.name)[1] or '.xlsx') as tmp_file:
+                tmp_file.write(uploaded_file.getvalue())
+                temp_paths.append(tmp_file.name)
         
-        cfg = Dynaconf(settings_files=[
-            "config/config.toml",
-            "config/.secrets.toml"
-        ])
+        progress_bar.progress(5)
         
-        # Step 3: Initialize components
+        # Step 2: Initialize components
         status_text.text("🔧 Initializing components...")
-        progress_bar.progress(45)
-        time.sleep(0.5)
         
-        db = Database(cfg)
-        generator = AppGenerator(cfg)
-        file_processor = ExcelProcessor(db, cfg)
+        cfg = resources.get_config()
+        resources.get_tracer(cfg)
+        from src.file_processor.excel_processor import ExcelProcessor
+        from src.file_processor.workbook_cache import WorkbookCache
         
-        # Step 4: Process Excel
-        status_text.text("📊 Processing Excel data...")
-        progress_bar.progress(70)
-        time.sleep(1)
+        db = resources.get_database(cfg)
+        file_processor = ExcelProcessor(db, cfg)
+        registry = resources.get_table_registry(cfg)
+        registry.reserve()
+        # Each workbook gets its own tables, named after its content
+        table_prefixes = [registry.table_name(WorkbookCache.content_hash(temp_path)) for temp_path in temp_paths]
+        # Lease the tables before loading them, so tables left by a failed load are still collected
+        registry.acquire(st.session_state.session_id, table_prefixes)
+        # A single file replacing an earlier upload of the same name is diffed against its table
+        base_table = st.session_state.sources.get(uploaded_files[0].name) if len(temp_paths) == 1 else None
+        if base_table == table_prefixes[0]:
+            base_table = None
+        key_columns = ExcelProcessor.clean_column_names(
+            name for name in key_columns_text.split(",") if name.strip()
+        ) or None
         
-        file_processor.process_excel(temp_path)
-        os.unlink(temp_path)
+        with span("upload", files=len(temp_paths)):
+            # Step 3: Process Excel
+            status_text.text("📊 Processing Excel data...")
+            progress_bar.progress(10)
+            
+            with registry.ingest_lock(table_prefixes + ([base_table] if base_table else [])):
+                if len(temp_paths) > 1 or cfg.get("INGEST", {}).get("ALL_SHEETS", False):
+                    def report_table(table_name, tables_done, tables_total):
+                        progress_bar.progress(10 + int(60 * tables_done / tables_total))
+                        status_text.text(f"📊 Processing Excel data... {tables_done}/{tables_total} sheets ({table_name})")
+
+                    row_counts = file_processor.process_workbooks(
+                        temp_paths,
+                        source_names=[uploaded_file.name for uploaded_file in uploaded_files],
+                        progress_callback=report_table,
+                        table_prefixes=table_prefixes,
+                    )
+                    session_tables = list(row_counts)
+                    loaded_tables = [table_name for table_name, rows in row_counts.items() if rows is not None]
+                else:
+                    def report_chunk(chunk_number, rows_written):
+                        # The total row count is unknown while streaming, so the bar
+                        # approaches the end of this step without reaching it.
+                        progress_bar.progress(10 + int(60 * chunk_number / (chunk_number + 1)))
+                        status_text.text(f"📊 Processing Excel data... chunk {chunk_number} ({rows_written:,} rows)")
+
+                    # Tables other sessions still query are never changed in place
+                    if base_table and registry.exclusive(st.session_state.session_id, base_table):
+                        registry.detach(base_table)
+                    else:
+                        base_table = None
+                    rows_loaded = file_processor.process_excel_cached(
+                        temp_paths[0],
+                        streaming=cfg.get("INGEST", {}).get("STREAMING", True),
+                        progress_callback=report_chunk,
+                        table_name=table_prefixes[0],
+                        base_table=base_table,
+                        key_columns=key_columns,
+                    )
+                    if base_table:
+                        # Renamed by the delta, or superseded by a full load
+                        registry.drop(base_table)
+                    st.session_state.sources[uploaded_files[0].name] = table_prefixes[0]
+                    session_tables = [table_prefixes[0]]
+                    loaded_tables = [] if rows_loaded is None else session_tables
+                registry.acquire(st.session_state.session_id, session_tables)
+            
+            progress_bar.progress(70)
+            
+            optimizer = resources.get_optimizer(cfg)
+            if optimizer:
+                status_text.text("⚡ Collecting statistics and building indexes...")
+                for table_name in loaded_tables:
+                    optimizer.optimize(table_name)
+            
+            progress_bar.progress(80)
+            
+            rollups = resources.get_rollups(cfg)
+            if rollups:
+                status_text.text("🧮 Building aggregate rollups...")
+                for table_name in loaded_tables:
+                    rollups.build(table_name)
+            
+            progress_bar.progress(88)
+            
+            schema_renderer = resources.get_schema_renderer(cfg)
+            if schema_renderer:
+                status_text.text("🔎 Profiling columns...")
+                for table_name in session_tables:
+                    schema_renderer.profile(table_name)
         
-        # Step 5: Finalize
+        # Step 4: Finalize
         status_text.text("✅ Finalizing setup...")
-        progress_bar.progress(90)
-        time.sleep(0.5)
+        progress_bar.progress(95)
         
         # Save to session
         st.session_state.db = db
-        st.session_state.agent_workflow = AppReact(generator=generator, text_db=db)
+        st.session_state.tables = session_tables
+        if cfg.get("RESULT_CACHE", {}).get("SHARED", True):
+            st.session_state.agent_workflow = resources.get_agent(cfg)
+        else:
+            from src.agents.result_cache import ResultCache
+            
+            st.session_state.agent_workflow = resources.build_agent(cfg, result_cache=ResultCache.from_config(cfg))
         st.session_state.cfg = cfg
+        st.session_state.optimizer = optimizer
+        st.session_state.schema_renderer = schema_renderer
         st.session_state.file_processed = True
         
-        # Complete
-        progress_bar.progress(100)
-        status_text.text("🎉 Excel file processed successfully!")
-        time.sleep(1)
-        
         # Clear progress indicators
         progress_bar.empty()
         status_text.empty()
@@ -105,10 +194,17 @@ if uploaded_file and not st.session_state.file_processed:
         progress_bar.empty()
         status_text.empty()
         st.error(f"Error processing file: {str(e)}")
+    finally:
+        for temp_path in temp_paths:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
 
 # Helper function to parse response output
 def parse_response_output(output):
     """Parse different types of output and convert to appropriate format"""
+    # pandas is only imported once there is a result, so the first page renders without it
+    import pandas as pd
+    
     if output is None:
         return "No data returned."
     
@@ -148,7 +244,19 @@ if st.session_state.file_processed:
         submit_button = st.form_submit_button("Submit Query")
     
     # Process query when submitted
-    if submit_button and prompt:
+    expired_tables = (
+        resources.get_table_registry(st.session_state.cfg).touch(st.session_state.session_id, st.session_state.tables)
+        if submit_button and prompt else []
+    )
+    if expired_tables:
+        # The tables were dropped after this session stayed idle past the TTL.
+        st.session_state.file_processed = False
+        st.session_state.tables = []
+        st.session_state.agent_workflow = None
+        st.warning("⚠️ Your data was removed after being idle. Please upload the file again.")
+    elif submit_button and prompt:
+        import pandas as pd
+        
         # Display the submitted question
         st.subheader("Your Question:")
         st.info(f"📝 {prompt}")
@@ -156,89 +264,119 @@ if st.session_state.file_processed:
         # Create placeholder for streaming response
         response_placeholder = st.empty()
         
-        try:
-            # Show initial processing message
-            with response_placeholder.container():
-                st.subheader("Result:")
-                with st.spinner("🤖 Processing your query..."):
-                    # Simulate streaming by showing steps
-                    step_placeholder = st.empty()
-                    
-                    step_placeholder.text("🔍 Analyzing your question...")
-                    time.sleep(0.5)
-                    
-                    step_placeholder.text("📊 Querying database...")
-                    time.sleep(0.5)
-                    
-                    step_placeholder.text("🧠 Generating response...")
-                    time.sleep(0.5)
-                    
-                    # Process the actual query
-                    db_schema = st.session_state.db.extract_schema(
-                        st.session_state.cfg.get("EXCEL_TABLE_NAME", "")
-                    )
-                    formatted_prompt = system_prompt.format(
-                        table_schema=db_schema, 
-                        user_query=prompt
-                    )
-                    response = st.session_state.agent_workflow.execute(prompt=formatted_prompt)
-                    output = response.get("output")
-                    
-                    step_placeholder.text("✨ Formatting results...")
-                    time.sleep(0.5)
-                    
-                    # Parse and prepare the output
-                    parsed_output = parse_response_output(output)
-                    
-                    step_placeholder.empty()
-            
-            # Display the final result
-            with response_placeholder.container():
-                st.subheader("Result:")
-                
-                if isinstance(parsed_output, pd.DataFrame):
-                    if len(parsed_output) > 0:
-                        # Display metrics if it's numerical data
-                        if 'total_quantity' in parsed_output.columns:
-                            col1, col2, col3 = st.columns(3)
-                            with col1:
-                                st.metric("Total Items", f"{len(parsed_output):,}")
-                            with col2:
-                                st.metric("Total Quantity", f"{parsed_output['total_quantity'].sum():,.0f}")
-                            with col3:
-                                st.metric("Avg Quantity", f"{parsed_output['total_quantity'].mean():,.1f}")
+        with span("question"):
+            try:
+                # Show initial processing message
+                with response_placeholder.container():
+                    st.subheader("Result:")
+                    with st.spinner("🤖 Processing your query..."):
+                        # Live view of the agent: streamed reasoning, chosen SQL, fetched rows
+                        step_placeholder = st.empty()
+                        thought_placeholder = st.empty()
+                        sql_placeholder = st.empty()
                         
-                        # Display the data table
-                        st.dataframe(
-                            parsed_output, 
-                            use_container_width=True,
-                            height=400
-                        )
+                        step_placeholder.text("🔍 Analyzing your question...")
                         
-                        # Add download button
-                        csv = parsed_output.to_csv(index=False)
-                        st.download_button(
-                            label="📥 Download as CSV",
-                            data=csv,
-                            file_name=f"query_result_{int(time.time())}.csv",
-                            mime="text/csv"
+                        db_schema = st.session_state.db.extract_schemas(st.session_state.tables)
+                        prompt_schema = (
+                            st.session_state.schema_renderer.render(st.session_state.tables, question=prompt)
+                            if st.session_state.schema_renderer
+                            else db_schema
                         )
-                    else:
-                        st.info("No data found matching your query.")
-                else:
-                    st.write(parsed_output)
-                
-        except Exception as e:
-            with response_placeholder.container():
-                st.subheader("Result:")
-                st.error(f"❌ Error processing query: {str(e)}")
+                        formatted_prompt = system_prompt.format(
+                            table_schema=prompt_schema, 
+                            user_query=prompt
+                        )
+                        response, tokens = {}, []
+                        for kind, payload in st.session_state.agent_workflow.stream(
+                            prompt=formatted_prompt,
+                            question=prompt,
+                            table_schema=db_schema,
+                            prompt_schema=prompt_schema,
+                            tables=st.session_state.tables,
+                        ):
+                            if kind == "token":
+                                if not tokens:
+                                    step_placeholder.text("🧠 Generating query...")
+                                tokens.append(payload)
+                                thought_placeholder.text("".join(tokens))
+                            elif kind == "sql":
+                                sql_placeholder.code(payload, language="sql")
+                                step_placeholder.text("📊 Querying database...")
+                            elif kind == "rows":
+                                step_placeholder.text(f"📊 Querying database... {payload:,} rows fetched")
+                            elif kind == "result":
+                                response = payload
+                        # The agent only saw a summary; fetch the full result by handle
+                        output = (
+                            st.session_state.agent_workflow.result(response["result_handle"])
+                            if response.get("result_handle") else response.get("output")
+                        )
+                        
+                        step_placeholder.text("✨ Formatting results...")
+                        
+                        # Parse and prepare the output
+                        parsed_output = parse_response_output(output)
+                        
+                        if st.session_state.optimizer:
+                            st.session_state.optimizer.maybe_tune(st.session_state.tables)
+                        
+                        step_placeholder.empty()
+                        thought_placeholder.empty()
                 
-                # Show debug info in expander
-                with st.expander("Debug Information"):
-                    st.write("**Error Details:**")
-                    st.code(str(e))
-                    st.write("**Question:**")
-                    st.write(prompt)
+                with span("result.render"):
+                    # Display the final result
+                    with response_placeholder.container():
+                        st.subheader("Result:")
+                        if response.get("sql"):
+                            with st.expander("SQL query"):
+                                st.code(response["sql"], language="sql")
+                        
+                        if isinstance(parsed_output, pd.DataFrame):
+                            if len(parsed_output) > 0:
+                                # Display metrics if it's numerical data
+                                if 'total_quantity' in parsed_output.columns:
+                                    col1, col2, col3 = st.columns(3)
+                                    with col1:
+                                        st.metric("Total Items", f"{len(parsed_output):,}")
+                                    with col2:
+                                        st.metric("Total Quantity", f"{parsed_output['total_quantity'].sum():,.0f}")
+                                    with col3:
+                                        st.metric("Avg Quantity", f"{parsed_output['total_quantity'].mean():,.1f}")
+                                
+                                # Display the data table
+                                st.dataframe(
+                                    parsed_output, 
+                                    use_container_width=True,
+                                    height=400
+                                )
+                                if parsed_output.attrs.get('truncated'):
+                                    st.caption(f"Showing the first {len(parsed_output):,} rows; the full result was larger.")
+                                
+                                # Add download button
+                                csv = parsed_output.to_csv(index=False)
+                                st.download_button(
+                                    label="📥 Download as CSV",
+                                    data=csv,
+                                    file_name=f"query_result_{int(time.time())}.csv",
+                                    mime="text/csv"
+                                )
+                            else:
+                                st.info("No data found matching your query.")
+                        else:
+                            st.write(parsed_output)
+                    
+            except Exception as e:
+                with response_placeholder.container():
+                    st.subheader("Result:")
+                    st.error(f"❌ Error processing query: {str(e)}")
+                    
+                    # Show debug info in expander
+                    with st.expander("Debug Information"):
+                        st.write("**Error Details:**")
+                        st.code(str(e))
+                        st.write("**Question:**")
+                        st.write(prompt)
     
     elif submit_button and not prompt:
         st.warning("⚠️ Please enter a question before submitting.")
@@ -0,0 +1,137 @@
+"""SQL result cache for Excel Query Bot.
+
+Classes:
+    ResultCache: Memory-bounded LRU cache of query results keyed by SQL text and data version.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    """Memory-bounded LRU cache of query result DataFrames.
+
+    Keys combine the normalized SQL text with the data version of the
+    database it ran against, so any ``Database.save_df`` makes older results
+    unreachable; they then age out through LRU eviction. One instance may be
+    shared by several sessions.
+
+    Attributes:
+        max_bytes (int): Memory budget for cached results.
+        current_bytes (int): Estimated memory currently held.
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups that found no entry.
+
+    """
+
+    def __init__(self, max_bytes: int):
+        """Initialize an empty cache.
+
+        Args:
+            max_bytes (int): Memory budget for cached results.
+
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cfg):
+        """Build a cache from the ``RESULT_CACHE`` configuration section.
+
+        Args:
+            cfg (dynaconf.Dynaconf): Configuration object. Optional keys:
+                - RESULT_CACHE.ENABLED: Whether the cache is used (default true)
+                - RESULT_CACHE.MAX_BYTES: Memory budget (default 256 MiB)
+
+        Returns:
+            Optional[ResultCache]: The cache, or None when it is disabled.
+
+        """
+        cache_cfg = cfg.get("RESULT_CACHE", {})
+        if not cache_cfg.get("ENABLED", True):
+            return None
+        return cls(max_bytes=int(cache_cfg.get("MAX_BYTES", 256 * 1024 ** 2)))
+
+    @staticmethod
+    def normalize_sql(query: str) -> str:
+        """Normalize SQL text so formatting differences share one entry.
+
+        Collapses whitespace and drops trailing semicolons; case is kept since
+        it is significant inside string literals.
+
+        Args:
+            query (str): SQL query text.
+
+        Returns:
+            str: Normalized SQL text.
+
+        """
+        return re.sub(r"\s+", " ", query).strip().rstrip(";").strip()
+
+    def get(self, query: str, data_version: str):
+        """Return the cached result of a query at a data version.
+
+        Args:
+            query (str): SQL query text.
+            data_version (str): Data version token from ``Database.data_version``.
+
+        Returns:
+            Optional[pandas.DataFrame]: Cached result, or None on a miss.
+
+        """
+        key = (self.normalize_sql(query), data_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, query: str, data_version: str, df):
+        """Cache a query result and evict least recently used entries over budget.
+
+        Results larger than the whole budget are not cached.
+
+        Args:
+            query (str): SQL query text.
+            data_version (str): Data version token from ``Database.data_version``.
+            df (pandas.DataFrame): Query result.
+
+        """
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            return
+        key = (self.normalize_sql(query), data_version)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            self._entries[key] = (df, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def stats(self):
+        """Return hit/miss counters and memory use.
+
+        Returns:
+            Dict[str, float]: ``hits``, ``misses``, ``hit_rate``, ``entries`` and ``bytes``.
+
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+            }
@@ -0,0 +1,121 @@
+"""Out-of-band query result store for Excel Query Bot.
+
+Classes:
+    ResultStore: Memory-bounded store of full query results addressed by opaque handles.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class ResultStore:
+    """Memory-bounded store of full query results addressed by opaque handles.
+
+    ``SqlQueryTool`` puts every result here and hands the agent only a short
+    summary naming the handle, so large results never enter a prompt; the
+    caller fetches the full DataFrame by handle afterwards. Entries expire
+    after ``ttl_seconds`` and the least recently used ones are evicted over
+    ``max_bytes``, except the newest, so a result larger than the budget can
+    still be fetched once. One instance may be shared by several sessions;
+    handles are random, so sessions cannot guess each other's.
+
+    Attributes:
+        max_bytes (int): Memory budget for stored results.
+        ttl_seconds (float): Time after which an unread result is dropped.
+        current_bytes (int): Estimated memory currently held.
+
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024 ** 2, ttl_seconds: float = 900):
+        """Initialize an empty store.
+
+        Args:
+            max_bytes (int, optional): Memory budget. Defaults to 512 MiB.
+            ttl_seconds (float, optional): Lifetime of a result. Defaults to 900.
+
+        """
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.current_bytes = 0
+        # Entries in LRU order, and their handles in storage order for expiry.
+        self._entries = OrderedDict()
+        self._stored = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cfg):
+        """Build a store from the ``RESULT_STORE`` configuration section.
+
+        Args:
+            cfg (dynaconf.Dynaconf): Configuration object. Optional keys:
+                - RESULT_STORE.MAX_BYTES: Memory budget (default 512 MiB)
+                - RESULT_STORE.TTL_SECONDS: Lifetime of a result (default 900)
+
+        Returns:
+            ResultStore: The store.
+
+        """
+        store_cfg = cfg.get("RESULT_STORE", {})
+        return cls(
+            max_bytes=int(store_cfg.get("MAX_BYTES", 512 * 1024 ** 2)),
+            ttl_seconds=float(store_cfg.get("TTL_SECONDS", 900)),
+        )
+
+    def put(self, df) -> str:
+        """Store a query result.
+
+        Args:
+            df (pandas.DataFrame): Full query result.
+
+        Returns:
+            str: Handle to fetch the result with.
+
+        """
+        handle = uuid.uuid4().hex
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        now = time.monotonic()
+        with self._lock:
+            self._entries[handle] = (df, size, now)
+            self._stored[handle] = now
+            self.current_bytes += size
+            # Every expired entry goes, however recently it was read.
+            while self._stored:
+                oldest, stored_at = next(iter(self._stored.items()))
+                if now - stored_at <= self.ttl_seconds:
+                    break
+                self._remove(oldest)
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                if oldest == handle:
+                    break
+                self._remove(oldest)
+        return handle
+
+    def _remove(self, handle: str):
+        """Drop an entry; the caller holds the lock."""
+        _, size, _ = self._entries.pop(handle)
+        del self._stored[handle]
+        self.current_bytes -= size
+
+    def get(self, handle: str):
+        """Return a stored result.
+
+        Args:
+            handle (str): Handle returned by ``put``.
+
+        Returns:
+            Optional[pandas.DataFrame]: The result, or None if it expired or
+                was evicted.
+
+        """
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[2] > self.ttl_seconds:
+                self._remove(handle)
+                return None
+            self._entries.move_to_end(handle)
+            return entry[0]
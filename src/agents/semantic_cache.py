@@ -0,0 +1,251 @@
+"""Semantic question-to-SQL cache for Excel Query Bot.
+
+Classes:
+    SemanticCache: Embedding-based cache of validated SQL keyed by schema and question meaning.
+"""
+
+import hashlib
+import re
+import threading
+import time
+
+import numpy as np
+
+# Column names in the schema blocks rendered by ``Database.extract_schemas``.
+_SCHEMA_COLUMN = re.compile(r"name: '([^']*)'")
+
+# Numbers, e.g. 5, 2023, 1,000.50 or -3.
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:[.,]\d+)*")
+
+# Text in straight or typographic quotes.
+_QUOTED = re.compile(r"(?<!\w)'([^']+)'(?!\w)|\"([^\"]+)\"|\u2018([^\u2019]+)\u2019|\u201c([^\u201d]+)\u201d")
+
+
+class SemanticCache:
+    """Cache of validated SQL looked up by question similarity within a schema.
+
+    Questions are embedded with a sentence-transformers model into unit
+    vectors held in one preallocated float32 matrix, so a lookup is a single
+    matrix-vector product over the entries of the same schema. Similar
+    questions can still differ in what matters to the SQL ("top 5" and
+    "top 10"), so a hit also requires both questions to mention the same
+    numbers, quoted strings and schema column names. Entries expire
+    after ``ttl_seconds`` and the least recently used entry is replaced once
+    ``max_entries`` is reached.
+
+    Attributes:
+        model_name (str): sentence-transformers model used for embeddings.
+        threshold (float): Minimum cosine similarity for a hit.
+        max_entries (int): Capacity of the index.
+        ttl_seconds (float): Lifetime of an entry since it was stored.
+        hits (int): Number of lookups that returned SQL.
+        misses (int): Number of lookups that found no similar question.
+
+    """
+
+    def __init__(self, model_name: str, threshold: float = 0.92, max_entries: int = 50000, ttl_seconds: float = 86400):
+        """Initialize an empty cache; the embedding model is loaded on first use.
+
+        Args:
+            model_name (str): sentence-transformers model name or path.
+            threshold (float, optional): Minimum cosine similarity for a hit.
+            max_entries (int, optional): Capacity of the index.
+            ttl_seconds (float, optional): Lifetime of an entry in seconds.
+
+        """
+        self.model_name = model_name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._model = None
+        self._lock = threading.Lock()
+        self._schema_ids = {}
+        self._schema_columns = {}
+        self._next_schema_id = 0
+        self._vectors = None
+        self._schema_of = np.full(max_entries, -1, dtype=np.int64)
+        self._created_at = np.zeros(max_entries, dtype=np.float64)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._sql = [None] * max_entries
+        self._literals = [None] * max_entries
+        self._literals_hash = np.zeros(max_entries, dtype=np.int64)
+
+    @classmethod
+    def from_config(cls, cfg):
+        """Build a cache from the ``SEMANTIC_CACHE`` configuration section.
+
+        Args:
+            cfg (dynaconf.Dynaconf): Configuration object. Optional keys:
+                - SEMANTIC_CACHE.ENABLED: Whether the cache is used (default true)
+                - SEMANTIC_CACHE.MODEL: Embedding model (default 'all-MiniLM-L6-v2')
+                - SEMANTIC_CACHE.THRESHOLD: Similarity threshold (default 0.92)
+                - SEMANTIC_CACHE.MAX_ENTRIES: Index capacity (default 50000)
+                - SEMANTIC_CACHE.TTL_SECONDS: Entry lifetime (default 86400)
+
+        Returns:
+            Optional[SemanticCache]: The cache, or None when it is disabled.
+
+        """
+        cache_cfg = cfg.get("SEMANTIC_CACHE", {})
+        if not cache_cfg.get("ENABLED", True):
+            return None
+        return cls(
+            model_name=cache_cfg.get("MODEL", "all-MiniLM-L6-v2"),
+            threshold=float(cache_cfg.get("THRESHOLD", 0.92)),
+            max_entries=int(cache_cfg.get("MAX_ENTRIES", 50000)),
+            ttl_seconds=float(cache_cfg.get("TTL_SECONDS", 86400)),
+        )
+
+    @staticmethod
+    def schema_hash(table_schema: str) -> str:
+        """Hash a rendered table schema so entries only match the same tables.
+
+        Args:
+            table_schema (str): Schema string as sent in the prompt.
+
+        Returns:
+            str: Hex digest of the schema.
+
+        """
+        return hashlib.sha256(table_schema.encode("utf-8")).hexdigest()
+
+    def _embed(self, question: str):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+
+            self._model = SentenceTransformer(self.model_name)
+        vector = self._model.encode([question.strip().lower()], normalize_embeddings=True)[0]
+        return np.asarray(vector, dtype=np.float32)
+
+    @staticmethod
+    def literals(question: str, columns=()):
+        """Extract what must match exactly for two questions to share SQL.
+
+        Args:
+            question (str): Natural language question.
+            columns (Iterable[str], optional): Column names of the schema.
+
+        Returns:
+            FrozenSet[Tuple[str, str]]: ``("number", ...)``, ``("text", ...)``
+                and ``("column", ...)`` items mentioned in the question.
+
+        """
+        text = question.strip().lower()
+        found = {("number", number.replace(",", "")) for number in _NUMBER.findall(text)}
+        found.update(("text", next(filter(None, groups)).strip()) for groups in _QUOTED.findall(text))
+        for column in columns:
+            # A column is mentioned by name, with underscores written as spaces or not.
+            words = [re.escape(word) for word in column.lower().split("_") if word]
+            if words and re.search(r"\b" + r"[\s_]*".join(words) + r"\b", text):
+                found.add(("column", column.lower()))
+        return frozenset(found)
+
+    def _schema_id(self, digest: str, table_schema: str) -> int:
+        """Id of a schema, assigned on first use; ids of schemas without live entries are released first."""
+        schema_id = self._schema_ids.get(digest)
+        if schema_id is not None:
+            return schema_id
+        live = set(np.unique(self._schema_of[self._live(self._schema_of >= 0, time.time())]).tolist())
+        for stale_digest, stale_id in list(self._schema_ids.items()):
+            if stale_id not in live:
+                del self._schema_ids[stale_digest]
+                del self._schema_columns[stale_id]
+        self._schema_of[~np.isin(self._schema_of, list(live))] = -1
+
+        schema_id, self._next_schema_id = self._next_schema_id, self._next_schema_id + 1
+        self._schema_ids[digest] = schema_id
+        self._schema_columns[schema_id] = sorted(set(_SCHEMA_COLUMN.findall(table_schema)))
+        return schema_id
+
+    def _live(self, mask, now: float):
+        return mask & (now - self._created_at < self.ttl_seconds)
+
+    def _best_match(self, schema_id: int, vector, literals, now: float):
+        """Return ``(slot, score)`` of the most similar live entry of a schema with the same literals."""
+        if self._vectors is None:
+            return None, 0.0
+        same = (self._schema_of == schema_id) & (self._literals_hash == hash(literals))
+        slots = [slot for slot in np.flatnonzero(self._live(same, now)) if self._literals[slot] == literals]
+        if not slots:
+            return None, 0.0
+        scores = self._vectors[slots] @ vector
+        best = int(np.argmax(scores))
+        return int(slots[best]), float(scores[best])
+
+    def lookup(self, question: str, table_schema: str):
+        """Return previously validated SQL for a similar question, if any.
+
+        Args:
+            question (str): Natural language question.
+            table_schema (str): Schema string the SQL must have been generated for.
+
+        Returns:
+            Optional[str]: Cached SQL, or None on a miss.
+
+        """
+        vector = self._embed(question)
+        now = time.time()
+        with self._lock:
+            schema_id = self._schema_ids.get(self.schema_hash(table_schema))
+            slot, score = None, 0.0
+            if schema_id is not None:
+                literals = self.literals(question, self._schema_columns[schema_id])
+                slot, score = self._best_match(schema_id, vector, literals, now)
+            if slot is None or score < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._last_used[slot] = now
+            return self._sql[slot]
+
+    def store(self, question: str, table_schema: str, sql: str):
+        """Remember SQL that executed successfully for a question.
+
+        An existing entry for an equivalent question is refreshed instead of
+        adding a duplicate. Schemas are only remembered while they have live
+        entries, so the schema index stays bounded by ``max_entries``.
+
+        Args:
+            question (str): Natural language question.
+            table_schema (str): Schema string the SQL was generated for.
+            sql (str): Validated SQL query.
+
+        """
+        vector = self._embed(question)
+        now = time.time()
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            schema_id = self._schema_id(self.schema_hash(table_schema), table_schema)
+            literals = self.literals(question, self._schema_columns[schema_id])
+
+            slot, score = self._best_match(schema_id, vector, literals, now)
+            if slot is None or score < self.threshold:
+                free = np.flatnonzero((self._schema_of < 0) | (now - self._created_at >= self.ttl_seconds))
+                slot = int(free[0]) if len(free) else int(np.argmin(self._last_used))
+
+            self._vectors[slot] = vector
+            self._schema_of[slot] = schema_id
+            self._created_at[slot] = now
+            self._last_used[slot] = now
+            self._sql[slot] = sql
+            self._literals[slot] = literals
+            self._literals_hash[slot] = hash(literals)
+
+    def stats(self):
+        """Return hit/miss counters and the current number of entries.
+
+        Returns:
+            Dict[str, float]: ``hits``, ``misses``, ``hit_rate`` and ``entries``.
+
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": int(np.count_nonzero(self._schema_of >= 0)),
+            }
@@ -0,0 +1,316 @@
+"""Local SQL validation module for Excel Query Bot.
+
+Classes:
+    SqlValidationError: Raised when generated SQL must not be executed.
+
+Functions:
+    extract_sql: Pull the SQL statement out of a model response.
+    referenced_tables: Return the tables a query reads from.
+    check_statement: Check that SQL is a single read-only SELECT statement.
+    validate_sql: Check that SQL is a single read-only query over known tables and columns.
+"""
+
+import json
+import re
+
+# Tokens: quoted identifiers, bare words, numbers and single characters.
+_TOKEN = re.compile(r'"(?:[^"]|"")*"|[A-Za-z_][\w$]*|\d+(?:\.\d+)?|\S')
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_CODE_FENCE = re.compile(r"```(?:sql)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+
+# Statements other than queries, refused where a statement can start: at the
+# beginning and right after an opening parenthesis (data-modifying CTEs).
+# Elsewhere these words are column names, aliases or functions (``replace``).
+_FORBIDDEN = {
+    "INSERT", "UPDATE", "DELETE", "MERGE", "UPSERT", "REPLACE", "DROP", "CREATE", "ALTER",
+    "TRUNCATE", "GRANT", "REVOKE", "COPY", "ATTACH", "DETACH", "PRAGMA", "VACUUM", "CALL",
+    "EXECUTE", "DO", "SET", "RESET", "LOCK", "INSTALL", "LOAD", "EXPORT", "IMPORT",
+}
+# Row locking clauses: FOR UPDATE, FOR NO KEY UPDATE, FOR SHARE, FOR KEY SHARE.
+_LOCKING = {"UPDATE", "NO", "SHARE", "KEY"}
+
+_KEYWORDS = {
+    "SELECT", "WITH", "RECURSIVE", "AS", "FROM", "WHERE", "GROUP", "BY", "HAVING", "ORDER",
+    "LIMIT", "OFFSET", "FETCH", "FIRST", "NEXT", "ROWS", "ROW", "ONLY", "UNION", "INTERSECT",
+    "EXCEPT", "ALL", "DISTINCT", "ON", "USING", "JOIN", "INNER", "LEFT", "RIGHT", "FULL",
+    "OUTER", "CROSS", "NATURAL", "LATERAL", "AND", "OR", "NOT", "IN", "IS", "NULL", "LIKE",
+    "ILIKE", "BETWEEN", "EXISTS", "ANY", "SOME", "CASE", "WHEN", "THEN", "ELSE", "END",
+    "ASC", "DESC", "NULLS", "LAST", "TRUE", "FALSE", "OVER", "PARTITION", "WINDOW", "RANGE",
+    "PRECEDING", "FOLLOWING", "UNBOUNDED", "CURRENT", "FILTER", "WITHIN", "CAST", "INTERVAL",
+    "DATE", "TIME", "TIMESTAMP", "ZONE", "AT", "YEAR", "QUARTER", "MONTH", "WEEK", "DAY",
+    "HOUR", "MINUTE", "SECOND", "EPOCH", "DOW", "DOY", "ISODOW", "INTEGER", "INT", "BIGINT",
+    "SMALLINT", "NUMERIC", "DECIMAL", "REAL", "DOUBLE", "PRECISION", "FLOAT", "TEXT",
+    "VARCHAR", "CHAR", "CHARACTER", "VARYING", "BOOLEAN", "ESCAPE", "SIMILAR", "TO", "FOR",
+    "CURRENT_DATE", "CURRENT_TIME", "CURRENT_TIMESTAMP", "LOCALTIME", "LOCALTIMESTAMP",
+    "TABLE", "VALUES", "INTO",
+}
+
+# Keywords that end the table list of a FROM clause.
+_CLAUSE_END = {
+    "WHERE", "GROUP", "HAVING", "ORDER", "LIMIT", "OFFSET", "FETCH", "UNION", "INTERSECT",
+    "EXCEPT", "ON", "USING", "WINDOW", "SELECT",
+}
+_JOIN_WORDS = {"JOIN", "INNER", "LEFT", "RIGHT", "FULL", "OUTER", "CROSS", "NATURAL", "LATERAL"}
+# Tokens after which a name in a FROM clause is a table reference; ``(`` opens
+# a parenthesized join list, and ``TABLE t`` is short for ``SELECT * FROM t``.
+_TABLE_POSITION = {"FROM", "JOIN", ",", ".", "(", "TABLE"}
+
+# Functions reading files, large objects or other databases, or stalling the
+# server, matched by lowercased name or name prefix, wherever they are called.
+_FORBIDDEN_FUNCTIONS = {
+    "glob", "sniff_csv", "parquet_scan", "parquet_metadata", "parquet_schema", "csv_scan",
+    "query", "query_table", "iceberg_scan", "delta_scan", "sqlite_scan", "postgres_scan",
+    "load_extension", "readfile", "writefile", "edit", "fts5",
+    "current_setting", "set_config", "pg_terminate_backend", "pg_cancel_backend", "pg_reload_conf",
+}
+_FORBIDDEN_FUNCTION_PREFIXES = ("read_", "pg_read_", "pg_ls_", "pg_stat_file", "pg_sleep", "lo_", "dblink")
+
+
+class SqlValidationError(ValueError):
+    """Raised when generated SQL must not be executed."""
+
+
+def extract_sql(text: str) -> str:
+    """Pull the SQL statement out of a model response.
+
+    Accepts a JSON object with a ``sql`` key, a fenced code block or bare SQL.
+
+    Args:
+        text (str): Model response content.
+
+    Returns:
+        str: The SQL statement, stripped.
+
+    """
+    text = (text or "").strip()
+    try:
+        parsed = json.loads(text)
+    except ValueError:
+        parsed = None
+    if isinstance(parsed, dict) and isinstance(parsed.get("sql"), str):
+        return parsed["sql"].strip()
+    fenced = _CODE_FENCE.search(text)
+    return (fenced.group(1) if fenced else text).strip()
+
+
+def _name(token: str) -> str:
+    """Identifier name of a token: quoted names verbatim, bare names lowercased."""
+    return token[1:-1].replace('""', '"') if token.startswith('"') else token.lower()
+
+
+def _is_identifier(token: str) -> bool:
+    return bool(token) and (token.startswith('"') or (token[0].isalpha() or token[0] == "_") and token.upper() not in _KEYWORDS)
+
+
+def _tokenize(statement: str):
+    """Tokens of a statement, with string literals and comments removed."""
+    scrubbed = _COMMENT.sub(" ", _STRING_LITERAL.sub("''", statement))
+    return [token for token in _TOKEN.findall(scrubbed) if token != "''"]
+
+
+def _is_forbidden_function(name: str) -> bool:
+    return name in _FORBIDDEN_FUNCTIONS or name.startswith(_FORBIDDEN_FUNCTION_PREFIXES)
+
+
+def _scan(tokens):
+    """Find the referenced tables, the aliases and the CTE names of a query.
+
+    Parenthesized join lists keep their FROM clause, ``ONLY`` before a table
+    is skipped and ``TABLE t`` reads ``t``. A name in FROM / JOIN position is
+    a CTE reference only where that CTE is in scope: CTEs defined earlier in the WITH list, plus the CTE being
+    defined itself under ``WITH RECURSIVE``. Anywhere else, e.g. in the body
+    of a (non-recursive) CTE named after a table, the name reads the table.
+
+    Returns:
+        Tuple[Set[str], Set[str], Set[str]]: Table names read in FROM / JOIN
+            clauses, aliases and CTE names.
+
+    Raises:
+        SqlValidationError: If the query calls a function in FROM / JOIN
+            position (table functions read files and other sources) or a
+            function reading files, large objects or sleeping.
+
+    """
+    # ``FROM ONLY t`` (PostgreSQL: without inheritance children) reads ``t``.
+    tokens = [
+        token for idx, token in enumerate(tokens)
+        if not (token.upper() == "ONLY" and idx and tokens[idx - 1].upper() in ("FROM", "JOIN", ",", "("))
+    ]
+    referenced, aliases, ctes = set(), set(), []
+    recursive = any(token.upper() == "RECURSIVE" for token in tokens)
+    # One entry per open parenthesis: True for function-call arguments, whose
+    # FROM (e.g. ``EXTRACT(YEAR FROM d)``) does not start a table list.
+    calls, in_from = [], False
+    # Whether the current parenthesis level is inside a FROM clause; a comma
+    # there starts another table reference, even after a join's ON condition.
+    from_clause = False
+    # (in_from, from_clause) of the enclosing level, per open parenthesis.
+    outer_from = []
+    # (parenthesis depth, name) of the CTE bodies being scanned.
+    cte_bodies, pending_cte = [], None
+    for idx, token in enumerate(tokens):
+        upper = token.upper()
+        previous = tokens[idx - 1] if idx else ""
+        following = tokens[idx + 1] if idx + 1 < len(tokens) else ""
+        if following == "(" and _is_identifier(token) and _is_forbidden_function(_name(token).lower()):
+            raise SqlValidationError(f"Function not allowed: {_name(token)}.")
+        if token == "(":
+            calls.append(bool(previous) and previous.upper() not in _KEYWORDS and (previous[0].isalpha() or previous[0] in '_"'))
+            if pending_cte is not None and previous.upper() == "AS":
+                cte_bodies.append((len(calls), pending_cte))
+            pending_cte = None
+            outer_from.append((in_from, from_clause))
+            # ``FROM (a JOIN b)``: the parenthesized join list is still a table list.
+            in_from = from_clause = in_from and previous.upper() in ("FROM", "JOIN", ",", "(")
+            continue
+        if token == ")":
+            if cte_bodies and cte_bodies[-1][0] == len(calls):
+                cte_bodies.pop()
+            if calls:
+                calls.pop()
+            in_from, from_clause = outer_from.pop() if outer_from else (False, False)
+            if _is_identifier(following) and (idx + 2 >= len(tokens) or tokens[idx + 2] != "("):
+                # ``(subquery) alias`` or ``COUNT(*) alias``
+                aliases.add(_name(following))
+            continue
+        if upper in ("FROM", "JOIN", "TABLE"):
+            in_from = from_clause = not (calls and calls[-1])
+            continue
+        if token == "," and from_clause:
+            in_from = True
+        if upper in _CLAUSE_END:
+            in_from = False
+            # A join condition ends the table reference, not the FROM clause.
+            from_clause = from_clause and upper in ("ON", "USING")
+        if upper == "AS":
+            if following == "(" and _is_identifier(previous):
+                pending_cte = _name(previous)
+                ctes.append(pending_cte)
+            elif _is_identifier(following):
+                aliases.add(_name(following))
+            continue
+        if not in_from or not _is_identifier(token):
+            continue
+        if following == "(":
+            if previous.upper() in _TABLE_POSITION | {"LATERAL"}:
+                raise SqlValidationError(f"Table functions are not allowed: {_name(token)}(...).")
+            continue
+        if previous.upper() in _TABLE_POSITION:
+            if following != ".":
+                name = _name(token)
+                defining = {cte_name for _, cte_name in cte_bodies}
+                # A CTE being defined is not yet in scope, unless recursive.
+                in_scope = set(ctes) if recursive else set(ctes) - defining
+                if name not in in_scope:
+                    referenced.add(name)
+        elif previous.upper() not in _JOIN_WORDS:
+            # A bare word right after a table reference is its alias.
+            aliases.add(_name(token))
+    return referenced, aliases, set(ctes)
+
+
+def referenced_tables(sql: str):
+    """Return the tables a query reads from, excluding references to its CTEs.
+
+    Args:
+        sql (str): SQL statement.
+
+    Returns:
+        Set[str]: Referenced table names; unquoted names are lowercased.
+
+    Raises:
+        SqlValidationError: If the query calls table functions or functions
+            reading files, see ``_scan``.
+
+    """
+    referenced, _, _ = _scan(_tokenize(sql))
+    return referenced
+
+
+def check_statement(sql: str):
+    """Check that SQL is a single read-only SELECT (or WITH ... SELECT) statement.
+
+    Data-changing and administrative statements are refused wherever a
+    statement can start, including data-modifying CTEs, as are SELECT INTO,
+    row locking clauses and functions reading files or sleeping. Table names
+    are not checked; see ``validate_sql`` and ``referenced_tables``.
+
+    Args:
+        sql (str): SQL statement to check.
+
+    Returns:
+        str: The statement without a trailing semicolon.
+
+    Raises:
+        SqlValidationError: If the statement must not be executed.
+
+    """
+    statement = sql.strip().rstrip(";").strip()
+    tokens = _tokenize(statement)
+    if not tokens:
+        raise SqlValidationError("Empty SQL statement.")
+    if ";" in tokens:
+        raise SqlValidationError("Only a single SQL statement is allowed.")
+    if tokens[0].upper() not in ("SELECT", "WITH"):
+        raise SqlValidationError("Only SELECT queries are allowed.")
+    forbidden = set()
+    for idx, token in enumerate(tokens):
+        upper = token.upper()
+        previous = tokens[idx - 1].upper() if idx else ""
+        following = tokens[idx + 1] if idx + 1 < len(tokens) else ""
+        if upper == "INTO" or (previous == "FOR" and upper in _LOCKING):
+            forbidden.add(f"{previous} {upper}" if previous == "FOR" else upper)
+        elif upper in _FORBIDDEN and previous in ("", "(") and following != "(":
+            forbidden.add(upper)
+    if forbidden:
+        raise SqlValidationError(f"Forbidden keyword(s) in query: {', '.join(sorted(forbidden))}.")
+    _scan(tokens)
+    return statement
+
+
+def validate_sql(sql: str, known_columns):
+    """Check that SQL is a single read-only query over known tables and columns.
+
+    The check is lexical: it does not parse SQL fully, but it rejects
+    anything ``check_statement`` refuses, tables that are not loaded
+    and identifiers that are neither a column of a referenced table nor an
+    alias, a CTE name or a function.
+
+    Args:
+        sql (str): SQL statement to check.
+        known_columns (Dict[str, List[str]]): Column names per loaded table.
+
+    Returns:
+        str: The statement without a trailing semicolon.
+
+    Raises:
+        SqlValidationError: If the statement must not be executed.
+
+    """
+    statement = check_statement(sql)
+    tokens = _tokenize(statement)
+
+    tables = {name.lower(): name for name in known_columns}
+    referenced, aliases, ctes = _scan(tokens)
+
+    unknown_tables = sorted(name for name in referenced if name.lower() not in tables)
+    if unknown_tables:
+        raise SqlValidationError(f"Unknown table(s): {', '.join(unknown_tables)}. Loaded tables: {', '.join(known_columns)}.")
+
+    columns = {
+        column.lower()
+        for name in referenced
+        for column in known_columns[tables[name.lower()]]
+    }
+    allowed = columns | aliases | ctes | {name.lower() for name in referenced}
+    unknown_columns = set()
+    for idx, token in enumerate(tokens):
+        following = tokens[idx + 1] if idx + 1 < len(tokens) else ""
+        if not _is_identifier(token) or following in ("(", "."):
+            continue
+        if _name(token).lower() not in allowed:
+            unknown_columns.add(_name(token))
+    if unknown_columns:
+        raise SqlValidationError(f"Unknown column(s): {', '.join(sorted(unknown_columns))}.")
+    return statement
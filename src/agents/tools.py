@@ -2,13 +2,44 @@
 
 Classes:
     SqlQueryTool: LangChain tool for executing SQL SELECT queries on Excel data.
+
+Attributes:
+    sql_timings (ContextVar): When set to a list in the caller's context, every
+        query executed by SqlQueryTool appends its duration in seconds to it.
+    query_events (ContextVar): When set to an ``on_event(kind, payload)``
+        callable in the caller's context, SqlQueryTool reports ``("rows", n)``
+        with the number of rows fetched so far after every fetched batch.
+    query_tables (ContextVar): When set to a collection of table names in the
+        caller's context, SqlQueryTool refuses queries reading any other table.
 """
 
+import asyncio
+import re
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
 from typing import Any
 from langchain.tools.base import BaseTool
 import pandas as pd
 from pydantic import Field
 
+from src.agents.sql_validator import SqlValidationError, check_statement, referenced_tables
+from src.core.database import ROW_HASH_COLUMN
+from src.core.tracing import span
+
+# First line of an observation for a result kept in the result store.
+_HANDLE_LINE = re.compile(r"^Result handle: (\w+)$", re.MULTILINE)
+
+sql_timings = ContextVar("sql_timings", default=None)
+query_events = ContextVar("query_events", default=None)
+query_tables = ContextVar("query_tables", default=None)
+
+
+def _record_sql_timing(seconds: float):
+    timings = sql_timings.get()
+    if timings is not None:
+        timings.append(seconds)
+
 
 class SqlQueryTool(BaseTool):
     """LangChain tool for executing SQL SELECT queries on Excel data.
@@ -17,11 +48,29 @@ class SqlQueryTool(BaseTool):
         name (str): Tool identifier used by LangChain agents ("sql_query").
         description (str): Brief description of tool functionality for agent reasoning.
         text_db (Any): Database interface object with SQLAlchemy engine attribute.
+        result_cache (Any): Optional ResultCache for results of repeated queries.
+        max_rows (int): Maximum number of result rows materialized (0 for no cap).
+        fetch_batch_size (int): Rows fetched per round trip from the server-side cursor.
+        rollups (Any): Optional RollupManager used to answer GROUP BY queries from rollups.
+        guard (Any): Optional QueryGuard admitting queries by cost and bounding
+            their rows and run time.
+        result_store (Any): Optional ResultStore keeping full results; the
+            tool then returns a bounded summary instead of the DataFrame.
+        sample_rows (int): Rows shown in a summary.
+        max_observation_chars (int): Length cap of a summary.
 
     """
     name: str = "sql_query"
     description: str = "Executes SQL SELECT queries on a relational database"
     text_db: Any = Field(None)
+    result_cache: Any = Field(None)
+    max_rows: int = Field(100000)
+    fetch_batch_size: int = Field(10000)
+    rollups: Any = Field(None)
+    guard: Any = Field(None)
+    result_store: Any = Field(None)
+    sample_rows: int = Field(5)
+    max_observation_chars: int = Field(4000)
 
     def __init__(self, generator, text_db, **kwargs) -> None:
         """Initialize the SQL query tool with database connection.
@@ -29,24 +78,225 @@ class SqlQueryTool(BaseTool):
         Args:
             generator: Language model instance (required for LangChain compatibility).
             text_db: Database interface object with SQLAlchemy engine attribute.
-            **kwargs: Additional keyword arguments passed to BaseTool constructor.
+            **kwargs: Additional keyword arguments passed to BaseTool constructor
+                (e.g. ``result_cache``, ``max_rows``, ``fetch_batch_size``, ``rollups``,
+                ``guard``, ``result_store``).
 
         """
         super().__init__(generator=generator,text_db = text_db,**kwargs)
 
+    @staticmethod
+    def handle_of(observation):
+        """Return the result store handle named in an observation, or None."""
+        match = _HANDLE_LINE.search(observation) if isinstance(observation, str) else None
+        return match.group(1) if match else None
+
+    def _observe(self, df):
+        """Store a result and describe it in a bounded summary for the agent.
+
+        Args:
+            df (pd.DataFrame): Full query result.
+
+        Returns:
+            str: Handle, row count, column names and types, and the first
+                ``sample_rows`` rows (long values cut short), at most
+                ``max_observation_chars`` long.
+
+        """
+        handle = self.result_store.put(df)
+        rows = f"{len(df):,}" + (f" (truncated at {self.max_rows:,})" if df.attrs.get('truncated') else "")
+        sample = df.head(self.sample_rows).astype(str).apply(lambda column: column.str.slice(0, 80))
+        observation = (
+            f"Result handle: {handle}\n"
+            f"Rows: {rows}\n"
+            f"Columns: {', '.join(f'{name} ({dtype})' for name, dtype in df.dtypes.items())}\n"
+            f"First {len(sample)} rows:\n{sample.to_csv(index=False)}"
+        )
+        if len(observation) > self.max_observation_chars:
+            observation = observation[:self.max_observation_chars] + "\n..."
+        return observation
+
+    @staticmethod
+    def _rows_reporter():
+        """Return a callback reporting fetched rows to ``query_events``, or None."""
+        on_event = query_events.get()
+        if on_event is None:
+            return None
+        return lambda rows: on_event("rows", rows)
+
+    def _fetch_rows(self, connection, query: str, on_rows=None, cancellers=None):
+        """Run a query through a server-side cursor and collect up to ``max_rows`` rows.
+
+        Args:
+            connection (sqlalchemy.engine.Connection): Open connection to run on.
+            query (str): SQL SELECT query string to execute.
+            on_rows (Callable[[int], None], optional): Called with the number
+                of rows fetched so far after every batch.
+            cancellers (list, optional): Receives a callable aborting the
+                running statement from another thread.
+
+        Returns:
+            pd.DataFrame: Query results. ``attrs['truncated']`` is True when
+                rows beyond ``max_rows`` were dropped.
+
+        """
+        frames, rows, truncated = [], 0, False
+        connection = connection.execution_options(stream_results=True, max_row_buffer=self.fetch_batch_size)
+        with self.guard.limits(connection) if self.guard else nullcontext(lambda: None) as cancel:
+            if cancellers is not None:
+                cancellers.append(cancel)
+            for chunk in pd.read_sql_query(query, connection, chunksize=self.fetch_batch_size):
+                # SELECT * also returns the hidden row hash column.
+                frames.append(chunk.drop(columns=ROW_HASH_COLUMN, errors='ignore'))
+                rows += len(chunk)
+                if on_rows:
+                    on_rows(min(rows, self.max_rows) if self.max_rows else rows)
+                if self.max_rows and rows > self.max_rows:
+                    truncated = True
+                    break
+
+        with span("result.convert", batches=len(frames)):
+            df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            if truncated:
+                df = df.iloc[:self.max_rows]
+            df.attrs['truncated'] = truncated
+        return df
+
+    @staticmethod
+    def _check_query(query: str) -> str:
+        """Refuse anything but a single read-only query over the caller's ``query_tables``.
+
+        Agent queries get the same statement checks as directly generated
+        SQL, see ``check_statement``.
+
+        Returns:
+            str: The statement to execute, without a trailing semicolon.
+
+        """
+        statement = check_statement(query)
+        allowed = query_tables.get()
+        if allowed is None:
+            return statement
+        allowed = {table_name.lower() for table_name in allowed}
+        outside = sorted(name for name in referenced_tables(statement) if name.lower() not in allowed)
+        if outside:
+            raise SqlValidationError(f"Unknown table(s): {', '.join(outside)}. Loaded tables: {', '.join(sorted(allowed))}.")
+        return statement
+
+    def _record_execution(self, query: str, started: float):
+        """Report a database execution to the caller's timings and the query log."""
+        seconds = time.perf_counter() - started
+        _record_sql_timing(seconds)
+        self.text_db.log_query(query, seconds)
+
+    def _rewrite(self, query: str) -> str:
+        """Return the query to execute: its rollup rewrite, admitted by the guard."""
+        if self.rollups is not None:
+            query = self.rollups.rewrite(query) or query
+        if self.guard is not None:
+            query = self.guard.admit(query)
+        return query
+
+    def _fetch(self, query: str, cancellers=None):
+        """Run a query on a pooled synchronous connection, see ``_fetch_rows``."""
+        rewritten = self._rewrite(query)
+        with span("sql.execute", query=rewritten, rewritten=rewritten != query) as execute_span:
+            started = time.perf_counter()
+            with self.text_db.engine.connect() as connection:
+                df = self._fetch_rows(connection, rewritten, on_rows=self._rows_reporter(), cancellers=cancellers)
+            execute_span.set(rows=len(df), truncated=df.attrs['truncated'])
+        self._record_execution(rewritten, started)
+        return df
+
+    async def _afetch(self, query: str):
+        """Run a query on the async engine, see ``_fetch_rows``.
+
+        Falls back to a worker thread when the database has no async driver.
+        Cancelling the calling task aborts the running statement either way.
+
+        """
+        async_engine = self.text_db.async_engine
+        if async_engine is None:
+            cancellers = []
+            try:
+                return await asyncio.to_thread(self._fetch, query, cancellers)
+            except asyncio.CancelledError:
+                # The worker thread keeps running; abort its statement.
+                for cancel in cancellers:
+                    cancel()
+                raise
+        rewritten = (
+            await asyncio.to_thread(self._rewrite, query)
+            if self.rollups is not None or self.guard is not None else query
+        )
+        with span("sql.execute", query=rewritten, rewritten=rewritten != query) as execute_span:
+            started = time.perf_counter()
+            async with async_engine.connect() as connection:
+                df = await connection.run_sync(self._fetch_rows, rewritten, self._rows_reporter())
+            execute_span.set(rows=len(df), truncated=df.attrs['truncated'])
+        self._record_execution(rewritten, started)
+        return df
+
     def _run(self, query: str, **kwargs: Any):
         """Execute a SQL SELECT query and return structured results.
 
-        Executes the provided SQL query against the database using pandas
-        and SQLAlchemy, returning the results as a list of dictionaries
-        for easy processing by downstream components.
+        Executes the provided SQL query against the database through a
+        server-side cursor, fetching ``fetch_batch_size`` rows at a time and
+        keeping at most ``max_rows`` of them. The result stays a DataFrame end
+        to end. With a result cache, a query already run at the current data
+        version is not sent to the database again; cached frames are shared
+        and must be treated as read-only.
+
+        With a result store, the DataFrame is kept there and the agent is
+        given a bounded summary naming its handle (see ``_observe``), so the
+        size of the result does not reach the next prompt.
+
+        Args:
+            query (str): SQL SELECT query string to execute.
+            **kwargs (Any): Additional keyword arguments (currently unused).
+
+        Returns:
+            Union[str, pd.DataFrame]: Result summary with a handle (see
+                ``handle_of``), or the query results without a result store.
+
+        Raises:
+            SqlValidationError: If the query is not a single read-only SELECT
+                or reads a table outside ``query_tables``.
+
+        """
+        query = self._check_query(query)
+        if self.result_cache is None:
+            df = self._fetch(query)
+        else:
+            data_version = self.text_db.data_version()
+            df = self.result_cache.get(query, data_version)
+            if df is None:
+                df = self._fetch(query)
+                self.result_cache.put(query, data_version, df)
+        return self._observe(df) if self.result_store is not None else df
+
+    async def _arun(self, query: str, **kwargs: Any):
+        """Asynchronous counterpart of ``_run`` used by ``AppReact.aexecute``.
 
         Args:
             query (str): SQL SELECT query string to execute.
             **kwargs (Any): Additional keyword arguments (currently unused).
 
         Returns:
-            List[Dict[str, Any]]: Query results as a list of dictionaries.
+            Union[str, pd.DataFrame]: Result summary or query results, see ``_run``.
+
+        Raises:
+            SqlValidationError: If the query is not a single read-only SELECT
+                or reads a table outside ``query_tables``.
 
         """
-        return pd.read_sql_query(query, self.text_db.engine).to_dict(orient='records')
\ No newline at end of file
+        query = self._check_query(query)
+        if self.result_cache is None:
+            df = await self._afetch(query)
+        else:
+            data_version = self.text_db.data_version()
+            df = self.result_cache.get(query, data_version)
+            if df is None:
+                df = await self._afetch(query)
+                self.result_cache.put(query, data_version, df)
+        return self._observe(df) if self.result_store is not None else df
@@ -2,10 +2,78 @@
 
 Classes:
     AppReact: Main ReAct agent class for SQL query generation and execution.
+
+Attributes:
+    llm_timings (ContextVar): When set to a list in the caller's context, every
+        language model call made by AppReact appends its duration in seconds to it.
 """
 
-from src.agents.tools import SqlQueryTool
+import asyncio
+import time
+from contextvars import ContextVar
+
+from src.agents.result_store import ResultStore
+from src.agents.sql_validator import extract_sql, validate_sql
+from src.agents.tools import SqlQueryTool, query_events, query_tables
+from src.core.event_loop import run_sync, stream_sync
+from src.core.prompts import repair_prompt, sql_prompt
+from src.core.tracing import record_span, span
 from langchain.agents import AgentType, initialize_agent
+from langchain_core.callbacks import AsyncCallbackHandler
+
+llm_timings = ContextVar("llm_timings", default=None)
+
+
+def _record_llm_timing(seconds: float):
+    timings = llm_timings.get()
+    if timings is not None:
+        timings.append(seconds)
+
+
+class _AgentCallbackHandler(AsyncCallbackHandler):
+    """Times every LLM call and forwards agent callbacks to an optional ``on_event(kind, payload)``."""
+
+    def __init__(self, on_event=None):
+        self.on_event = on_event
+        self._calls = {}
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._calls[run_id] = [time.perf_counter(), 0]
+
+    async def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._calls[run_id] = [time.perf_counter(), 0]
+
+    async def on_llm_new_token(self, token, *, run_id, **kwargs):
+        if run_id in self._calls:
+            self._calls[run_id][1] += 1
+        if self.on_event is not None:
+            self.on_event("token", token)
+
+    async def on_llm_end(self, response, *, run_id, **kwargs):
+        started, streamed = self._calls.pop(run_id, (None, 0))
+        if started is None:
+            return
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        duration = time.perf_counter() - started
+        _record_llm_timing(duration)
+        record_span(
+            "llm.call",
+            duration,
+            prompt_tokens=usage.get("prompt_tokens"),
+            # Streamed responses usually carry no usage; count the streamed tokens instead.
+            completion_tokens=usage.get("completion_tokens", streamed or None),
+        )
+
+    async def on_llm_error(self, error, *, run_id, **kwargs):
+        started, _ = self._calls.pop(run_id, (None, 0))
+        if started is not None:
+            duration = time.perf_counter() - started
+            _record_llm_timing(duration)
+            record_span("llm.call", duration, error=f"{type(error).__name__}: {error}")
+
+    async def on_agent_action(self, action, **kwargs):
+        if self.on_event is not None and action.tool == "sql_query":
+            self.on_event("sql", action.tool_input if isinstance(action.tool_input, str) else action.tool_input.get("query"))
 
 
 class AppReact():
@@ -16,6 +84,11 @@ class AppReact():
         text_db: Database interface with SQLAlchemy engine for query execution.
         tools (list): List of LangChain-compatible tools (currently only SqlQueryTool).
         agent_chain: Initialized LangChain agent configured with ReAct pattern.
+        semantic_cache (Optional[SemanticCache]): Cache of validated SQL by question meaning.
+        mode (str): 'direct' to answer with one SQL-generating call and use the
+            agent only to repair failures, or 'agent' to always run the agent.
+        structured_output (bool): Request a JSON object from the model in direct mode.
+        result_store (ResultStore): Full query results, fetched by handle with ``result``.
         
     """
     def __init__(
@@ -30,12 +103,43 @@ class AppReact():
             generator: Language model instance for query interpretation and reasoning.
             text_db: Database interface object with a SQLAlchemy engine attribute.
             **kwargs: Additional keyword arguments for future extensibility.
+                - semantic_cache (SemanticCache): Shared question-to-SQL cache.
+                - result_cache (ResultCache): Cache of SQL results, possibly
+                  shared across sessions.
+                - max_rows (int): Row cap for materialized query results.
+                - fetch_batch_size (int): Rows per server-side cursor fetch.
+                - rollups (RollupManager): Rollups used to answer GROUP BY queries.
+                - guard (QueryGuard): Cost admission, auto-LIMIT and timeouts
+                  for executed queries.
+                - mode (str): 'direct' (default) or 'agent', see ``aexecute``.
+                - structured_output (bool): Ask for JSON output in direct
+                  mode (default True).
+                - result_store (ResultStore): Store of full query results,
+                  possibly shared across sessions (default: a private one).
+                - sample_rows (int): Result rows shown to the agent (default 5).
+                - max_observation_chars (int): Length cap of the result
+                  summary shown to the agent (default 4000).
 
         """
         self.generator = generator
         self.text_db = text_db
+        self.semantic_cache = kwargs.get("semantic_cache")
+        self.mode = kwargs.get("mode", "direct")
+        self.structured_output = kwargs.get("structured_output", True)
+        self.result_store = kwargs.get("result_store") or ResultStore()
         self.tools = [
-            SqlQueryTool(generator=self.generator, text_db=self.text_db),
+            SqlQueryTool(
+                generator=self.generator,
+                text_db=self.text_db,
+                result_cache=kwargs.get("result_cache"),
+                max_rows=kwargs.get("max_rows", 100000),
+                fetch_batch_size=kwargs.get("fetch_batch_size", 10000),
+                rollups=kwargs.get("rollups"),
+                guard=kwargs.get("guard"),
+                result_store=self.result_store,
+                sample_rows=kwargs.get("sample_rows", 5),
+                max_observation_chars=kwargs.get("max_observation_chars", 4000),
+            ),
         ]
         self.agent_chain = initialize_agent(
             self.tools,
@@ -47,19 +151,184 @@ class AppReact():
             verbose=True,
         )
 
-    def execute(self, prompt):
+    def execute(self, prompt, question=None, table_schema=None, prompt_schema=None, tables=None):
         """Execute a natural language query and return raw database results.
+
+        Thin synchronous wrapper around ``aexecute`` that runs it on the shared
+        background event loop; call ``aexecute`` directly from async code.
+        The full query result is fetched by handle into ``output``.
+
+        Args:
+            prompt (str): Natural language query about the Excel data.
+            question (str, optional): The user's question without the system
+                prompt, used as the semantic cache key.
+            table_schema (str, optional): Schema string the prompt was built
+                from, used to scope cache entries.
+            tables (List[str], optional): Tables the question may read.
+
+        Returns:
+            dict: Response dictionary, see ``aexecute``, with ``output``
+                holding the full query results DataFrame when a query ran.
+
+        """
+        response = run_sync(self.aexecute(
+            prompt, question=question, table_schema=table_schema, prompt_schema=prompt_schema, tables=tables,
+        ))
+        if response.get('result_handle'):
+            response['output'] = self.result(response['result_handle'])
+        return response
+
+    def result(self, handle):
+        """Fetch the full result of an executed query.
+
+        Args:
+            handle (str): ``result_handle`` of a response.
+
+        Returns:
+            Optional[pd.DataFrame]: Query results, or None once expired.
+
+        """
+        return self.result_store.get(handle)
+
+    def stream(self, prompt, question=None, table_schema=None, prompt_schema=None, tables=None):
+        """Execute a query like ``execute`` while yielding its progress events.
+
+        Args:
+            prompt (str): Natural language query about the Excel data.
+            question (str, optional): The user's question without the system
+                prompt, used as the semantic cache key.
+            table_schema (str, optional): Schema string the prompt was built
+                from, used to scope cache entries.
+            tables (List[str], optional): Tables the question may read.
+
+        Yields:
+            Tuple[str, Any]: ``(kind, payload)`` events as they happen, see
+                ``aexecute``, then ``("result", response)`` with the response
+                dictionary; fetch the full result with ``result``.
+
+        """
+        yield from stream_sync(
+            lambda on_event: self.aexecute(
+                prompt, question=question, table_schema=table_schema, prompt_schema=prompt_schema,
+                tables=tables, on_event=on_event,
+            )
+        )
+
+    async def _agenerate_sql(self, question, schema, on_event=None):
+        """Ask the model for the SQL answering a question in one call.
+
+        Args:
+            question (str): The user's question.
+            schema (str): Schema the query is written against.
+            on_event (Callable[[str, Any], None], optional): Receives streamed tokens.
+
+        Returns:
+            str: The SQL extracted from the response.
+
+        """
+        llm = self.generator.bind(response_format={"type": "json_object"}) if self.structured_output else self.generator
+        with span("sql.generate"):
+            message = await llm.ainvoke(
+                sql_prompt.format(table_schema=schema, user_query=question),
+                config={"callbacks": [_AgentCallbackHandler(on_event)]},
+            )
+        return extract_sql(message.content)
+
+    async def aexecute(self, prompt, question=None, table_schema=None, prompt_schema=None, tables=None, on_event=None):
+        """Execute a natural language query asynchronously and return raw database results.
+
+        The language model and the database are awaited through their async
+        clients, so concurrent questions overlap their network waits.
+
+        When a semantic cache is configured and the raw question and schema are
+        given, SQL previously validated for a similar question on the same
+        schema is executed directly without calling the language model. SQL
+        that the agent executes successfully is added to the cache.
+
+        In direct mode the SQL comes from a single model call, is validated
+        locally (one SELECT over loaded tables and columns) and is executed
+        without the agent. Only when generation, validation or execution
+        fails does the ReAct agent run, prompted with the failed query and
+        the error so it can repair it.
         
         Args:
             prompt (str): Natural language query about the Excel data.
+            question (str, optional): The user's question without the system
+                prompt, used as the semantic cache key.
+            table_schema (str, optional): Schema string the prompt was built
+                from, used to scope cache entries.
+            prompt_schema (str, optional): Schema given to the model in direct
+                mode. Defaults to ``table_schema``.
+            tables (List[str], optional): Tables the question may read; queries
+                reading any other table are refused. Defaults to every table
+                registered on the database.
+            on_event (Callable[[str, Any], None], optional): Called with
+                progress events as they happen:
+                - ``("token", str)`` for every streamed language model token
+                - ``("sql", str)`` when a SQL query is chosen
+                - ``("rows", int)`` with the rows fetched so far
                          
         Returns:
             dict: Response dictionary with the following structure:
-                - 'output': Raw query results as returned by SqlQueryTool
+                - 'output': Bounded result summary as given to the agent
+                - 'result_handle': Handle of the full results in the result
+                  store, see ``result``
                 - 'intermediate_steps': List of agent reasoning steps for debugging
+                - 'sql': The executed SQL query, when one was run
+                - 'cache_hit': Whether the SQL came from the semantic cache
+                - 'mode': 'cache', 'direct' or 'agent', whichever produced the SQL
                 
         """
-        response = self.agent_chain(prompt)
+        if on_event is not None:
+            query_events.set(on_event)
+        if tables is not None:
+            query_tables.set(list(tables))
+        use_cache = self.semantic_cache is not None and question and table_schema is not None
+        if use_cache:
+            with span("cache.lookup") as lookup_span:
+                sql = await asyncio.to_thread(self.semantic_cache.lookup, question, table_schema)
+                lookup_span.set(hit=sql is not None)
+            if sql is not None:
+                if on_event is not None:
+                    on_event("sql", sql)
+                observation = await self.tools[0].arun(sql)
+                return {
+                    'output': observation,
+                    'result_handle': SqlQueryTool.handle_of(observation),
+                    'intermediate_steps': [],
+                    'sql': sql,
+                    'cache_hit': True,
+                    'mode': 'cache',
+                }
+
+        schema = prompt_schema or table_schema
+        if self.mode == "direct" and question and schema:
+            sql = None
+            try:
+                sql = await self._agenerate_sql(question, schema, on_event)
+                known_columns = await asyncio.to_thread(self.text_db.table_columns, tables)
+                sql = validate_sql(sql, known_columns)
+                if on_event is not None:
+                    on_event("sql", sql)
+                output = await self.tools[0].arun(sql)
+            except Exception as e:
+                # Hand the failed attempt to the agent so it can repair it.
+                prompt = repair_prompt.format(prompt=prompt, sql=sql or "(none)", error=e)
+            else:
+                if use_cache:
+                    await asyncio.to_thread(self.semantic_cache.store, question, table_schema, sql)
+                return {
+                    'output': output,
+                    'result_handle': SqlQueryTool.handle_of(output),
+                    'intermediate_steps': [],
+                    'sql': sql,
+                    'cache_hit': False,
+                    'mode': 'direct',
+                }
+
+        with span("agent.run") as run_span:
+            response = await self.agent_chain.acall(prompt, callbacks=[_AgentCallbackHandler(on_event)])
+            run_span.set(steps=len(response.get('intermediate_steps') or []))
         
         if 'intermediate_steps' in response and response['intermediate_steps']:
             for step in response['intermediate_steps']:
@@ -68,10 +337,18 @@ class AppReact():
                     action, observation = step
                     # Check if this step used the sql_query tool
                     if hasattr(action, 'tool') and action.tool == 'sql_query':
-                        # Return the raw query results directly
+                        sql = action.tool_input if isinstance(action.tool_input, str) else action.tool_input.get('query')
+                        handle = SqlQueryTool.handle_of(observation)
+                        if use_cache and handle is not None:
+                            await asyncio.to_thread(self.semantic_cache.store, question, table_schema, sql)
+                        # Return the query results rather than the agent's final answer
                         return {
                             'output': observation,
-                            'intermediate_steps': response.get('intermediate_steps', [])
+                            'result_handle': handle,
+                            'intermediate_steps': response.get('intermediate_steps', []),
+                            'sql': sql,
+                            'cache_hit': False,
+                            'mode': 'agent',
                         }
         
         # Fallback to original response if no sql_query tool was used
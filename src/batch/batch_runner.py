@@ -0,0 +1,210 @@
+"""Headless batch question runner for Excel Query Bot.
+
+Runs saved questions from a JSONL file against already loaded tables, for
+regression checks and cache pre-warming, and prints a latency summary.
+
+Usage:
+    python -m src.batch.batch_runner questions.jsonl results.jsonl --concurrency 8
+
+Classes:
+    BatchRunner: Runs questions through AppReact with bounded concurrency.
+
+Functions:
+    main: Command line entry point.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from src.agents.tools import sql_timings
+from src.agents.workflow import llm_timings
+from src.core import resources
+from src.core.prompts import system_prompt
+from src.core.tracing import span
+from src.generator.scheduler import llm_priority
+
+STAGES = ("total", "llm", "sql")
+PERCENTILES = (50, 90, 99)
+
+
+class BatchRunner:
+    """Runs questions through AppReact with bounded concurrency.
+
+    Attributes:
+        agent_workflow (AppReact): Agent used to answer every question.
+        table_schema (str): Prompt schema of the tables being queried.
+        concurrency (int): Maximum number of questions in flight.
+        tables (Optional[List[str]]): Tables the questions may read.
+
+    """
+
+    def __init__(self, agent_workflow, table_schema: str, concurrency: int = 4, tables=None):
+        """Initialize the runner.
+
+        Args:
+            agent_workflow (AppReact): Agent used to answer every question.
+            table_schema (str): Prompt schema of the tables being queried.
+            concurrency (int, optional): Maximum number of questions in flight.
+                Defaults to 4.
+            tables (List[str], optional): Tables the questions may read.
+                Defaults to every registered table.
+
+        """
+        self.agent_workflow = agent_workflow
+        self.table_schema = table_schema
+        self.concurrency = concurrency
+        self.tables = tables
+
+    async def _run_one(self, semaphore, item):
+        """Answer one question and return its result record."""
+        question = item["question"]
+        # Interactive sessions sharing the model deployment are served first.
+        llm_priority.set("batch")
+        async with semaphore:
+            timings, model_timings = [], []
+            sql_timings.set(timings)
+            llm_timings.set(model_timings)
+            started = time.perf_counter()
+            record = {
+                "id": item.get("id"), "question": question, "sql": None, "cache_hit": False,
+                "rows": None, "result": None, "error": None,
+            }
+            with span("question", id=item.get("id"), batch=True) as question_span:
+                try:
+                    response = await self.agent_workflow.aexecute(
+                        prompt=system_prompt.format(table_schema=self.table_schema, user_query=question),
+                        question=question,
+                        table_schema=self.table_schema,
+                        tables=self.tables,
+                    )
+                    output = (
+                        self.agent_workflow.result(response["result_handle"])
+                        if response.get("result_handle") else response.get("output")
+                    )
+                    record["sql"] = response.get("sql")
+                    record["cache_hit"] = response.get("cache_hit", False)
+                    with span("result.serialize"):
+                        if isinstance(output, pd.DataFrame):
+                            record["rows"] = len(output)
+                            record["result"] = json.loads(output.to_json(orient="records", date_format="iso"))
+                        else:
+                            record["result"] = None if output is None else str(output)
+                except Exception as e:
+                    record["error"] = str(e)
+                question_span.set(cache_hit=record["cache_hit"], rows=record["rows"], error=record["error"])
+            total = time.perf_counter() - started
+            record["total_seconds"] = total
+            record["sql_seconds"] = sum(timings)
+            record["llm_seconds"] = sum(model_timings)
+            return record
+
+    async def arun(self, items):
+        """Answer all questions, keeping at most ``concurrency`` in flight.
+
+        Args:
+            items (List[dict]): Question records with a ``question`` key and
+                an optional ``id``.
+
+        Returns:
+            List[dict]: Result records in input order.
+
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        return await asyncio.gather(*(self._run_one(semaphore, item) for item in items))
+
+    @staticmethod
+    def summarize(records, wall_seconds: float) -> str:
+        """Render a throughput and per-stage latency percentile summary.
+
+        Args:
+            records (List[dict]): Result records from ``arun``.
+            wall_seconds (float): Wall-clock time of the whole batch.
+
+        Returns:
+            str: Human readable summary.
+
+        """
+        failed = sum(1 for record in records if record["error"])
+        lines = [
+            f"questions: {len(records)}  failed: {failed}  "
+            f"cache hits: {sum(1 for record in records if record['cache_hit'])}",
+            f"wall time: {wall_seconds:.2f}s  throughput: {len(records) / wall_seconds if wall_seconds else 0.0:.2f} questions/s",
+            f"{'stage':<6}" + "".join(f"{f'p{p}':>10}" for p in PERCENTILES) + f"{'max':>10}",
+        ]
+        for stage in STAGES:
+            values = np.array([record[f"{stage}_seconds"] for record in records]) if records else np.zeros(1)
+            cells = "".join(f"{np.percentile(values, p):>9.3f}s" for p in PERCENTILES)
+            lines.append(f"{stage:<6}{cells}{values.max():>9.3f}s")
+        return "\n".join(lines)
+
+
+def write_results(records, output_path: str):
+    """Write result records as JSONL, or as Parquet for a ``.parquet`` path.
+
+    Args:
+        records (List[dict]): Result records from ``BatchRunner.arun``.
+        output_path (str): Destination file.
+
+    """
+    if output_path.endswith(".parquet"):
+        df = pd.DataFrame(records)
+        df["result"] = df.get("result", pd.Series(None, index=df.index, dtype=object)).map(json.dumps)
+        df.to_parquet(output_path, index=False)
+        return
+    with open(output_path, "w", encoding="utf-8") as handle:
+        for record in records:
+            handle.write(json.dumps(record, default=str) + "\n")
+
+
+def main(argv=None):
+    """Command line entry point.
+
+    Args:
+        argv (List[str], optional): Arguments, defaults to ``sys.argv[1:]``.
+
+    """
+    parser = argparse.ArgumentParser(description="Run saved questions against loaded tables.")
+    parser.add_argument("questions", help="JSONL file with one {\"question\": ..., \"id\": ...} object per line")
+    parser.add_argument("output", help="Results file (.jsonl or .parquet)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum questions in flight")
+    parser.add_argument("--tables", nargs="*", help="Tables to query, e.g. uploaded EXCEL_TABLE_NAME_<hash> tables (default: EXCEL_TABLE_NAME)")
+    args = parser.parse_args(argv)
+
+    cfg = resources.get_config()
+    resources.get_tracer(cfg)
+    db = resources.get_database(cfg)
+    table_names = args.tables or [cfg["EXCEL_TABLE_NAME"]]
+    for table_name in table_names:
+        db.register_table(table_name)
+    # Keep uploaded tables from being collected while the batch runs.
+    registry = resources.get_table_registry(cfg)
+    session_id = f"batch-{uuid.uuid4().hex}"
+    registry.acquire(session_id, [table_name for table_name in table_names if registry.is_dataset_table(table_name)])
+
+    table_schema = db.extract_schemas(table_names)
+    runner = BatchRunner(
+        resources.get_agent(cfg), table_schema, concurrency=args.concurrency, tables=table_names,
+    )
+
+    with open(args.questions, encoding="utf-8") as handle:
+        items = [json.loads(line) for line in handle if line.strip()]
+
+    started = time.perf_counter()
+    try:
+        records = asyncio.run(runner.arun(items))
+    finally:
+        registry.release(session_id)
+    wall_seconds = time.perf_counter() - started
+
+    write_results(records, args.output)
+    print(BatchRunner.summarize(records, wall_seconds))
+
+
+if __name__ == "__main__":
+    main()
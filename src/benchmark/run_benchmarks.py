@@ -0,0 +1,322 @@
+"""Offline benchmark suite for Excel Query Bot.
+
+Generates synthetic workbooks at several sizes and widths, then measures
+ingest throughput and peak memory, schema extraction latency and question
+latency against a local database. Questions go through AppReact driven by
+ScriptedGenerator, so no network is used and runs are repeatable. Results
+can be saved as a baseline and later runs compared against it.
+
+Usage:
+    python -m src.benchmark.run_benchmarks --save-baseline .cache/benchmarks/baseline.json
+    python -m src.benchmark.run_benchmarks --baseline .cache/benchmarks/baseline.json
+
+Functions:
+    build_config: Benchmark configuration on a given backend.
+    bench_ingest: Measure ingest throughput and peak memory.
+    bench_schema: Measure schema extraction latency.
+    bench_queries: Measure question latency through AppReact.
+    compare: Compare results against a baseline.
+    main: Command line entry point.
+
+Attributes:
+    SCENARIOS (Dict[str, Tuple[int, int]]): ``(rows, columns)`` per scenario name.
+    QUESTIONS (Dict[str, str]): Canned SQL per benchmark question.
+    HIGHER_IS_BETTER (Set[str]): Metrics where a larger value is an improvement.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+from dynaconf import Dynaconf
+
+from src.agents.tools import sql_timings
+from src.agents.workflow import AppReact
+from src.benchmark.scripted_generator import ScriptedGenerator
+from src.benchmark.workbooks import generate_workbook
+from src.core.database import Database
+from src.core.prompts import system_prompt
+from src.core.query_guard import QueryGuard
+from src.file_processor.excel_processor import ExcelProcessor
+
+SCENARIOS = {
+    "small": (10_000, 10),
+    "medium": (100_000, 10),
+    "wide": (20_000, 100),
+    "large": (500_000, 10),
+}
+
+TABLE_NAME = "excel_table"
+
+QUESTIONS = {
+    "How many orders are there?": f'SELECT COUNT(*) AS order_count FROM "{TABLE_NAME}"',
+    "What is the total amount by region?": (
+        f'SELECT region, SUM(amount) AS total_amount FROM "{TABLE_NAME}" GROUP BY region'
+    ),
+    "Which 10 products sold the most units?": (
+        f'SELECT product, SUM(quantity) AS total_quantity FROM "{TABLE_NAME}" '
+        f'GROUP BY product ORDER BY total_quantity DESC LIMIT 10'
+    ),
+    "List orders above 990.": f'SELECT * FROM "{TABLE_NAME}" WHERE amount > 990',
+    "Show all orders.": f'SELECT * FROM "{TABLE_NAME}"',
+}
+
+HIGHER_IS_BETTER = {"ingest_rows_per_second"}
+
+
+def _median_seconds(fn, repeats: int) -> float:
+    """Median wall time of ``repeats`` calls of ``fn``."""
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def build_config(backend: str, directory: str):
+    """Build the benchmark configuration on a given backend.
+
+    Embedded backends use a database file in ``directory``; 'postgresql'
+    uses the database configured in ``config/``. The workbook cache, the
+    semantic and result caches and tracing are disabled so every run does
+    the full work.
+
+    Args:
+        backend (str): 'sqlite', 'duckdb' or 'postgresql'.
+        directory (str): Scratch directory for embedded database files.
+
+    Returns:
+        dynaconf.Dynaconf: Configuration object.
+
+    """
+    cfg = Dynaconf(settings_files=[
+        "config/config.toml",
+        "config/.secrets.toml"
+    ])
+    cfg.set("EXCEL_TABLE_NAME", TABLE_NAME)
+    cfg.set("CACHE.ENABLED", False)
+    cfg.set("TRACING.ENABLED", False)
+    if backend != "postgresql":
+        cfg.set("RDBMS.NAME", backend)
+        cfg.set("RDBMS.DATABASE_NAME", os.path.join(directory, f"benchmark.{backend}"))
+    return cfg
+
+
+def bench_ingest(processor, file_path: str, rows: int, streaming: bool, repeats: int):
+    """Measure ingest throughput and peak Python memory of one workbook.
+
+    Args:
+        processor (ExcelProcessor): Processor writing to the benchmark database.
+        file_path (str): Workbook to ingest.
+        rows (int): Data rows in the workbook.
+        streaming (bool): Use ``process_excel_streaming`` instead of ``process_excel``.
+        repeats (int): Timed runs; the median is reported.
+
+    Returns:
+        Dict[str, float]: ``ingest_seconds``, ``ingest_rows_per_second`` and ``ingest_peak_mb``.
+
+    """
+    ingest = processor.process_excel_streaming if streaming else processor.process_excel
+    seconds = _median_seconds(lambda: ingest(file_path), repeats)
+
+    # Memory is measured in a separate run, tracemalloc slows allocations down.
+    tracemalloc.start()
+    try:
+        ingest(file_path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "ingest_seconds": seconds,
+        "ingest_rows_per_second": rows / seconds if seconds else 0.0,
+        "ingest_peak_mb": peak / 2**20,
+    }
+
+
+def bench_schema(db, repeats: int):
+    """Measure schema extraction latency with a cold and a warm schema cache.
+
+    Args:
+        db (Database): Benchmark database holding the ingested table.
+        repeats (int): Timed runs per measurement; the median is reported.
+
+    Returns:
+        Dict[str, float]: ``schema_cold_ms`` and ``schema_warm_ms``.
+
+    """
+    def cold():
+        db.bump_table_version(TABLE_NAME)
+        db.extract_schemas([TABLE_NAME])
+
+    return {
+        "schema_cold_ms": _median_seconds(cold, repeats) * 1000,
+        "schema_warm_ms": _median_seconds(lambda: db.extract_schemas([TABLE_NAME]), repeats) * 1000,
+    }
+
+
+def bench_queries(agent_workflow, table_schema: str, repeats: int):
+    """Measure question latency through AppReact with the scripted generator.
+
+    Args:
+        agent_workflow (AppReact): Agent driven by a ScriptedGenerator.
+        table_schema (str): Schema the prompts are built from.
+        repeats (int): Runs per question; the median is reported.
+
+    Returns:
+        Dict[str, float]: Per question slug, the total, SQL and agent
+            (total minus SQL) latency in milliseconds, and the result rows.
+
+    """
+    metrics = {}
+    for question_number, question in enumerate(QUESTIONS, start=1):
+        totals, sqls, rows = [], [], 0
+        prompt = system_prompt.format(table_schema=table_schema, user_query=question)
+        for _ in range(repeats):
+            timings = []
+            token = sql_timings.set(timings)
+            try:
+                started = time.perf_counter()
+                response = agent_workflow.execute(prompt=prompt, question=question, table_schema=table_schema)
+                totals.append(time.perf_counter() - started)
+            finally:
+                sql_timings.reset(token)
+            sqls.append(sum(timings))
+            output = response.get("output")
+            rows = len(output) if isinstance(output, pd.DataFrame) else 0
+        slug = f"q{question_number}"
+        metrics[f"{slug}_total_ms"] = statistics.median(totals) * 1000
+        metrics[f"{slug}_sql_ms"] = statistics.median(sqls) * 1000
+        metrics[f"{slug}_agent_ms"] = max(metrics[f"{slug}_total_ms"] - metrics[f"{slug}_sql_ms"], 0.0)
+        metrics[f"{slug}_rows"] = rows
+    return metrics
+
+
+def run_scenario(cfg, rows: int, columns: int, workbook_dir: str, streaming: bool, repeats: int):
+    """Run every benchmark of one scenario on a fresh database interface.
+
+    Args:
+        cfg (dynaconf.Dynaconf): Benchmark configuration.
+        rows (int): Data rows of the synthetic workbook.
+        columns (int): Columns of the synthetic workbook.
+        workbook_dir (str): Directory the generated workbooks are kept in.
+        streaming (bool): Measure the streaming ingest path.
+        repeats (int): Timed runs per measurement.
+
+    Returns:
+        Dict[str, float]: All metrics of the scenario.
+
+    """
+    file_path = generate_workbook(workbook_dir, rows, columns)
+    db = Database(cfg)
+    processor = ExcelProcessor(db, cfg)
+
+    metrics = {"rows": rows, "columns": columns}
+    metrics.update(bench_ingest(processor, file_path, rows, streaming, repeats))
+    metrics.update(bench_schema(db, repeats=max(repeats, 10)))
+
+    agent_workflow = AppReact(
+        generator=ScriptedGenerator(script=QUESTIONS),
+        text_db=db,
+        max_rows=int(cfg.get("QUERY", {}).get("MAX_ROWS", 100000)),
+        fetch_batch_size=int(cfg.get("QUERY", {}).get("FETCH_BATCH_SIZE", 10000)),
+        guard=QueryGuard(db, cfg),
+        mode=cfg.get("QUERY", {}).get("MODE", "direct"),
+    )
+    metrics.update(bench_queries(agent_workflow, db.extract_schemas([TABLE_NAME]), repeats))
+    db.engine.dispose()
+    return metrics
+
+
+def compare(results, baseline, tolerance: float):
+    """Compare results against a baseline.
+
+    Args:
+        results (Dict[str, Dict[str, float]]): Metrics per scenario.
+        baseline (Dict[str, Dict[str, float]]): Baseline metrics per scenario.
+        tolerance (float): Relative change tolerated before a metric counts
+            as a regression.
+
+    Returns:
+        Tuple[List[str], List[str]]: Report lines and the regressed metric names.
+
+    """
+    lines, regressions = [], []
+    for scenario, metrics in results.items():
+        for metric, value in metrics.items():
+            base = baseline.get(scenario, {}).get(metric)
+            if base is None or metric in ("rows", "columns") or metric.endswith("_rows") or not base:
+                continue
+            change = (value - base) / base
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = ""
+            if worse > tolerance:
+                flag = "  REGRESSION"
+                regressions.append(f"{scenario}/{metric}")
+            elif worse < -tolerance:
+                flag = "  improved"
+            lines.append(f"{scenario + '/' + metric:<36}{base:>14.2f}{value:>14.2f}{change:>+9.1%}{flag}")
+    return lines, regressions
+
+
+def main(argv=None):
+    """Command line entry point.
+
+    Args:
+        argv (List[str], optional): Arguments, defaults to ``sys.argv[1:]``.
+
+    """
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    parser.add_argument("--scenarios", nargs="*", default=["small", "medium", "wide"], choices=sorted(SCENARIOS))
+    parser.add_argument("--backend", default="sqlite", choices=["sqlite", "duckdb", "postgresql"])
+    parser.add_argument("--mode", default="stream", choices=["stream", "parse"], help="Ingest path to measure")
+    parser.add_argument("--query-mode", default="direct", choices=["direct", "agent"], help="AppReact mode to measure")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per measurement")
+    parser.add_argument("--workbooks", default=".cache/benchmarks", help="Directory for generated workbooks")
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument("--save-baseline", help="Write the results as a baseline file")
+    parser.add_argument("--baseline", help="Compare against a baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Relative change counted as a regression")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        cfg = build_config(args.backend, directory)
+        cfg.set("QUERY.MODE", args.query_mode)
+        for name in args.scenarios:
+            rows, columns = SCENARIOS[name]
+            print(f"running {name} ({rows:,} rows x {columns} columns) on {args.backend}...", file=sys.stderr)
+            results[name] = run_scenario(cfg, rows, columns, args.workbooks, args.mode == "stream", args.repeats)
+
+    for name, metrics in results.items():
+        print(f"[{name}]")
+        for metric, value in metrics.items():
+            print(f"  {metric:<26}{value:>14.2f}")
+
+    document = {"backend": args.backend, "mode": args.mode, "query_mode": args.query_mode, "results": results}
+    for path in filter(None, (args.output, args.save_baseline)):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(document, handle, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        if (baseline.get("backend"), baseline.get("mode")) != (args.backend, args.mode):
+            print(f"warning: baseline was recorded with {baseline.get('backend')}/{baseline.get('mode')}", file=sys.stderr)
+        lines, regressions = compare(results, baseline.get("results", {}), args.tolerance)
+        print(f"{'metric':<36}{'baseline':>14}{'current':>14}{'change':>9}")
+        print("\n".join(lines))
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed beyond {args.tolerance:.0%}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Deterministic offline generator for Excel Query Bot benchmarks.
+
+Classes:
+    ScriptedGenerator: Chat model that answers the ReAct agent with canned SQL.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import time
+from typing import Dict, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from src.generator.base_generator import AbstractGenrator
+
+_USER_QUESTION = re.compile(r"User Question:\s*\n(.*?)\n", re.DOTALL)
+
+
+class ScriptedGenerator(AbstractGenrator, BaseChatModel):
+    """Chat model that answers the ReAct agent with canned SQL, without a network.
+
+    Single-shot prompts asking for ``{"sql": ...}`` get the SQL scripted for
+    the question as a JSON object. In the ReAct loop, the first turn calls
+    ``sql_query`` with that SQL and, once the scratchpad holds an
+    observation, the model gives its final answer. An optional fixed latency
+    stands in for the model's response time, so runs are repeatable.
+
+    Attributes:
+        script (Dict[str, str]): SQL per user question.
+        default_sql (Optional[str]): SQL for questions missing from the script.
+        latency_seconds (float): Simulated response time of every call.
+
+    """
+
+    script: Dict[str, str]
+    default_sql: Optional[str] = None
+    latency_seconds: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _respond(self, messages) -> ChatResult:
+        """Build the next ReAct turn for the conversation in ``messages``."""
+        prompt = "\n".join(str(message.content) for message in messages)
+        if "Observation:" in prompt:
+            text = " I now know the final answer\nFinal Answer: The query results are shown above."
+        else:
+            match = _USER_QUESTION.search(prompt)
+            question = match.group(1).strip() if match else prompt.strip()
+            sql = self.script.get(question, self.default_sql)
+            if sql is None:
+                raise ValueError(f"No scripted SQL for question: {question!r}")
+            if '{"sql":' in prompt and "Action Input" not in prompt:
+                text = json.dumps({"sql": sql})
+            else:
+                text = f" I should query the table.\nAction: sql_query\nAction Input: {sql}"
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return self._respond(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return self._respond(messages)
+
+    def generate_response(self: ScriptedGenerator, input_text: str) -> str:
+        """Return the scripted ReAct turn for a prompt.
+
+        Args:
+            input_text (str): Prompt text containing the user question.
+
+        Returns:
+            str: The scripted response content.
+
+        """
+        return self.invoke(input_text).content
@@ -0,0 +1,83 @@
+"""Synthetic workbook generation for Excel Query Bot benchmarks.
+
+Functions:
+    synthetic_frame: Build a deterministic order-like DataFrame.
+    generate_workbook: Write a synthetic workbook, reusing an existing one.
+
+Attributes:
+    BASE_COLUMNS (List[str]): Columns present in every synthetic workbook,
+        which the scripted benchmark questions query.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+BASE_COLUMNS = ["order_id", "region", "product", "quantity", "amount", "order_date"]
+
+_REGIONS = ["north", "south", "east", "west", "central", "coastal", "mountain", "island"]
+
+
+def synthetic_frame(rows: int, columns: int, seed: int = 0) -> pd.DataFrame:
+    """Build a deterministic order-like DataFrame.
+
+    The first columns are ``BASE_COLUMNS``: a unique id, a low-cardinality
+    region (8 values), a product (200 values), an integer quantity, a
+    decimal amount and a date. Extra columns cycle through integer, decimal,
+    text and date columns so wide sheets mix types like real exports.
+
+    Args:
+        rows (int): Number of data rows.
+        columns (int): Number of columns, at least ``len(BASE_COLUMNS)``.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        pd.DataFrame: The synthetic data.
+
+    """
+    if columns < len(BASE_COLUMNS):
+        raise ValueError(f"Synthetic workbooks need at least {len(BASE_COLUMNS)} columns, got {columns}")
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2023-01-01")
+    data = {
+        "order_id": np.arange(1, rows + 1),
+        "region": rng.choice(_REGIONS, size=rows),
+        "product": np.char.add("product_", rng.integers(0, 200, size=rows).astype(str)),
+        "quantity": rng.integers(1, 100, size=rows),
+        "amount": np.round(rng.uniform(1, 1000, size=rows), 2),
+        "order_date": start + rng.integers(0, 730, size=rows).astype("timedelta64[D]"),
+    }
+    for idx in range(len(BASE_COLUMNS), columns):
+        kind = idx % 4
+        if kind == 0:
+            data[f"metric_{idx}"] = rng.integers(0, 1_000_000, size=rows)
+        elif kind == 1:
+            data[f"ratio_{idx}"] = np.round(rng.random(size=rows), 4)
+        elif kind == 2:
+            data[f"label_{idx}"] = np.char.add("label_", rng.integers(0, 1000, size=rows).astype(str))
+        else:
+            data[f"date_{idx}"] = start + rng.integers(0, 3650, size=rows).astype("timedelta64[D]")
+    return pd.DataFrame(data)
+
+
+def generate_workbook(directory: str, rows: int, columns: int, seed: int = 0) -> str:
+    """Write a synthetic workbook, reusing it when it was already generated.
+
+    Args:
+        directory (str): Directory the workbooks are kept in.
+        rows (int): Number of data rows.
+        columns (int): Number of columns.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        str: Path of the ``.xlsx`` file.
+
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"synthetic_{rows}x{columns}_seed{seed}.xlsx")
+    if not os.path.exists(path):
+        tmp_path = f"{path}.tmp.xlsx"
+        synthetic_frame(rows, columns, seed).to_excel(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    return path
@@ -1,19 +1,64 @@
 """Database interface module for Excel Query Bot.
 
 Classes:
+    IngestRecord: Registry row mapping a loaded table to its source content hash.
     Database: Main database interface class for Excel data operations.
 """
 
-from sqlalchemy import create_engine, inspect
+import csv
+import io
+import threading
+import time
+import uuid
+from collections import deque
+
+from sqlalchemy import bindparam, create_engine, inspect
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.types import Date
 from sqlmodel import JSON, Column, Field, Session, SQLModel, create_engine, text, Integer, select
 from typing import Dict, NoReturn, Optional, List, Any
 
+from src.core.tracing import span
+
+# Backends that run in-process; DATABASE_NAME is a file path or ':memory:'.
+EMBEDDED_BACKENDS = ('duckdb', 'sqlite')
+
+# Hidden column holding a hash of every loaded row, used for incremental
+# reloads; it is left out of schemas, profiles and query results.
+ROW_HASH_COLUMN = '_row_hash'
+
+
+class IngestRecord(SQLModel, table=True):
+    """Registry row mapping a loaded table to the content hash of its source file.
+
+    Attributes:
+        table_name (str): Name of the loaded table.
+        content_hash (str): Hash of the workbook content the table was loaded from.
+
+    """
+    __tablename__ = "ingest_registry"
+
+    table_name: str = Field(primary_key=True)
+    content_hash: str
+
+
 class Database:
     """SQLAlchemy-based database interface for Excel data operations.
 
     Attributes:
+        backend (str): Database backend name ('postgresql', 'duckdb' or 'sqlite').
         db_url (str): SQLAlchemy database connection string.
+        pool_size (int): Number of pooled connections available to concurrent writers.
+        async_db_url (Optional[str]): Connection string for the async driver, if any.
         engine (sqlalchemy.Engine): SQLAlchemy engine for database operations.
+        copy_chunk_size (int): Rows buffered per COPY batch on PostgreSQL.
+        tables (List[str]): Tables written through this interface, in load order.
+        table_versions (Dict[str, int]): Data version per table, bumped on every write.
+        instance_id (str): Random identifier distinguishing this interface's versions
+            from those of other instances.
+        query_log (Deque[Tuple[float, str, float]]): Recent ``(timestamp, sql, seconds)``
+            of queries executed by SqlQueryTool, used for index tuning.
 
     """
     def __init__(self, cfg):
@@ -22,47 +67,507 @@ class Database:
         Args:
             cfg (dynaconf.Dynaconf): Configuration object containing database settings.
                 Expected structure:
-                - RDBMS.NAME: Database type (e.g., 'postgresql')
+                - RDBMS.NAME: Database type ('postgresql', or the embedded
+                  'duckdb' / 'sqlite' backends)
                 - RDBMS.USERNAME: Database username
                 - RDBMS_PASSWORD.PASSWORD: Database password
                 - RDBMS.HOST: Database host address
                 - RDBMS.PORT: Database port number
-                - RDBMS.DATABASE_NAME: Target database name
+                - RDBMS.DATABASE_NAME: Target database name, or for embedded
+                  backends a file path or ':memory:' (the default)
+                Embedded backends ignore the credential and host keys.
+                Optional keys:
+                - RDBMS.COPY_CHUNK_SIZE: Rows per COPY batch (default 100000)
+                - RDBMS.POOL_SIZE: Connections kept in the engine pool (default 5)
+                - RDBMS.MAX_OVERFLOW: Extra connections allowed under load (default 10)
+                - RDBMS.POOL_PRE_PING: Check pooled connections before use (default true)
+                - RDBMS.POOL_RECYCLE: Seconds after which connections are replaced (default 1800)
+                - RDBMS.ASYNC_DRIVER: Async DBAPI driver for ``async_engine``
+                  (default 'asyncpg' on PostgreSQL, none elsewhere)
+                - RDBMS.QUERY_LOG_SIZE: Executed queries kept in ``query_log``
+                  (default 1000)
 
         """
-        self.db_url = f"{cfg['RDBMS']['NAME']}://{cfg['RDBMS']['USERNAME']}:{cfg['RDBMS_PASSWORD']['PASSWORD']}@{cfg['RDBMS']['HOST']}:{cfg['RDBMS']['PORT']}/{cfg['RDBMS']['DATABASE_NAME']}"
-        self.engine = create_engine(self.db_url)
+        self.backend = cfg['RDBMS']['NAME']
+        self.pool_size = int(cfg['RDBMS'].get('POOL_SIZE', 5))
+        pool_options = {
+            'pool_size': self.pool_size,
+            'max_overflow': int(cfg['RDBMS'].get('MAX_OVERFLOW', 10)),
+            'pool_pre_ping': bool(cfg['RDBMS'].get('POOL_PRE_PING', True)),
+            'pool_recycle': int(cfg['RDBMS'].get('POOL_RECYCLE', 1800)),
+        }
+        self._pool_options = pool_options
+        if self.backend in EMBEDDED_BACKENDS:
+            database = cfg['RDBMS'].get('DATABASE_NAME') or ':memory:'
+            self.db_url = f"{self.backend}:///{database}"
+            if database == ':memory:':
+                # Every new connection would open a separate empty in-memory
+                # database, so share a single connection instead.
+                self.pool_size = 1
+                connect_args = {'check_same_thread': False} if self.backend == 'sqlite' else {}
+                self.engine = create_engine(self.db_url, poolclass=StaticPool, connect_args=connect_args)
+            else:
+                self.engine = create_engine(self.db_url, **pool_options)
+        else:
+            self.db_url = f"{cfg['RDBMS']['NAME']}://{cfg['RDBMS']['USERNAME']}:{cfg['RDBMS_PASSWORD']['PASSWORD']}@{cfg['RDBMS']['HOST']}:{cfg['RDBMS']['PORT']}/{cfg['RDBMS']['DATABASE_NAME']}"
+            self.engine = create_engine(self.db_url, **pool_options)
+        self.copy_chunk_size = int(cfg['RDBMS'].get('COPY_CHUNK_SIZE', 100000))
+        async_driver = cfg['RDBMS'].get('ASYNC_DRIVER', 'asyncpg') if self.backend == 'postgresql' else None
+        self.async_db_url = (
+            self.db_url.replace("://", f"+{async_driver}://", 1) if async_driver else None
+        )
+        self._async_engine = None
+        self.tables = []
+        self._tables_lock = threading.Lock()
+        self._registry_ready = False
+        self.table_versions = {}
+        self.instance_id = uuid.uuid4().hex
+        self._schema_cache = {}
+        self.query_log = deque(maxlen=int(cfg['RDBMS'].get('QUERY_LOG_SIZE', 1000)))
         
-    def save_df(self, df, table_name: str):
+    @property
+    def async_engine(self):
+        """SQLAlchemy async engine on the async driver, created on first use.
+
+        Returns:
+            Optional[sqlalchemy.ext.asyncio.AsyncEngine]: The engine, or None
+                when no async driver is configured.
+
+        """
+        if self._async_engine is None and self.async_db_url:
+            self._async_engine = create_async_engine(self.async_db_url, **self._pool_options)
+        return self._async_engine
+
+    @staticmethod
+    def _copy_insert(table, conn, keys, data_iter):
+        """Insert rows with PostgreSQL ``COPY FROM STDIN``.
+
+        Used as the ``method`` callable of ``DataFrame.to_sql`` so pandas still
+        creates the table with its column type mapping while rows are streamed
+        through an in-memory CSV buffer instead of batched INSERTs.
+
+        Args:
+            table (pandas.io.sql.SQLTable): Target table wrapper from pandas.
+            conn (sqlalchemy.engine.Connection): Connection inside the load transaction.
+            keys (List[str]): Column names in row order.
+            data_iter (Iterable[tuple]): Row values for the current chunk.
+
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in data_iter:
+            writer.writerow(['\\N' if value is None else value for value in row])
+        buffer.seek(0)
+
+        columns = ', '.join(f'"{key}"' for key in keys)
+        target = f'"{table.schema}"."{table.name}"' if table.schema else f'"{table.name}"'
+        with conn.connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {target} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buffer,
+            )
+
+    @staticmethod
+    def _duckdb_load(connection, df, table_name: str, if_exists: str, dtype=None):
+        """Load a DataFrame into DuckDB by scanning it in place.
+
+        The DataFrame is registered as a view on the DuckDB connection, so the
+        table is built directly from its column buffers without serializing
+        rows through SQL. Column types follow the DataFrame dtypes, which
+        DuckDB maps at least as tightly as ``dtype`` (TINYINT for int8, ENUM
+        for categoricals); only DATE columns, which have no pandas dtype, are
+        cast.
+
+        Args:
+            connection (sqlalchemy.engine.Connection): Connection inside the load transaction.
+            df (pd.DataFrame): The DataFrame containing data to be saved.
+            table_name (str): Target table name in the database.
+            if_exists (str): 'replace' or 'append'.
+            dtype (Dict[str, TypeEngine], optional): SQL column types by name.
+
+        """
+        view_name = f"_load_{uuid.uuid4().hex}"
+        dates = {name for name, column_type in (dtype or {}).items() if isinstance(column_type, Date)}
+        selected = ", ".join(
+            f'CAST("{name}" AS DATE) AS "{name}"' if name in dates else f'"{name}"' for name in df.columns
+        ) if dates else "*"
+        duckdb_connection = connection.connection.driver_connection
+        duckdb_connection.register(view_name, df)
+        try:
+            if if_exists == 'replace':
+                connection.exec_driver_sql(f'CREATE OR REPLACE TABLE "{table_name}" AS SELECT {selected} FROM "{view_name}"')
+            else:
+                connection.exec_driver_sql(f'CREATE TABLE IF NOT EXISTS "{table_name}" AS SELECT {selected} FROM "{view_name}" LIMIT 0')
+                connection.exec_driver_sql(f'INSERT INTO "{table_name}" SELECT {selected} FROM "{view_name}"')
+        finally:
+            duckdb_connection.unregister(view_name)
+
+    def save_df(self, df, table_name: str, if_exists: str = 'replace', dtype=None):
         """Save a pandas DataFrame to a database table with optimized performance.
 
+        On PostgreSQL the table is created from the DataFrame dtypes and rows
+        are bulk loaded with ``COPY FROM STDIN``; on DuckDB the DataFrame is
+        scanned in place; other engines fall back to batched INSERTs through
+        ``to_sql``.
+
         Args:
             df (pd.DataFrame): The DataFrame containing data to be saved.
             table_name (str): Target table name in the database.
+            if_exists (str, optional): Behaviour when the table already exists,
+                as accepted by ``DataFrame.to_sql`` ('replace' or 'append').
+                Defaults to 'replace'.
+            dtype (Dict[str, TypeEngine], optional): SQL types of the columns
+                when the table is created, e.g. from ``TypeInferrer.sql_types``.
+                Defaults to the pandas mapping of the DataFrame dtypes.
 
         """        
-        with self.engine.connect() as connection:
-            df.to_sql(table_name, con=connection, if_exists='replace', index=False, chunksize=1000)
+        with span("db.write", table=table_name, rows=len(df), columns=len(df.columns), mode=if_exists, backend=self.backend):
+            if self.engine.dialect.name == 'postgresql':
+                with self.engine.begin() as connection:
+                    df.to_sql(
+                        table_name,
+                        con=connection,
+                        if_exists=if_exists,
+                        index=False,
+                        chunksize=self.copy_chunk_size,
+                        method=self._copy_insert,
+                        dtype=dtype,
+                    )
+            elif self.backend == 'duckdb':
+                with self.engine.begin() as connection:
+                    self._duckdb_load(connection, df, table_name, if_exists, dtype=dtype)
+            else:
+                with self.engine.connect() as connection:
+                    df.to_sql(table_name, con=connection, if_exists=if_exists, index=False, chunksize=1000, dtype=dtype)
+
+        if if_exists == 'replace':
+            self.record_content_hash(table_name, None)
+        self.bump_table_version(table_name)
+        self.register_table(table_name)
+
+    def bump_table_version(self, table_name: str) -> int:
+        """Mark a table's data as changed, invalidating anything cached for it.
+
+        Args:
+            table_name (str): Name of the table that was written.
+
+        Returns:
+            int: The new version of the table.
+
+        """
+        with self._tables_lock:
+            version = self.table_versions.get(table_name, 0) + 1
+            self.table_versions[table_name] = version
+            return version
+
+    def table_version(self, table_name: str) -> int:
+        """Return the current data version of a table (0 if never written here).
+
+        Args:
+            table_name (str): Name of the table.
+
+        Returns:
+            int: Current version of the table.
+
+        """
+        return self.table_versions.get(table_name, 0)
+
+    def log_query(self, query: str, seconds: float):
+        """Append an executed query and its duration to ``query_log``.
+
+        Args:
+            query (str): SQL that was executed.
+            seconds (float): Execution time in seconds.
+
+        """
+        self.query_log.append((time.time(), query, seconds))
+
+    def data_version(self) -> str:
+        """Return a token that changes whenever any table written here changes.
+
+        The token includes ``instance_id`` so it never collides with tokens of
+        another ``Database`` instance, which keeps caches shared between
+        sessions correct.
+
+        Returns:
+            str: Data version token.
+
+        """
+        with self._tables_lock:
+            versions = ",".join(f"{name}={version}" for name, version in sorted(self.table_versions.items()))
+        return f"{self.instance_id}:{versions}"
+
+    def register_table(self, table_name: str):
+        """Record a table as queryable so it is included in prompt schemas.
+
+        Args:
+            table_name (str): Name of the table to register.
+
+        """
+        with self._tables_lock:
+            if table_name not in self.tables:
+                self.tables.append(table_name)
             
-    def extract_schema(self, table_name):
-        """Extract database table schema formatted for AI prompt construction.
+    def rename_table(self, table_name: str, new_name: str):
+        """Rename a table, carrying its registration over to the new name.
 
         Args:
-            table_name (str): Name of the table to inspect.
+            table_name (str): Current name.
+            new_name (str): New name.
+
+        """
+        with self.engine.begin() as connection:
+            # The row hash index would otherwise keep the old name and be
+            # created a second time by the next delta.
+            connection.exec_driver_sql(f'DROP INDEX IF EXISTS "{self._row_hash_index(table_name)}"')
+            connection.exec_driver_sql(f'ALTER TABLE "{table_name}" RENAME TO "{new_name}"')
+        self.record_content_hash(table_name, None)
+        self.bump_table_version(table_name)
+        self.bump_table_version(new_name)
+        with self._tables_lock:
+            self.tables = [new_name if name == table_name else name for name in self.tables]
+            if new_name not in self.tables:
+                self.tables.append(new_name)
+        self._schema_cache.pop(table_name, None)
+
+    @staticmethod
+    def _row_hash_index(table_name: str) -> str:
+        return f"ix_{table_name}{ROW_HASH_COLUMN}"[:63]
+
+    def stored_row_hashes(self, table_name: str, key_columns=()):
+        """Return the row hashes (and key values) of a table loaded with ``ROW_HASH_COLUMN``.
+
+        Args:
+            table_name (str): Table to read.
+            key_columns (Sequence[str], optional): Key columns to read along.
+
+        Returns:
+            Optional[Tuple[List[str], List[tuple]]]: Data column names of the
+                table and its ``(row_hash, *keys)`` rows, or None if the table
+                does not exist or has no row hashes.
+
+        """
+        if not inspect(self.engine).has_table(table_name):
+            return None
+        columns = [col["name"] for col in inspect(self.engine).get_columns(table_name)]
+        if ROW_HASH_COLUMN not in columns or any(key not in columns for key in key_columns):
+            return None
+        selected = ", ".join(f'"{name}"' for name in (ROW_HASH_COLUMN, *key_columns))
+        with span("db.read", table=table_name, columns=len(key_columns) + 1) as read_span:
+            with self.engine.connect() as connection:
+                rows = connection.exec_driver_sql(f'SELECT {selected} FROM "{table_name}"').fetchall()
+            read_span.set(rows=len(rows))
+        return [name for name in columns if name != ROW_HASH_COLUMN], rows
+
+    def apply_delta(self, table_name: str, inserts, delete_hashes, dtype=None):
+        """Delete rows by row hash and append new rows, in one transaction.
+
+        An index on ``ROW_HASH_COLUMN`` is created on first use so deletes do
+        not scan the table.
+
+        Args:
+            table_name (str): Table to change.
+            inserts (pd.DataFrame): Rows to append, with ``ROW_HASH_COLUMN``.
+            delete_hashes (List[int]): Row hashes whose rows are deleted.
+            dtype (Dict[str, TypeEngine], optional): SQL column types, see ``save_df``.
+
+        """
+        index_name = self._row_hash_index(table_name)
+        delete = text(f'DELETE FROM "{table_name}" WHERE "{ROW_HASH_COLUMN}" IN :hashes').bindparams(
+            bindparam("hashes", expanding=True)
+        )
+        with span("db.delta", table=table_name, inserted=len(inserts), deleted=len(delete_hashes), backend=self.backend):
+            with self.engine.begin() as connection:
+                connection.exec_driver_sql(f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table_name}" ("{ROW_HASH_COLUMN}")')
+                for start in range(0, len(delete_hashes), 1000):
+                    connection.execute(delete, {"hashes": list(delete_hashes[start:start + 1000])})
+                if len(inserts):
+                    if self.backend == 'postgresql':
+                        inserts.to_sql(
+                            table_name, con=connection, if_exists='append', index=False,
+                            chunksize=self.copy_chunk_size, method=self._copy_insert,
+                        )
+                    elif self.backend == 'duckdb':
+                        self._duckdb_load(connection, inserts, table_name, 'append', dtype=dtype)
+                    else:
+                        inserts.to_sql(table_name, con=connection, if_exists='append', index=False, chunksize=1000)
+        self.bump_table_version(table_name)
+        self.register_table(table_name)
+
+    def drop_table(self, table_name: str):
+        """Drop a table and forget everything recorded about it.
+
+        Args:
+            table_name (str): Name of the table to drop.
+
+        """
+        with self.engine.begin() as connection:
+            connection.exec_driver_sql(f'DROP TABLE IF EXISTS "{table_name}"')
+        self.record_content_hash(table_name, None)
+        self.bump_table_version(table_name)
+        with self._tables_lock:
+            if table_name in self.tables:
+                self.tables.remove(table_name)
+        self._schema_cache.pop(table_name, None)
+
+    def table_size(self, table_name: str) -> int:
+        """Return the storage used by a table, in bytes.
+
+        PostgreSQL reports the size of the table with its indexes and TOAST
+        data; other backends are estimated at 8 bytes per value.
+
+        Args:
+            table_name (str): Name of the table.
+
+        Returns:
+            int: Size in bytes, 0 if the table does not exist.
+
+        """
+        if not inspect(self.engine).has_table(table_name):
+            return 0
+        with self.engine.connect() as connection:
+            if self.backend == "postgresql":
+                return int(connection.execute(
+                    text("SELECT pg_total_relation_size(to_regclass(:table_name))"),
+                    {"table_name": f'"{table_name}"'},
+                ).scalar() or 0)
+            rows = connection.exec_driver_sql(f'SELECT COUNT(*) FROM "{table_name}"').scalar()
+        return int(rows) * len(inspect(self.engine).get_columns(table_name)) * 8
+
+    def _ensure_registry(self):
+        """Create the ingest registry table on first use."""
+        if not self._registry_ready:
+            SQLModel.metadata.create_all(self.engine, tables=[IngestRecord.__table__])
+            self._registry_ready = True
+
+    def table_content_hash(self, table_name: str) -> Optional[str]:
+        """Return the content hash a table was loaded from, if it still exists.
+
+        Args:
+            table_name (str): Name of the table to look up.
+
+        Returns:
+            Optional[str]: The recorded hash, or None if the table is missing or
+                was written without one.
+
+        """
+        self._ensure_registry()
+        if not inspect(self.engine).has_table(table_name):
+            return None
+        with Session(self.engine) as session:
+            record = session.get(IngestRecord, table_name)
+            return record.content_hash if record else None
+
+    def record_content_hash(self, table_name: str, content_hash: Optional[str]):
+        """Record (or clear, with None) the source content hash of a table.
+
+        Args:
+            table_name (str): Name of the loaded table.
+            content_hash (Optional[str]): Hash of the source workbook content.
+
+        """
+        self._ensure_registry()
+        with Session(self.engine) as session:
+            record = session.get(IngestRecord, table_name)
+            if content_hash is None:
+                if record:
+                    session.delete(record)
+            else:
+                session.merge(IngestRecord(table_name=table_name, content_hash=content_hash))
+            session.commit()
+
+    def column_cardinality(self, table_name: str):
+        """Estimate the row count and number of distinct values per column.
+
+        PostgreSQL estimates come from ``pg_stats`` after ANALYZE; other
+        backends count them in one scan.
+
+        Args:
+            table_name (str): Table to inspect.
+
+        Returns:
+            Tuple[int, Dict[str, int]]: Row count and distinct count per column.
+
+        """
+        columns = [
+            col["name"] for col in inspect(self.engine).get_columns(table_name)
+            if col["name"] != ROW_HASH_COLUMN
+        ]
+        with self.engine.connect() as connection:
+            if self.backend == "postgresql":
+                rows = connection.execute(
+                    text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)"),
+                    {"table_name": f'"{table_name}"'},
+                ).scalar() or 0
+                stats = connection.execute(
+                    text(
+                        "SELECT attname, n_distinct FROM pg_stats "
+                        "WHERE schemaname = current_schema() AND tablename = :table_name"
+                    ),
+                    {"table_name": table_name},
+                )
+                distinct = {
+                    name: int(-n_distinct * rows) if n_distinct < 0 else int(n_distinct)
+                    for name, n_distinct in stats
+                }
+                return int(rows), {col: distinct.get(col, 0) for col in columns}
+
+            counts = ", ".join(f'COUNT(DISTINCT "{col}")' for col in columns)
+            result = connection.exec_driver_sql(f'SELECT COUNT(*), {counts} FROM "{table_name}"').one()
+            return int(result[0]), dict(zip(columns, (int(value) for value in result[1:])))
+
+    def _fetch_columns(self, table_names):
+        """Read column names and types of several tables from the catalog.
+
+        On PostgreSQL all tables are read with a single information_schema
+        query; other engines go through the SQLAlchemy inspector.
+
+        Args:
+            table_names (List[str]): Tables to read.
+
+        Returns:
+            Dict[str, List[Tuple[str, str]]]: ``(name, type)`` pairs per table,
+                in column order.
+
+        """
+        columns = {table_name: [] for table_name in table_names}
+        if self.engine.dialect.name == 'postgresql':
+            query = text(
+                "SELECT table_name, column_name, data_type FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = ANY(:table_names) "
+                "ORDER BY table_name, ordinal_position"
+            )
+            with self.engine.connect() as connection:
+                for table_name, column_name, data_type in connection.execute(query, {"table_names": list(table_names)}):
+                    if column_name != ROW_HASH_COLUMN:
+                        columns[table_name].append((column_name, data_type.upper()))
+        else:
+            inspector = inspect(self.engine)
+            for table_name in table_names:
+                columns[table_name] = [
+                    (col['name'], str(col['type'])) for col in inspector.get_columns(table_name)
+                    if col['name'] != ROW_HASH_COLUMN
+                ]
+        return columns
+
+    @staticmethod
+    def _render_schema(table_name, columns):
+        """Render one table's columns as the prompt schema block.
+
+        Args:
+            table_name (str): Name of the table.
+            columns (List[Tuple[str, str]]): ``(name, type)`` pairs.
 
         Returns:
             str: Formatted JSON-like string containing table schema information.
 
         """
-        inspector = inspect(self.engine)
-        columns_info = inspector.get_columns(table_name)
-        
         column_schema_lines = []
-        for col in columns_info:
+        for name, type_name in columns:
             column_schema_lines.append(
                 f"""            {{
-                    name: '{col['name']}',
-                    type: '{str(col['type'])}'
+                    name: '{name}',
+                    type: '{type_name}'
                 }}"""
             )
         
@@ -77,4 +582,73 @@ class Database:
                 }}"""
         
         return schema
-            
\ No newline at end of file
+
+    def extract_schema(self, table_name):
+        """Extract database table schema formatted for AI prompt construction.
+
+        The rendered schema is cached per table and table version, so it is
+        only read from the catalog again after ``save_df`` changes the table.
+
+        Args:
+            table_name (str): Name of the table to inspect.
+
+        Returns:
+            str: Formatted JSON-like string containing table schema information.
+
+        """
+        return self.extract_schemas([table_name])
+
+    def extract_schemas(self, table_names=None):
+        """Extract the prompt schema of several tables.
+
+        Tables whose cached schema is stale are read from the catalog in one
+        batch; the others are served from the per-table schema cache.
+
+        Args:
+            table_names (List[str], optional): Tables to include. Defaults to
+                every table registered on this interface.
+
+        Returns:
+            str: Schema blocks of all requested tables, comma separated.
+
+        """
+        table_names = self._refresh_schemas(table_names)
+        return ",\n".join(self._schema_cache[table_name][1] for table_name in table_names)
+
+    def table_columns(self, table_names=None):
+        """Return the column names of several tables, from the schema cache.
+
+        Args:
+            table_names (List[str], optional): Tables to include. Defaults to
+                every table registered on this interface.
+
+        Returns:
+            Dict[str, List[str]]: Column names per table, in column order.
+
+        """
+        return {
+            table_name: [name for name, _ in self._schema_cache[table_name][2]]
+            for table_name in self._refresh_schemas(table_names)
+        }
+
+    def _refresh_schemas(self, table_names=None):
+        """Re-read the catalog entries of tables whose cached schema is stale.
+
+        Returns:
+            List[str]: The requested table names.
+
+        """
+        table_names = list(self.tables if table_names is None else table_names)
+        versions = {table_name: self.table_version(table_name) for table_name in table_names}
+
+        stale = [
+            table_name for table_name in table_names
+            if self._schema_cache.get(table_name, (None,))[0] != versions[table_name]
+        ]
+        if stale:
+            with span("db.schema", tables=len(table_names), fetched=len(stale)):
+                for table_name, columns in self._fetch_columns(stale).items():
+                    self._schema_cache[table_name] = (
+                        versions[table_name], self._render_schema(table_name, columns), columns,
+                    )
+        return table_names
@@ -0,0 +1,88 @@
+"""Shared background event loop for Excel Query Bot.
+
+Functions:
+    get_event_loop: Return the process-wide event loop running in a daemon thread.
+    run_sync: Run a coroutine on the shared loop and block until it finishes.
+    stream_sync: Run a coroutine on the shared loop and yield its events as they happen.
+"""
+
+import asyncio
+import queue
+import threading
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop():
+    """Return the process-wide event loop, starting its thread on first use.
+
+    All synchronous wrappers submit their coroutines to this one loop, so
+    async clients and connection pools bound to it stay valid across calls
+    and concurrent callers overlap their network waits.
+
+    Returns:
+        asyncio.AbstractEventLoop: The running shared loop.
+
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="excel-query-bot-loop", daemon=True).start()
+        return _loop
+
+
+def run_sync(coro):
+    """Run a coroutine on the shared loop and return its result.
+
+    Must not be called from a coroutine running on the shared loop itself;
+    await the coroutine there instead.
+
+    Args:
+        coro (Coroutine): Coroutine to run.
+
+    Returns:
+        Any: The coroutine's result. Exceptions are re-raised in the caller.
+
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result()
+
+
+def stream_sync(start):
+    """Run a coroutine on the shared loop and yield the events it reports.
+
+    Events are handed from the loop thread to the caller through a queue, so
+    the caller (e.g. a Streamlit script thread) can render each one as soon
+    as it is reported while the coroutine keeps running.
+
+    Args:
+        start (Callable[[Callable[[str, Any], None]], Coroutine]): Called with
+            an ``on_event(kind, payload)`` callback and returning the
+            coroutine to run.
+
+    Yields:
+        Tuple[str, Any]: ``(kind, payload)`` events in the order reported,
+            followed by ``("result", value)`` with the coroutine's result.
+            Exceptions are re-raised in the caller after the last event.
+
+    Closing the generator early (e.g. when the caller is stopped) cancels
+    the coroutine.
+
+    """
+    events = queue.Queue()
+    future = asyncio.run_coroutine_threadsafe(
+        start(lambda kind, payload=None: events.put((kind, payload))),
+        get_event_loop(),
+    )
+    future.add_done_callback(lambda _: events.put(None))
+    try:
+        while True:
+            event = events.get()
+            if event is None:
+                break
+            yield event
+        yield "result", future.result()
+    finally:
+        if not future.done():
+            future.cancel()
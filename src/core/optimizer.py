@@ -0,0 +1,380 @@
+"""Physical table optimization module for Excel Query Bot.
+
+Classes:
+    TableOptimizer: Collects planner statistics and maintains indexes on loaded tables.
+"""
+
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from sqlalchemy import inspect
+from sqlalchemy.exc import DBAPIError
+
+from src.core.database import ROW_HASH_COLUMN
+from src.core.tracing import span
+
+# Prefix of indexes created by TableOptimizer; only these are ever dropped.
+AUTO_INDEX_PREFIX = "ix_auto_"
+
+# Start of the query clauses whose column references benefit from an index.
+_PREDICATE_CLAUSE = re.compile(r"\b(WHERE|JOIN|GROUP\s+BY|ORDER\s+BY)\b", re.IGNORECASE)
+
+
+class TableOptimizer:
+    """Collects planner statistics and maintains indexes on loaded tables.
+
+    After ingestion, ``optimize`` runs ANALYZE and indexes the columns whose
+    cardinality makes them useful filter or join keys. ``tune`` then adds
+    indexes for columns that the executed queries in ``Database.query_log``
+    keep filtering, grouping or joining on, and drops automatic indexes that
+    those queries stopped using. ``maybe_tune`` runs it on a background
+    worker, so questions never wait for index builds or timing runs. Every
+    index is listed in ``report`` with the time it saved on the query that
+    motivated it, when that was measured.
+
+    Attributes:
+        db: Database interface with ``engine``, ``backend`` and ``query_log``.
+        guard (Optional[QueryGuard]): Bounds the rows and run time of timed queries.
+        max_indexes (int): Maximum automatic indexes per table.
+        min_distinct_ratio (float): Minimum distinct/row ratio for an ingest-time index.
+        max_distinct_ratio (float): Maximum distinct/row ratio for an ingest-time
+            index; near-unique columns are rarely filtered or grouped on.
+        min_uses (int): Logged references needed before a column is indexed by ``tune``.
+        drop_after_queries (int): Logged queries on a table after which unused
+            automatic indexes are dropped.
+        tune_every (int): Newly logged queries between automatic ``maybe_tune`` runs.
+        indexes (Dict[str, dict]): Report entry per automatic index, by index name.
+
+    """
+
+    def __init__(self, db, cfg, guard=None):
+        """Initialize the optimizer.
+
+        Args:
+            db: Database interface object.
+            cfg (dynaconf.Dynaconf): Configuration object. Optional keys:
+                - OPTIMIZER.MAX_INDEXES (default 5)
+                - OPTIMIZER.MIN_DISTINCT_RATIO (default 0.001)
+                - OPTIMIZER.MAX_DISTINCT_RATIO (default 0.5)
+                - OPTIMIZER.MIN_USES (default 3)
+                - OPTIMIZER.DROP_AFTER_QUERIES (default 50)
+                - OPTIMIZER.TUNE_EVERY (default 20)
+            guard (QueryGuard, optional): Applies its row cap and statement
+                timeout to timed queries.
+
+        """
+        opt_cfg = cfg.get("OPTIMIZER", {})
+        self.db = db
+        self.guard = guard
+        self.max_indexes = int(opt_cfg.get("MAX_INDEXES", 5))
+        self.min_distinct_ratio = float(opt_cfg.get("MIN_DISTINCT_RATIO", 0.001))
+        self.max_distinct_ratio = float(opt_cfg.get("MAX_DISTINCT_RATIO", 0.5))
+        self.min_uses = int(opt_cfg.get("MIN_USES", 3))
+        self.drop_after_queries = int(opt_cfg.get("DROP_AFTER_QUERIES", 50))
+        self.tune_every = int(opt_cfg.get("TUNE_EVERY", 20))
+        self.indexes = {}
+        self._tuned_at = 0.0
+        self._lock = threading.RLock()
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="optimizer")
+        self._pending = None
+
+    @staticmethod
+    def index_name(table_name: str, column_name: str) -> str:
+        """Name of the automatic index on one column, within identifier limits."""
+        return f"{AUTO_INDEX_PREFIX}{table_name}_{column_name}"[:63]
+
+    def analyze(self, table_name: str):
+        """Collect planner statistics for a table.
+
+        Args:
+            table_name (str): Table to analyze.
+
+        """
+        statement = "ANALYZE" if self.db.backend == "duckdb" else f'ANALYZE "{table_name}"'
+        with self.db.engine.begin() as connection:
+            connection.exec_driver_sql(statement)
+
+    def _existing_indexes(self, table_name: str):
+        return {index["name"] for index in inspect(self.db.engine).get_indexes(table_name)}
+
+    def _auto_indexes(self, table_name: str):
+        with self._lock:
+            return {
+                name: entry for name, entry in self.indexes.items()
+                if entry["table"] == table_name
+            }
+
+    def create_index(self, table_name: str, column_name: str, reason: str, **details):
+        """Create an automatic single-column index and record it in the report.
+
+        Args:
+            table_name (str): Indexed table.
+            column_name (str): Indexed column.
+            reason (str): Why the index was created ('cardinality' or 'query_log').
+            **details: Extra report fields.
+
+        Returns:
+            str: Name of the index.
+
+        """
+        index_name = self.index_name(table_name, column_name)
+        with self.db.engine.begin() as connection:
+            connection.exec_driver_sql(
+                f'CREATE INDEX IF NOT EXISTS "{index_name}" ON "{table_name}" ("{column_name}")'
+            )
+        with self._lock:
+            self.indexes[index_name] = {
+                "index": index_name,
+                "table": table_name,
+                "column": column_name,
+                "reason": reason,
+                "created_at": time.time(),
+                "before_ms": None,
+                "after_ms": None,
+                "uses": 0,
+                "saved_ms": None,
+                **details,
+            }
+        return index_name
+
+    def drop_index(self, index_name: str):
+        """Drop an automatic index and remove it from the report.
+
+        Args:
+            index_name (str): Name of an index created by this optimizer.
+
+        """
+        with self.db.engine.begin() as connection:
+            connection.exec_driver_sql(f'DROP INDEX IF EXISTS "{index_name}"')
+        with self._lock:
+            self.indexes.pop(index_name, None)
+
+    def forget(self, table_name: str):
+        """Drop the automatic indexes of a table that is dropped or renamed.
+
+        Args:
+            table_name (str): Table going away under this name.
+
+        """
+        for index_name in self._auto_indexes(table_name):
+            self.drop_index(index_name)
+
+    def optimize(self, table_name: str):
+        """Analyze a freshly loaded table and index its likely filter columns.
+
+        Near-constant columns (below ``min_distinct_ratio`` of the rows, or
+        with at most two values) are skipped because an index cannot narrow a
+        scan on them, and near-unique ones (above ``max_distinct_ratio``)
+        because they are rarely filtered or grouped on. The remaining columns
+        are ranked by how many logged queries already use them, then from low
+        to medium cardinality.
+
+        Args:
+            table_name (str): Table to optimize.
+
+        Returns:
+            List[str]: Names of the indexes created.
+
+        """
+        with self._lock:
+            for index_name in self._auto_indexes(table_name):
+                self.indexes.pop(index_name)
+        self.analyze(table_name)
+        rows, distinct = self.db.column_cardinality(table_name)
+        if not rows:
+            return []
+
+        _, uses = self.column_uses(table_name)
+        candidates = sorted(
+            (
+                (-len(uses.get(col, [])), count, col) for col, count in distinct.items()
+                if count > 2 and self.min_distinct_ratio <= count / rows <= self.max_distinct_ratio
+            ),
+        )
+        created = [
+            self.create_index(table_name, col, "cardinality", distinct=count, rows=rows)
+            for _, count, col in candidates[:self.max_indexes]
+        ]
+        if created:
+            self.analyze(table_name)
+        return created
+
+    def column_uses(self, table_name: str, since: float = 0.0):
+        """Count logged queries on a table and their predicate column references.
+
+        Args:
+            table_name (str): Table to look for.
+            since (float, optional): Only consider queries logged after this
+                timestamp. Defaults to the whole log.
+
+        Returns:
+            Tuple[int, Dict[str, List[str]]]: Number of queries on the table and,
+                per column, the logged queries filtering, joining, grouping or
+                ordering on it (most recent last).
+
+        """
+        columns = [
+            col["name"] for col in inspect(self.db.engine).get_columns(table_name)
+            if col["name"] != ROW_HASH_COLUMN
+        ]
+        patterns = {col: re.compile(rf'(?<![\w"]){re.escape(col)}(?![\w"])|"{re.escape(col)}"') for col in columns}
+        table_pattern = re.compile(rf'(?<![\w"]){re.escape(table_name)}(?![\w"])|"{re.escape(table_name)}"')
+
+        queries, uses = 0, {col: [] for col in columns}
+        for logged_at, query, _ in list(self.db.query_log):
+            if logged_at < since or not table_pattern.search(query):
+                continue
+            queries += 1
+            clause = _PREDICATE_CLAUSE.search(query)
+            if not clause:
+                continue
+            predicates = query[clause.start():]
+            for col, pattern in patterns.items():
+                if pattern.search(predicates):
+                    uses[col].append(query)
+        return queries, uses
+
+    def time_query(self, query: str):
+        """Measure the execution time of a query in milliseconds.
+
+        PostgreSQL reports the executor time through EXPLAIN ANALYZE, which
+        excludes result transfer; other backends time a full fetch. With a
+        guard, the query runs under its row cap and statement timeout.
+
+        Args:
+            query (str): SELECT query to time.
+
+        Returns:
+            Optional[float]: Execution time in milliseconds, or None if the
+                query failed or hit the timeout.
+
+        """
+        if self.guard:
+            query = self.guard.with_limit(query)
+        with self.db.engine.connect() as connection, \
+                (self.guard.limits(connection) if self.guard else nullcontext()):
+            try:
+                if self.db.backend == "postgresql":
+                    plan = connection.exec_driver_sql(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}").scalar()
+                    plan = json.loads(plan) if isinstance(plan, str) else plan
+                    return float(plan[0]["Execution Time"])
+                started = time.perf_counter()
+                connection.exec_driver_sql(query).fetchall()
+                return (time.perf_counter() - started) * 1000
+            except DBAPIError:
+                return None
+
+    def tune(self, table_names=None):
+        """Add or drop automatic indexes based on the executed query log.
+
+        A column referenced in the predicates of at least ``min_uses`` logged
+        queries gets an index (while the table has fewer than ``max_indexes``);
+        the most recent such query is timed before and after so the report
+        shows the time saved. Automatic indexes whose column was not referenced
+        by any of at least ``drop_after_queries`` logged queries are dropped.
+
+        Args:
+            table_names (List[str], optional): Tables to tune. Defaults to all
+                tables registered on the database.
+
+        Returns:
+            Dict[str, List[str]]: Names of the ``created`` and ``dropped`` indexes.
+
+        """
+        table_names = list(table_names or self.db.tables)
+        with span("optimizer.tune", tables=len(table_names)) as tune_span:
+            changes = self._tune(table_names)
+            tune_span.set(created=len(changes["created"]), dropped=len(changes["dropped"]))
+        return changes
+
+    def _tune(self, table_names):
+        changes = {"created": [], "dropped": []}
+        for table_name in table_names:
+            queries, uses = self.column_uses(table_name)
+            auto_indexes = self._auto_indexes(table_name)
+
+            for index_name, entry in auto_indexes.items():
+                entry["uses"] = len(uses.get(entry["column"], []))
+                if entry["before_ms"] is not None and entry["after_ms"] is not None:
+                    entry["saved_ms"] = max(entry["before_ms"] - entry["after_ms"], 0.0) * entry["uses"]
+                if queries >= self.drop_after_queries and not entry["uses"]:
+                    self.drop_index(index_name)
+                    changes["dropped"].append(index_name)
+
+            existing = self._existing_indexes(table_name)
+            budget = self.max_indexes - len(self._auto_indexes(table_name))
+            ranked = sorted(uses.items(), key=lambda item: len(item[1]), reverse=True)
+            for col, col_queries in ranked:
+                if budget <= 0 or len(col_queries) < self.min_uses:
+                    break
+                if self.index_name(table_name, col) in existing:
+                    continue
+                sample = col_queries[-1]
+                before_ms = self.time_query(sample)
+                index_name = self.create_index(table_name, col, "query_log")
+                self.analyze(table_name)
+                after_ms = self.time_query(sample)
+                self.indexes[index_name].update(
+                    before_ms=before_ms,
+                    after_ms=after_ms,
+                    uses=len(col_queries),
+                    saved_ms=(
+                        max(before_ms - after_ms, 0.0) * len(col_queries)
+                        if before_ms is not None and after_ms is not None else None
+                    ),
+                    sample_query=sample,
+                )
+                changes["created"].append(index_name)
+                budget -= 1
+
+        self._tuned_at = time.time()
+        return changes
+
+    def maybe_tune(self, table_names=None):
+        """Start ``tune`` in the background once ``tune_every`` queries were logged since the last run.
+
+        At most one run is in flight; the call returns immediately.
+
+        Args:
+            table_names (List[str], optional): Tables to tune, e.g. the
+                current session's. Defaults to all registered tables.
+
+        Returns:
+            Optional[concurrent.futures.Future]: Future of the ``tune`` result,
+                or None if skipped.
+
+        """
+        with self._lock:
+            if self._pending is not None and not self._pending.done():
+                return None
+            new_queries = sum(1 for logged_at, _, _ in list(self.db.query_log) if logged_at > self._tuned_at)
+            if new_queries < self.tune_every:
+                return None
+            self._tuned_at = time.time()
+            self._pending = self._worker.submit(self._tune_in_background, list(table_names or self.db.tables))
+            return self._pending
+
+    def _tune_in_background(self, table_names):
+        try:
+            return self.tune(table_names)
+        except Exception:
+            # E.g. a table dropped while it was tuned; the span recorded the error.
+            return None
+
+    def report(self):
+        """List every automatic index with its reason and measured savings.
+
+        ``before_ms``/``after_ms`` are the timings of the query that motivated a
+        log-driven index; ``saved_ms`` extrapolates the difference over the
+        logged queries using the column.
+
+        Returns:
+            List[dict]: One entry per automatic index.
+
+        """
+        with self._lock:
+            return sorted(self.indexes.values(), key=lambda entry: (entry["table"], entry["index"]))
@@ -21,4 +21,30 @@ Action: sql_query
 Action Input: SELECT column1, column2 FROM table_name WHERE condition
 
 Generate and execute the SQL query using the sql_query tool.
-"""
\ No newline at end of file
+"""
+
+sql_prompt = """
+You are an expert SQL analyst. Write one SQL query that answers the user's question.
+
+Database Schema: 
+{table_schema}
+
+User Question: 
+{user_query}
+
+Instructions:
+1. Only generate a single SELECT query - no INSERT, UPDATE, DELETE, or DDL operations
+2. Use the exact table and column names from the schema
+3. Respond with a JSON object of the form {{"sql": "<query>"}} and nothing else
+"""
+
+
+repair_prompt = """
+{prompt}
+
+A previous attempt produced this SQL query:
+{sql}
+
+It could not be used because: {error}
+Write a corrected query and execute it with the sql_query tool.
+"""
@@ -0,0 +1,163 @@
+"""Query admission and execution limits module for Excel Query Bot.
+
+Classes:
+    QueryRejectedError: Raised when a query is refused before execution.
+    QueryGuard: Admits queries by estimated cost, bounds their rows and run time,
+        and makes them cancellable.
+"""
+
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+# A trailing LIMIT / OFFSET / FETCH clause already bounds the result.
+_ROW_BOUND = re.compile(r"\b(LIMIT\s+\d+|FETCH\s+(FIRST|NEXT)\b.*|OFFSET\s+\d+(\s+ROWS?)?)\s*$", re.IGNORECASE)
+
+
+class QueryRejectedError(ValueError):
+    """Raised when a query is refused before execution."""
+
+
+class QueryGuard:
+    """Admits queries by estimated cost, bounds their rows and run time, and makes them cancellable.
+
+    ``admit`` appends a LIMIT to queries without one, so at most ``max_rows``
+    rows (plus one, to detect truncation) leave the database, then asks the
+    PostgreSQL planner for the cost of the bounded query and rejects it above
+    ``max_cost``. Embedded backends expose no comparable cost estimate, so
+    only the LIMIT is applied there.
+
+    ``limits`` applies the per-statement timeout to a connection for the
+    duration of one query and yields a ``cancel`` callable that aborts the
+    running statement from another thread: PostgreSQL uses
+    ``statement_timeout`` and a protocol cancel request, SQLite a progress
+    handler and DuckDB ``interrupt``. Queries on the async engine are
+    cancelled by cancelling their task, which asyncpg forwards to the server.
+
+    Attributes:
+        db: Database interface with ``engine`` and ``backend``.
+        max_cost (float): Maximum planner cost admitted on PostgreSQL (0 disables the check).
+        max_rows (int): Row cap enforced with an automatic LIMIT (0 disables it).
+        timeout_seconds (float): Per-statement timeout (0 disables it).
+
+    """
+
+    def __init__(self, db, cfg):
+        """Initialize the guard.
+
+        Args:
+            db: Database interface object.
+            cfg (dynaconf.Dynaconf): Configuration object. Optional keys:
+                - QUERY.MAX_COST (default 10000000)
+                - QUERY.AUTO_LIMIT (default true, limits to QUERY.MAX_ROWS)
+                - QUERY.MAX_ROWS (default 100000)
+                - QUERY.STATEMENT_TIMEOUT_SECONDS (default 30)
+
+        """
+        query_cfg = cfg.get("QUERY", {})
+        self.db = db
+        self.max_cost = float(query_cfg.get("MAX_COST", 1e7))
+        self.max_rows = int(query_cfg.get("MAX_ROWS", 100000)) if query_cfg.get("AUTO_LIMIT", True) else 0
+        self.timeout_seconds = float(query_cfg.get("STATEMENT_TIMEOUT_SECONDS", 30))
+
+    def with_limit(self, query: str) -> str:
+        """Append a LIMIT of ``max_rows + 1`` to a query that has no row bound.
+
+        Args:
+            query (str): SELECT query.
+
+        Returns:
+            str: The bounded query.
+
+        """
+        query = query.strip().rstrip(";").strip()
+        if not self.max_rows or _ROW_BOUND.search(query):
+            return query
+        return f"{query}\nLIMIT {self.max_rows + 1}"
+
+    def estimate(self, query: str):
+        """Planner estimate of a query on PostgreSQL.
+
+        Args:
+            query (str): SELECT query.
+
+        Returns:
+            Optional[Tuple[float, float]]: Total cost and estimated rows, or
+                None on backends without cost estimates.
+
+        """
+        if self.db.backend != "postgresql":
+            return None
+        with self.db.engine.connect() as connection:
+            plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {query}").scalar()
+        plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+        return float(plan["Total Cost"]), float(plan["Plan Rows"])
+
+    def admit(self, query: str) -> str:
+        """Bound a query's rows and check its estimated cost.
+
+        Args:
+            query (str): SELECT query as generated.
+
+        Returns:
+            str: The query to execute.
+
+        Raises:
+            QueryRejectedError: If the planner cost exceeds ``max_cost``.
+
+        """
+        query = self.with_limit(query)
+        estimate = self.estimate(query) if self.max_cost else None
+        if estimate is not None and estimate[0] > self.max_cost:
+            raise QueryRejectedError(
+                f"Query rejected: estimated cost {estimate[0]:,.0f} exceeds the limit of {self.max_cost:,.0f} "
+                f"(about {estimate[1]:,.0f} rows). Add filters or aggregate the data, and avoid cross joins."
+            )
+        return query
+
+    @contextmanager
+    def limits(self, connection):
+        """Apply the statement timeout to a connection for one query.
+
+        Args:
+            connection (sqlalchemy.engine.Connection): Connection the query runs on.
+
+        Yields:
+            Callable[[], None]: Aborts the running statement; safe to call
+                from another thread.
+
+        """
+        raw = connection.connection.driver_connection
+        if self.db.backend == "postgresql":
+            if self.timeout_seconds:
+                # SET LOCAL only lasts until the end of this query's transaction.
+                connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(self.timeout_seconds * 1000)}")
+            # psycopg2 connections cancel through a protocol request; on the
+            # async engine the task itself is cancelled instead.
+            yield getattr(raw, "cancel", lambda: None)
+        elif self.db.backend == "sqlite":
+            cancelled = threading.Event()
+            deadline = time.monotonic() + self.timeout_seconds if self.timeout_seconds else None
+
+            def should_abort():
+                return cancelled.is_set() or (deadline is not None and time.monotonic() > deadline)
+
+            raw.set_progress_handler(should_abort, 10000)
+            try:
+                yield cancelled.set
+            finally:
+                raw.set_progress_handler(None, 0)
+        elif self.db.backend == "duckdb":
+            timer = threading.Timer(self.timeout_seconds, raw.interrupt) if self.timeout_seconds else None
+            if timer:
+                timer.daemon = True
+                timer.start()
+            try:
+                yield raw.interrupt
+            finally:
+                if timer:
+                    timer.cancel()
+        else:
+            yield lambda: None
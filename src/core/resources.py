@@ -0,0 +1,328 @@
+"""Process-wide resource registry for Excel Query Bot.
+
+Every heavy object (configuration, database engine and pool, Azure client,
+caches, the agent) is created once per process and shared by all
+Streamlit sessions and batch runs. Modules that pull in LangChain, OpenAI,
+SQLAlchemy or pandas are imported inside the getters, so importing this
+module is cheap and the first page renders before they load.
+
+Functions:
+    get_config: Return the shared configuration.
+    get_tracer: Install and return the process-wide tracer, if enabled.
+    get_database: Return the shared Database (one engine and connection pool).
+    get_llm_scheduler: Return the shared language model scheduler, if enabled.
+    get_generator: Return the shared Azure OpenAI generator.
+    get_semantic_cache: Return the shared semantic question-to-SQL cache.
+    get_result_cache: Return the shared SQL result cache.
+    get_result_store: Return the shared store of full query results.
+    get_optimizer: Return the shared TableOptimizer, if enabled.
+    get_rollups: Return the shared RollupManager, if enabled.
+    get_schema_renderer: Return the shared SchemaRenderer, if enabled.
+    get_query_guard: Return the shared QueryGuard, if enabled.
+    get_table_registry: Return the shared TableRegistry of per-upload tables.
+    build_agent: Build an AppReact agent on the shared resources.
+    get_agent: Return the shared AppReact agent.
+"""
+
+import threading
+
+_resources = {}
+_lock = threading.RLock()
+
+
+def _get_or_create(key, factory):
+    """Return the resource stored under ``key``, creating it on first use."""
+    with _lock:
+        if key not in _resources:
+            _resources[key] = factory()
+        return _resources[key]
+
+
+def get_config():
+    """Return the shared configuration.
+
+    Returns:
+        dynaconf.Dynaconf: Settings from ``config/config.toml`` and
+            ``config/.secrets.toml``.
+
+    """
+    def factory():
+        from dynaconf import Dynaconf
+
+        return Dynaconf(settings_files=[
+            "config/config.toml",
+            "config/.secrets.toml"
+        ])
+    return _get_or_create("config", factory)
+
+
+def get_tracer(cfg):
+    """Install and return the process-wide tracer.
+
+    Args:
+        cfg (dynaconf.Dynaconf): Configuration object.
+
+    Returns:
+        Optional[Tracer]: Shared tracer, or None when tracing is disabled.
+
+    """
+    def factory():
+        from src.core import tracing
+
+        tracer = tracing.Tracer.from_config(cfg)
+        tracing.set_tracer(tracer)
+        return tracer
+    return _get_or_create("tracer", factory)
+
+
+def get_database(cfg):
+    """Return the shared Database, holding the one engine and connection pool.
+
+    Args:
+        cfg (dynaconf.Dynaconf): Configuration object.
+
+    Returns:
+        Database: Shared database interface.
+
+    """
+    def factory():
+        from src.core.database import Database
+
+        return Database(cfg)
+    return _get_or_create("database", factory)
+
+
+def get_llm_scheduler(cfg):
+    """Return the shared language model scheduler.
+
+    Args:
+        cfg (dynaconf.Dynaconf): Configuration object.
+
+    Returns:
+        Optional[LlmScheduler]: Shared scheduler, or None when disabled.
+
+    """
+    def factory():
+        from src.generator.scheduler import LlmScheduler
+
+        return LlmScheduler.from_config(cfg)
+    return _get_or_create("llm_scheduler", factory)
+
+
+def get_generator(cfg):
+    """Return the shared Azure OpenAI generator.
+
+    Sharing the instance shares its HTTP client, so keep-alive connections
+    to Azure are reused by every session, and its scheduler, so all of them
+    draw on one rate limit budget.
+
+    Args:
+        cfg (dynaconf.Dynaconf): Configuration object.
+
+    Returns:
+        AppGenerator: Shared generator.
+
+    """
+    def factory():
+        from src.generator.app_generator import AppGenerator
+
+        return AppGenerator(cfg, scheduler=get_llm_scheduler(cfg))
+    return _get_or_create("generator", factory)
+
+
+def get_semantic_cache(cfg):
+    """Return the shared semantic question-to-SQL cache.
+
+    Args:
+        cfg (dynaconf.Dynaconf): Configuration object.
+
+    Returns:
+        Optional[SemanticCache]: Shared cache, or None when disabled.
+
+    """
+    def factory():
+        from src.agents.semantic_cache import SemanticCache
+
+        return SemanticCache.from_config(cfg)
+    return _get_or_create("semantic_cache", factory)
+
+
+def get_result_cache(cfg):
+    """Return the shared SQL result cache.
+
+    Args:
+        cfg (dynaconf.Dynaconf): Configuration object.
+
+    Returns:
+        Optional[ResultCache]: Shared cache, or None when disabled.
+
+    """
+    def factory():
+        from src.agents.result_cache import ResultCache
+
+        return ResultCache.from_config(cfg)
+    return _get_or_create("result_cache", factory)
+
+
+def get_result_store(cfg):
+    """Return the shared store of full query results.
+
+    Args:
+        cfg (dynaconf.Dynaconf): Configuration object.
+
+    Returns:
+        ResultStore: Shared store.
+
+    """
+    def factory():
+        from src.agents.result_store import ResultStore
+
+        return ResultStore.from_config(cfg)
+    return _get_or_create("result_store", factory)
+
+
+def get_optimizer(cfg):
+    """Return the shared TableOptimizer.
+
+    Args:
+        cfg (dynaconf.Dynaconf): Configuration object.
+
+    Returns:
+        Optional[TableOptimizer]: Shared optimizer, or None when disabled.
+
+    """
+    def factory():
+        if not cfg.get("OPTIMIZER", {}).get("ENABLED", True):
+            return None
+        from src.core.optimizer import TableOptimizer
+
+        return TableOptimizer(get_database(cfg), cfg, guard=get_query_guard(cfg))
+    return _get_or_create("optimizer", factory)
+
+
+def get_rollups(cfg):
+    """Return the shared RollupManager.
+
+    Args:
+        cfg (dynaconf.Dynaconf): Configuration object.
+
+    Returns:
+        Optional[RollupManager]: Shared manager, or None when disabled.
+
+    """
+    def factory():
+        if not cfg.get("ROLLUPS", {}).get("ENABLED", True):
+            return None
+        from src.core.rollups import RollupManager
+
+        return RollupManager(get_database(cfg), cfg)
+    return _get_or_create("rollups", factory)
+
+
+def get_schema_renderer(cfg):
+    """Return the shared SchemaRenderer.
+
+    Args:
+        cfg (dynaconf.Dynaconf): Configuration object.
+
+    Returns:
+        Optional[SchemaRenderer]: Shared renderer, or None when compact
+            schemas are disabled.
+
+    """
+    def factory():
+        if not cfg.get("SCHEMA", {}).get("COMPACT", True):
+            return None
+        from src.core.schema_renderer import SchemaRenderer
+
+        return SchemaRenderer(get_database(cfg), cfg)
+    return _get_or_create("schema_renderer", factory)
+
+
+def get_query_guard(cfg):
+    """Return the shared QueryGuard.
+
+    Args:
+        cfg (dynaconf.Dynaconf): Configuration object.
+
+    Returns:
+        Optional[QueryGuard]: Shared guard, or None when disabled.
+
+    """
+    def factory():
+        if not cfg.get("QUERY", {}).get("GUARD", True):
+            return None
+        from src.core.query_guard import QueryGuard
+
+        return QueryGuard(get_database(cfg), cfg)
+    return _get_or_create("query_guard", factory)
+
+
+def get_table_registry(cfg):
+    """Return the shared TableRegistry of per-upload tables.
+
+    Args:
+        cfg (dynaconf.Dynaconf): Configuration object.
+
+    Returns:
+        TableRegistry: Shared registry.
+
+    """
+    def factory():
+        from src.core.table_registry import TableRegistry
+
+        return TableRegistry(
+            get_database(cfg),
+            cfg,
+            rollups=get_rollups(cfg),
+            optimizer=get_optimizer(cfg),
+            schema_renderer=get_schema_renderer(cfg),
+        )
+    return _get_or_create("table_registry", factory)
+
+
+def build_agent(cfg, **overrides):
+    """Build an AppReact agent wired to the shared resources.
+
+    Args:
+        cfg (dynaconf.Dynaconf): Configuration object.
+        **overrides: AppReact keyword arguments replacing the shared ones
+            (e.g. a private ``result_cache``).
+
+    Returns:
+        AppReact: New agent.
+
+    """
+    from src.agents.workflow import AppReact
+
+    kwargs = dict(
+        semantic_cache=get_semantic_cache(cfg),
+        result_cache=get_result_cache(cfg),
+        max_rows=int(cfg.get("QUERY", {}).get("MAX_ROWS", 100000)),
+        fetch_batch_size=int(cfg.get("QUERY", {}).get("FETCH_BATCH_SIZE", 10000)),
+        rollups=get_rollups(cfg),
+        guard=get_query_guard(cfg),
+        mode=cfg.get("QUERY", {}).get("MODE", "direct"),
+        structured_output=bool(cfg.get("QUERY", {}).get("STRUCTURED_OUTPUT", True)),
+        result_store=get_result_store(cfg),
+        sample_rows=int(cfg.get("QUERY", {}).get("OBSERVATION_SAMPLE_ROWS", 5)),
+        max_observation_chars=int(cfg.get("QUERY", {}).get("OBSERVATION_MAX_CHARS", 4000)),
+    )
+    kwargs.update(overrides)
+    return AppReact(generator=get_generator(cfg), text_db=get_database(cfg), **kwargs)
+
+
+def get_agent(cfg):
+    """Return the shared AppReact agent.
+
+    The agent holds no schema: the schema and the session's tables are
+    passed with every question, so one agent serves all sessions.
+
+    Args:
+        cfg (dynaconf.Dynaconf): Configuration object.
+
+    Returns:
+        AppReact: Shared agent.
+
+    """
+    return _get_or_create("agent", lambda: build_agent(cfg))
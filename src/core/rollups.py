@@ -0,0 +1,284 @@
+"""Aggregate rollup module for Excel Query Bot.
+
+Classes:
+    RollupManager: Builds per-dimension rollup tables and rewrites matching GROUP BY queries onto them.
+"""
+
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from sqlalchemy import inspect
+from sqlalchemy.types import Float, Integer, Numeric
+
+from src.agents.result_cache import ResultCache
+from src.core.database import ROW_HASH_COLUMN
+
+# Shape of the only queries that are rewritten: one table, one GROUP BY column,
+# no WHERE/JOIN/HAVING, and an optional ORDER BY without function calls plus LIMIT.
+_GROUP_BY_QUERY = re.compile(
+    r"^SELECT\s+(?P<select>.+?)\s+FROM\s+(?P<table>\"?\w+\"?)\s+GROUP\s+BY\s+(?P<group>\"?\w+\"?)"
+    r"(?P<tail>(?:\s+ORDER\s+BY\s+[^();]+?)?(?:\s+LIMIT\s+\d+)?)$",
+    re.IGNORECASE | re.DOTALL,
+)
+_SELECT_ITEM = re.compile(
+    r"^(?:(?P<fn>SUM|COUNT|MIN|MAX|AVG)\s*\(\s*(?P<arg>\*|\"?\w+\"?)\s*\)|(?P<col>\"?\w+\"?))"
+    r"(?:\s+AS\s+(?P<alias>\"?\w+\"?))?$",
+    re.IGNORECASE,
+)
+
+
+def _unquote(identifier: str) -> str:
+    return identifier.strip('"')
+
+
+def _split_select(select: str):
+    """Split a select list on top-level commas."""
+    items, depth, current = [], 0, []
+    for char in select:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            items.append("".join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    items.append("".join(current).strip())
+    return items
+
+
+class RollupManager:
+    """Builds per-dimension rollup tables and rewrites matching GROUP BY queries.
+
+    For each loaded table, the low-cardinality columns become dimensions and
+    every numeric column a measure. One rollup table per dimension stores the
+    row count and the SUM, COUNT, MIN and MAX of every measure per group, so a
+    GROUP BY on that dimension reads a few rows instead of scanning the table.
+
+    A rollup is only used while its source table is still at the version it
+    was built from, and only for queries whose every aggregate can be
+    recomputed exactly from the stored partial aggregates. With ``verify``,
+    the first rewrite of each distinct query is compared against the original
+    result on a background worker; the original query runs until the rewrite
+    is verified, and the rewrite is abandoned on any mismatch.
+
+    Attributes:
+        db: Database interface with ``engine``, ``backend`` and table versions.
+        max_rollups (int): Maximum rollup tables per source table.
+        max_groups (int): Maximum distinct values for a dimension column.
+        max_group_ratio (float): Maximum groups/rows ratio for a dimension column.
+        verify (bool): Compare the first rewrite of each query with the original
+            before using it.
+        rollups (Dict[str, dict]): Rollup metadata per source table and dimension.
+
+    """
+
+    def __init__(self, db, cfg):
+        """Initialize the manager.
+
+        Args:
+            db: Database interface object.
+            cfg (dynaconf.Dynaconf): Configuration object. Optional keys:
+                - ROLLUPS.MAX_ROLLUPS (default 5)
+                - ROLLUPS.MAX_GROUPS (default 1000)
+                - ROLLUPS.MAX_GROUP_RATIO (default 0.1)
+                - ROLLUPS.VERIFY (default true)
+
+        """
+        rollup_cfg = cfg.get("ROLLUPS", {})
+        self.db = db
+        self.max_rollups = int(rollup_cfg.get("MAX_ROLLUPS", 5))
+        self.max_groups = int(rollup_cfg.get("MAX_GROUPS", 1000))
+        self.max_group_ratio = float(rollup_cfg.get("MAX_GROUP_RATIO", 0.1))
+        self.verify = bool(rollup_cfg.get("VERIFY", True))
+        self.rollups = {}
+        # Verification outcome per (query, table, version); None while pending.
+        self._verified = {}
+        self._lock = threading.Lock()
+        self._verifier = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rollup-verify")
+
+    @staticmethod
+    def rollup_name(table_name: str, dimension: str) -> str:
+        """Name of the rollup table of one dimension, within identifier limits."""
+        return f"rollup_{table_name}_{dimension}"[:63]
+
+    def build(self, table_name: str):
+        """(Re)build the rollup tables of a source table.
+
+        Args:
+            table_name (str): Source table.
+
+        Returns:
+            List[str]: Names of the rollup tables built.
+
+        """
+        if self.db.backend == "postgresql":
+            # Cardinality estimates come from pg_stats, which ANALYZE fills in.
+            with self.db.engine.begin() as connection:
+                connection.exec_driver_sql(f'ANALYZE "{table_name}"')
+        columns = [col for col in inspect(self.db.engine).get_columns(table_name) if col["name"] != ROW_HASH_COLUMN]
+        rows, distinct = self.db.column_cardinality(table_name)
+        version = self.db.table_version(table_name)
+        self.drop(table_name)
+        if not rows:
+            return []
+
+        dimensions = sorted(
+            (distinct.get(col["name"], 0), col["name"]) for col in columns
+        )
+        dimensions = [
+            (count, name) for count, name in dimensions
+            if 1 < count <= self.max_groups and count / rows <= self.max_group_ratio
+        ][:self.max_rollups]
+        dimension_names = {name for _, name in dimensions}
+        measures = [
+            col["name"] for col in columns
+            if isinstance(col["type"], (Integer, Numeric, Float)) and col["name"] not in dimension_names
+        ]
+
+        built = {}
+        for _, dimension in dimensions:
+            rollup_table = self.rollup_name(table_name, dimension)
+            aggregates = ["COUNT(*) AS row_count"] + [
+                f'{fn}("{measure}") AS "{fn.lower()}__{measure}"'
+                for measure in measures
+                for fn in ("SUM", "COUNT", "MIN", "MAX")
+            ]
+            with self.db.engine.begin() as connection:
+                connection.exec_driver_sql(f'DROP TABLE IF EXISTS "{rollup_table}"')
+                connection.exec_driver_sql(
+                    f'CREATE TABLE "{rollup_table}" AS SELECT "{dimension}", {", ".join(aggregates)} '
+                    f'FROM "{table_name}" GROUP BY "{dimension}"'
+                )
+                total = connection.exec_driver_sql(f'SELECT SUM(row_count) FROM "{rollup_table}"').scalar()
+            if int(total or 0) != rows and self.db.backend != "postgresql":
+                # The row counts must add up to the table; PostgreSQL's row
+                # count is a planner estimate, so it is not compared there.
+                with self.db.engine.begin() as connection:
+                    connection.exec_driver_sql(f'DROP TABLE IF EXISTS "{rollup_table}"')
+                continue
+            built[dimension] = {"table": rollup_table, "measures": set(measures), "version": version}
+
+        with self._lock:
+            self.rollups[table_name] = built
+        return [entry["table"] for entry in built.values()]
+
+    def drop(self, table_name: str):
+        """Drop all rollup tables of a source table.
+
+        Args:
+            table_name (str): Source table.
+
+        """
+        with self._lock:
+            built = self.rollups.pop(table_name, {})
+            self._verified = {key: ok for key, ok in self._verified.items() if key[1] != table_name}
+        with self.db.engine.begin() as connection:
+            for entry in built.values():
+                connection.exec_driver_sql(f'DROP TABLE IF EXISTS "{entry["table"]}"')
+
+    def refresh(self):
+        """Rebuild the rollups of every source table that changed since they were built.
+
+        Returns:
+            List[str]: Names of the rollup tables rebuilt.
+
+        """
+        rebuilt = []
+        for table_name, built in list(self.rollups.items()):
+            if any(entry["version"] != self.db.table_version(table_name) for entry in built.values()):
+                rebuilt.extend(self.build(table_name))
+        return rebuilt
+
+    def _rewrite_item(self, item: str, dimension: str, measures):
+        """Map one select item onto the rollup columns, or return None."""
+        match = _SELECT_ITEM.match(item)
+        if not match:
+            return None
+        if match.group("col"):
+            return item if _unquote(match.group("col")) == dimension else None
+
+        fn, arg, alias = match.group("fn").upper(), _unquote(match.group("arg")), match.group("alias")
+        if not alias:
+            # Default output names differ between backends, so only aliased
+            # aggregates keep their column names when rewritten.
+            return None
+        if arg == "*":
+            return f"CAST(SUM(row_count) AS BIGINT) AS {alias}" if fn == "COUNT" else None
+        if arg not in measures:
+            return None
+        if fn == "SUM":
+            return f'SUM("sum__{arg}") AS {alias}'
+        if fn == "COUNT":
+            return f'CAST(SUM("count__{arg}") AS BIGINT) AS {alias}'
+        if fn in ("MIN", "MAX"):
+            return f'{fn}("{fn.lower()}__{arg}") AS {alias}'
+        return f'CAST(SUM("sum__{arg}") AS DOUBLE PRECISION) / NULLIF(SUM("count__{arg}"), 0) AS {alias}'
+
+    def _verify(self, key, query: str, rewritten: str):
+        """Record whether a rewrite returns the original result; runs on the verifier thread."""
+        try:
+            ok = self._results_match(query, rewritten)
+        except Exception:
+            # E.g. the source table was dropped meanwhile.
+            ok = False
+        with self._lock:
+            if key in self._verified:
+                self._verified[key] = ok
+
+    def _results_match(self, query: str, rewritten: str) -> bool:
+        with self.db.engine.connect() as connection:
+            expected = pd.read_sql_query(query, connection)
+            actual = pd.read_sql_query(rewritten, connection)
+        if list(expected.columns) != list(actual.columns) or len(expected) != len(actual):
+            return False
+        expected = expected.sort_values(list(expected.columns)).reset_index(drop=True)
+        actual = actual.sort_values(list(actual.columns)).reset_index(drop=True)
+        try:
+            pd.testing.assert_frame_equal(expected, actual, check_dtype=False, rtol=1e-6)
+        except AssertionError:
+            return False
+        return True
+
+    def rewrite(self, query: str):
+        """Rewrite a GROUP BY query to read from a matching, up-to-date rollup.
+
+        Args:
+            query (str): SQL query as generated by the agent.
+
+        Returns:
+            Optional[str]: Equivalent query over the rollup table, or None if
+                no rollup can answer it.
+
+        """
+        normalized = ResultCache.normalize_sql(query)
+        match = _GROUP_BY_QUERY.match(normalized)
+        if not match:
+            return None
+        table_name, dimension = _unquote(match.group("table")), _unquote(match.group("group"))
+        entry = self.rollups.get(table_name, {}).get(dimension)
+        if entry is None or entry["version"] != self.db.table_version(table_name):
+            return None
+
+        items = [self._rewrite_item(item, dimension, entry["measures"]) for item in _split_select(match.group("select"))]
+        if None in items:
+            return None
+        rewritten = (
+            f'SELECT {", ".join(items)} FROM "{entry["table"]}" GROUP BY "{dimension}"{match.group("tail")}'
+        )
+
+        if self.verify:
+            key = (normalized, table_name, entry["version"])
+            with self._lock:
+                pending = key not in self._verified
+                if pending:
+                    self._verified[key] = None
+                verified = self._verified[key]
+            if pending:
+                self._verifier.submit(self._verify, key, normalized, rewritten)
+            if not verified:
+                return None
+        return rewritten
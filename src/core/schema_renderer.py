@@ -0,0 +1,187 @@
+"""Compact, profile-aware schema rendering module for Excel Query Bot.
+
+Classes:
+    SchemaRenderer: Profiles loaded tables and renders a token-budgeted schema for prompts.
+"""
+
+import re
+import threading
+
+from sqlalchemy import inspect
+from sqlalchemy.types import Date, DateTime, Float, Integer, Numeric, String, Text
+
+from src.core.database import ROW_HASH_COLUMN
+
+# Rough characters-per-token ratio of GPT tokenizers on schema text.
+CHARS_PER_TOKEN = 4
+
+_RANGE_TYPES = (Integer, Numeric, Float, Date, DateTime)
+_TEXT_TYPES = (String, Text)
+
+
+def _words(text: str):
+    """Lowercase word set of a text with a trailing plural 's' removed."""
+    return {word[:-1] if len(word) > 3 and word.endswith("s") else word for word in re.findall(r"[a-z0-9]+", text.lower())}
+
+
+class SchemaRenderer:
+    """Profiles loaded tables and renders a compact schema within a token budget.
+
+    Profiles (null ratio, distinct count, min/max of numeric and date
+    columns, most frequent values of low-cardinality text columns) are
+    computed once per table version, normally right after ingestion. The
+    rendered schema lists one line per column, puts the columns whose names
+    or values appear in the question first, and drops details and then
+    columns once the token budget is reached.
+
+    Attributes:
+        db: Database interface with ``engine`` and table versions.
+        token_budget (int): Approximate maximum tokens of the rendered schema.
+        top_values (int): Frequent values listed per low-cardinality text column.
+        max_top_distinct (int): Maximum distinct values for a column to list its values.
+        profiles (Dict[str, tuple]): ``(version, rows, column profiles)`` per table.
+
+    """
+
+    def __init__(self, db, cfg):
+        """Initialize the renderer.
+
+        Args:
+            db: Database interface object.
+            cfg (dynaconf.Dynaconf): Configuration object. Optional keys:
+                - SCHEMA.TOKEN_BUDGET (default 1500)
+                - SCHEMA.TOP_VALUES (default 5)
+                - SCHEMA.MAX_TOP_DISTINCT (default 50)
+
+        """
+        schema_cfg = cfg.get("SCHEMA", {})
+        self.db = db
+        self.token_budget = int(schema_cfg.get("TOKEN_BUDGET", 1500))
+        self.top_values = int(schema_cfg.get("TOP_VALUES", 5))
+        self.max_top_distinct = int(schema_cfg.get("MAX_TOP_DISTINCT", 50))
+        self.profiles = {}
+        self._lock = threading.Lock()
+
+    def profile(self, table_name: str):
+        """Profile the columns of a table, reusing the profile of the current version.
+
+        Args:
+            table_name (str): Table to profile.
+
+        Returns:
+            Tuple[int, List[dict]]: Row count and one profile per column, in
+                column order, with ``name``, ``type``, ``null_ratio``,
+                ``distinct``, ``min``, ``max`` and ``top`` keys.
+
+        """
+        version = self.db.table_version(table_name)
+        cached = self.profiles.get(table_name)
+        if cached and cached[0] == version:
+            return cached[1], cached[2]
+
+        columns = [col for col in inspect(self.db.engine).get_columns(table_name) if col["name"] != ROW_HASH_COLUMN]
+        aggregates = ["COUNT(*)"]
+        for col in columns:
+            name = col["name"]
+            aggregates += [f'COUNT("{name}")', f'COUNT(DISTINCT "{name}")']
+            if isinstance(col["type"], _RANGE_TYPES):
+                aggregates += [f'MIN("{name}")', f'MAX("{name}")']
+
+        with self.db.engine.connect() as connection:
+            values = iter(connection.exec_driver_sql(f'SELECT {", ".join(aggregates)} FROM "{table_name}"').one())
+            rows = int(next(values))
+            profiles = []
+            for col in columns:
+                non_null, distinct = int(next(values)), int(next(values))
+                profile = {
+                    "name": col["name"],
+                    "type": str(col["type"]),
+                    "null_ratio": 1 - non_null / rows if rows else 0.0,
+                    "distinct": distinct,
+                    "min": None,
+                    "max": None,
+                    "top": [],
+                }
+                if isinstance(col["type"], _RANGE_TYPES):
+                    profile["min"], profile["max"] = next(values), next(values)
+                elif isinstance(col["type"], _TEXT_TYPES) and 0 < distinct <= self.max_top_distinct:
+                    profile["top"] = [
+                        value for value, in connection.exec_driver_sql(
+                            f'SELECT "{col["name"]}" FROM "{table_name}" WHERE "{col["name"]}" IS NOT NULL '
+                            f'GROUP BY "{col["name"]}" ORDER BY COUNT(*) DESC LIMIT {self.top_values}'
+                        )
+                    ]
+                profiles.append(profile)
+
+        with self._lock:
+            self.profiles[table_name] = (version, rows, profiles)
+        return rows, profiles
+
+    def forget(self, table_name: str):
+        """Discard the profile of a dropped table.
+
+        Args:
+            table_name (str): Dropped table.
+
+        """
+        with self._lock:
+            self.profiles.pop(table_name, None)
+
+    @staticmethod
+    def _column_line(profile, detailed: bool) -> str:
+        line = f"- {profile['name']} {profile['type']}"
+        if not detailed:
+            return line
+        if profile["null_ratio"]:
+            line += f" nulls {profile['null_ratio']:.0%}"
+        line += f" distinct {profile['distinct']}"
+        if profile["min"] is not None:
+            line += f" range {profile['min']}..{profile['max']}"
+        if profile["top"]:
+            line += " values " + ", ".join(repr(str(value)) for value in profile["top"])
+        return line
+
+    @staticmethod
+    def _relevance(profile, question_words) -> int:
+        score = len(_words(profile["name"].replace("_", " ")) & question_words)
+        score += sum(1 for value in profile["top"] if _words(str(value)) & question_words)
+        return score
+
+    def render(self, table_names=None, question: str = None) -> str:
+        """Render a compact schema of several tables within the token budget.
+
+        Args:
+            table_names (List[str], optional): Tables to include. Defaults to
+                every table registered on the database.
+            question (str, optional): User question used to rank columns by
+                relevance; without it columns keep their table order.
+
+        Returns:
+            str: One header line per table followed by one line per column.
+
+        """
+        budget = self.token_budget * CHARS_PER_TOKEN
+        question_words = _words(question or "")
+        lines = []
+        for table_name in list(self.db.tables if table_names is None else table_names):
+            rows, profiles = self.profile(table_name)
+            lines.append(f"table {table_name} ({rows} rows), columns:")
+            budget -= len(lines[-1]) + 1
+
+            ranked = sorted(
+                enumerate(profiles),
+                key=lambda item: (-self._relevance(item[1], question_words), item[0]),
+            )
+            omitted = 0
+            for _, profile in ranked:
+                for detailed in (True, False):
+                    line = self._column_line(profile, detailed)
+                    if len(line) + 1 <= budget:
+                        lines.append(line)
+                        budget -= len(line) + 1
+                        break
+                else:
+                    omitted += 1
+            if omitted:
+                lines.append(f"- ({omitted} less relevant columns omitted)")
+        return "\n".join(lines)
@@ -0,0 +1,372 @@
+"""Per-upload table namespacing module for Excel Query Bot.
+
+Classes:
+    TableLease: Registry row recording that a session uses a dataset table.
+    StorageQuotaError: Raised when dataset tables fill the storage quota.
+    TableRegistry: Names dataset tables by content, tracks the sessions using
+        them and drops idle ones.
+"""
+
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+
+from sqlalchemy import inspect
+from sqlmodel import Field, Session, SQLModel, delete, select, update
+
+from src.core.tracing import span
+
+
+class TableLease(SQLModel, table=True):
+    """Registry row recording that a session uses a dataset table.
+
+    Rows with an empty ``session_id`` keep the last use of a table that no
+    session references any more, so it stays available for reuse until it
+    has been idle for the TTL.
+
+    Attributes:
+        table_name (str): Name of the dataset table.
+        session_id (str): Session holding the lease, or '' for a released table.
+        last_used (float): Unix time the session last used the table.
+
+    """
+    __tablename__ = "table_leases"
+
+    table_name: str = Field(primary_key=True)
+    session_id: str = Field(primary_key=True)
+    last_used: float
+
+
+class StorageQuotaError(RuntimeError):
+    """Raised when dataset tables fill the storage quota."""
+
+
+class TableRegistry:
+    """Names dataset tables by content, tracks the sessions using them and drops idle ones.
+
+    Every uploaded workbook is loaded into its own table named after its
+    content hash, so sessions never write to each other's tables and the
+    same file uploaded twice, in any session, is loaded once. Sessions take
+    a lease on the tables they query, renewed as they use them; leases are
+    stored in the database so several app processes see each other's.
+
+    ``collect`` drops tables nobody has used for ``ttl_seconds``, then, while
+    the dataset tables take more than ``max_bytes``, the least recently used
+    tables without a live lease. Sessions that go away without releasing
+    their tables simply stop renewing their leases, which then expire.
+    Uploads lease their workbook's table name before loading; a per-sheet
+    table without a lease of its own is covered by its workbook's lease, and
+    a table left by a failed load without any is dropped as idle.
+
+    Attributes:
+        db: Database interface the tables live in.
+        prefix (str): Prefix of dataset table names (``EXCEL_TABLE_NAME``).
+        ttl_seconds (float): Idle time after which leases expire and tables are dropped.
+        max_bytes (int): Storage quota of all dataset tables (0 for none).
+        gc_interval_seconds (float): Minimum time between automatic collections.
+        rollups (Optional[RollupManager]): Rollups dropped with their table.
+        optimizer (Optional[TableOptimizer]): Optimizer forgetting dropped tables.
+        schema_renderer (Optional[SchemaRenderer]): Renderer forgetting dropped tables.
+        used_bytes (int): Storage of the dataset tables at the last collection.
+
+    """
+
+    def __init__(self, db, cfg, rollups=None, optimizer=None, schema_renderer=None):
+        """Initialize the registry.
+
+        Args:
+            db: Database interface object.
+            cfg (dynaconf.Dynaconf): Configuration object. Optional keys:
+                - TABLES.TTL_SECONDS (default 3600)
+                - TABLES.MAX_BYTES (default 10 GiB, 0 for no quota)
+                - TABLES.GC_INTERVAL_SECONDS (default 300)
+            rollups (RollupManager, optional): Rollups of the dataset tables.
+            optimizer (TableOptimizer, optional): Index optimizer of the dataset tables.
+            schema_renderer (SchemaRenderer, optional): Profiles of the dataset tables.
+
+        """
+        tables_cfg = cfg.get("TABLES", {})
+        self.db = db
+        self.prefix = cfg["EXCEL_TABLE_NAME"]
+        self.ttl_seconds = float(tables_cfg.get("TTL_SECONDS", 3600))
+        self.max_bytes = int(tables_cfg.get("MAX_BYTES", 10 * 1024 ** 3))
+        self.gc_interval_seconds = float(tables_cfg.get("GC_INTERVAL_SECONDS", 300))
+        self.rollups = rollups
+        self.optimizer = optimizer
+        self.schema_renderer = schema_renderer
+        self._lock = threading.Lock()
+        self._ingest_locks = defaultdict(threading.Lock)
+        self._renewed = {}
+        self.used_bytes = 0
+        self._collected_at = 0.0
+        self._registry_ready = False
+
+    def _ensure_registry(self):
+        """Create the lease table on first use."""
+        if not self._registry_ready:
+            SQLModel.metadata.create_all(self.db.engine, tables=[TableLease.__table__])
+            self._registry_ready = True
+
+    def table_name(self, content_hash: str) -> str:
+        """Name of the dataset table holding a workbook's content.
+
+        Args:
+            content_hash (str): Hash of the workbook content.
+
+        Returns:
+            str: Table name, also the prefix of the workbook's per-sheet tables.
+
+        """
+        return f"{self.prefix}_{content_hash[:16]}"
+
+    def is_dataset_table(self, table_name: str) -> bool:
+        """Whether a table is a content-named dataset table managed here.
+
+        Args:
+            table_name (str): Table name.
+
+        Returns:
+            bool: True for ``table_name`` results and their per-sheet tables.
+
+        """
+        return re.fullmatch(rf"{re.escape(self.prefix)}_[0-9a-f]{{16}}(_\w+)?", table_name) is not None
+
+    def _workbook_of(self, table_name: str) -> str:
+        """Workbook table name (the ``table_name`` result) a dataset table belongs to."""
+        return table_name[:len(self.prefix) + 17]
+
+    @contextmanager
+    def ingest_lock(self, table_names):
+        """Serialize loads of the same dataset tables within this process.
+
+        Locks are taken in sorted order, so loads of overlapping sets of
+        workbooks cannot deadlock. Loads of different tables run concurrently.
+
+        Args:
+            table_names (Iterable[str]): Dataset table names (or prefixes) being loaded.
+
+        """
+        with self._lock:
+            locks = [self._ingest_locks[name] for name in sorted(set(table_names))]
+        with ExitStack() as stack:
+            for lock in locks:
+                stack.enter_context(lock)
+            yield
+
+    def acquire(self, session_id: str, table_names):
+        """Take (or renew) a session's lease on dataset tables.
+
+        Args:
+            session_id (str): Session using the tables.
+            table_names (Iterable[str]): Tables the session queries.
+
+        """
+        self._ensure_registry()
+        now = time.time()
+        with Session(self.db.engine) as session:
+            for table_name in table_names:
+                session.merge(TableLease(table_name=table_name, session_id=session_id, last_used=now))
+                self._renewed[(session_id, table_name)] = now
+            session.commit()
+
+    def touch(self, session_id: str, table_names):
+        """Renew a session's leases as it uses its tables.
+
+        Leases are written at most every tenth of the TTL per table.
+
+        Args:
+            session_id (str): Session using the tables.
+            table_names (Iterable[str]): Tables the session is querying.
+
+        Returns:
+            List[str]: Tables that were dropped after the session's lease
+                expired; the session must load them again.
+
+        """
+        self._ensure_registry()
+        now = time.time()
+        due = [
+            table_name for table_name in table_names
+            if now - self._renewed.get((session_id, table_name), 0.0) >= self.ttl_seconds / 10
+        ]
+        if not due:
+            return []
+        with Session(self.db.engine) as session:
+            renewed = set(session.exec(
+                select(TableLease.table_name).where(TableLease.session_id == session_id, TableLease.table_name.in_(due))
+            ))
+            session.execute(
+                update(TableLease)
+                .where(TableLease.session_id == session_id, TableLease.table_name.in_(due))
+                .values(last_used=now)
+            )
+            session.commit()
+        for table_name in renewed:
+            self._renewed[(session_id, table_name)] = now
+        # The lease expired; the table survives only if nobody collected it yet.
+        lapsed = [table_name for table_name in due if table_name not in renewed]
+        missing = [table_name for table_name in lapsed if self.db.table_content_hash(table_name) is None]
+        if len(missing) < len(lapsed):
+            self.acquire(session_id, [table_name for table_name in lapsed if table_name not in missing])
+        return missing
+
+    def release(self, session_id: str, table_names=None):
+        """End a session's leases; the tables stay available to others until idle for the TTL.
+
+        Args:
+            session_id (str): Session giving up the tables.
+            table_names (Iterable[str], optional): Tables to release.
+                Defaults to every table the session holds.
+
+        """
+        self._ensure_registry()
+        now = time.time()
+        with Session(self.db.engine) as session:
+            query = select(TableLease).where(TableLease.session_id == session_id)
+            if table_names is not None:
+                query = query.where(TableLease.table_name.in_(list(table_names)))
+            for lease in session.exec(query).all():
+                session.delete(lease)
+                session.merge(TableLease(table_name=lease.table_name, session_id="", last_used=now))
+                self._renewed.pop((session_id, lease.table_name), None)
+            session.commit()
+
+    def usage(self):
+        """Return the size, last use and live lease count of every dataset table.
+
+        Tables in the catalog without lease rows of their own take those of
+        their workbook's table name, leased before the load; with neither
+        they count as never used.
+
+        Returns:
+            Dict[str, dict]: ``bytes``, ``last_used`` and ``references`` per
+                leased or existing dataset table.
+
+        """
+        self._ensure_registry()
+        expired = time.time() - self.ttl_seconds
+        tables = {}
+        with Session(self.db.engine) as session:
+            for lease in session.exec(select(TableLease)).all():
+                entry = tables.setdefault(lease.table_name, {"last_used": 0.0, "references": 0})
+                entry["last_used"] = max(entry["last_used"], lease.last_used)
+                if lease.session_id and lease.last_used >= expired:
+                    entry["references"] += 1
+        for table_name in inspect(self.db.engine).get_table_names():
+            if self.is_dataset_table(table_name) and table_name not in tables:
+                workbook = tables.get(self._workbook_of(table_name), {"last_used": 0.0, "references": 0})
+                tables[table_name] = dict(workbook)
+        for table_name, entry in tables.items():
+            entry["bytes"] = self.db.table_size(table_name)
+        return tables
+
+    def exclusive(self, session_id: str, table_name: str) -> bool:
+        """Whether no other session holds a live lease on a dataset table.
+
+        Only such a table may be changed in place, e.g. by an incremental reload.
+
+        Args:
+            session_id (str): Session asking.
+            table_name (str): Dataset table.
+
+        Returns:
+            bool: True if the table is unused or used by ``session_id`` alone.
+
+        """
+        self._ensure_registry()
+        expired = time.time() - self.ttl_seconds
+        with Session(self.db.engine) as session:
+            holders = session.exec(
+                select(TableLease.session_id).where(
+                    TableLease.table_name == table_name,
+                    TableLease.session_id.not_in(["", session_id]),
+                    TableLease.last_used >= expired,
+                )
+            ).first()
+        return holders is None
+
+    def detach(self, table_name: str):
+        """Drop the rollups, automatic indexes and cached metadata of a dataset table.
+
+        Run before a table is renamed; dropping it does this as well.
+
+        Args:
+            table_name (str): Dataset table.
+
+        """
+        if self.rollups is not None:
+            self.rollups.drop(table_name)
+        if self.optimizer is not None:
+            self.optimizer.forget(table_name)
+        if self.schema_renderer is not None:
+            self.schema_renderer.forget(table_name)
+
+    def drop(self, table_name: str):
+        """Drop a dataset table with its rollups, leases and cached metadata.
+
+        Args:
+            table_name (str): Dataset table to drop.
+
+        """
+        self.detach(table_name)
+        self.db.drop_table(table_name)
+        with Session(self.db.engine) as session:
+            session.execute(delete(TableLease).where(TableLease.table_name == table_name))
+            session.commit()
+
+    def collect(self, force: bool = False):
+        """Drop idle dataset tables, then the least recently used unleased ones over the quota.
+
+        Runs at most every ``gc_interval_seconds`` unless forced.
+
+        Args:
+            force (bool, optional): Collect even if the last run was recent.
+
+        Returns:
+            List[str]: Names of the dropped tables.
+
+        """
+        now = time.time()
+        with self._lock:
+            if not force and now - self._collected_at < self.gc_interval_seconds:
+                return []
+            self._collected_at = now
+
+        with span("tables.collect") as collect_span:
+            usage = {name: entry for name, entry in self.usage().items() if self.is_dataset_table(name)}
+            idle = [name for name, entry in usage.items() if entry["last_used"] < now - self.ttl_seconds]
+            for table_name in idle:
+                self.drop(table_name)
+                usage.pop(table_name)
+
+            dropped = list(idle)
+            used = sum(entry["bytes"] for entry in usage.values())
+            if self.max_bytes:
+                unleased = sorted(
+                    (entry["last_used"], name) for name, entry in usage.items() if not entry["references"]
+                )
+                for _, table_name in unleased:
+                    if used <= self.max_bytes:
+                        break
+                    used -= usage[table_name]["bytes"]
+                    self.drop(table_name)
+                    dropped.append(table_name)
+            self.used_bytes = used
+            collect_span.set(tables=len(usage) + len(idle), dropped=len(dropped), bytes=used)
+        return dropped
+
+    def reserve(self):
+        """Make room for a new upload.
+
+        Raises:
+            StorageQuotaError: If the tables in use already fill the quota.
+
+        """
+        self.collect(force=True)
+        if self.max_bytes and self.used_bytes >= self.max_bytes:
+            raise StorageQuotaError(
+                f"Storage quota reached: {self.used_bytes / 1024 ** 2:,.0f} MiB of {self.max_bytes / 1024 ** 2:,.0f} MiB "
+                "is held by datasets in use. Try again once other sessions are idle."
+            )
@@ -0,0 +1,396 @@
+"""Per-stage tracing and profiling module for Excel Query Bot.
+
+Spans time the stages of an upload or a question (file parse, database
+write, schema extraction, LLM calls, SQL execution, result conversion).
+Finished spans are appended as JSON lines to a trace file by a background
+writer thread and aggregated
+into per-stage counters served in Prometheus text format on a local port.
+Root spans slower than a threshold can keep a sampling profile of every
+thread, written as folded stacks for flame graph tools.
+
+Spans nest through a context variable, which follows the work onto the
+shared event loop, worker threads and SQLAlchemy greenlets, so all spans of
+one question share its trace id.
+
+Classes:
+    Span: One timed stage with its attributes.
+    SamplingProfiler: Samples the stacks of all threads at a fixed interval.
+    Tracer: Records spans, exports them and profiles slow root spans.
+
+Functions:
+    set_tracer: Install the process-wide tracer.
+    span: Time a stage with the process-wide tracer.
+    record_span: Record an already timed stage with the process-wide tracer.
+"""
+
+import atexit
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_current_span = ContextVar("current_span", default=None)
+_tracer = None
+
+
+class Span:
+    """One timed stage with its attributes.
+
+    Attributes:
+        name (str): Stage name, e.g. ``"sql.execute"``.
+        trace_id (str): Id shared by all spans of one root span.
+        span_id (str): Id of this span.
+        parent_id (Optional[str]): Id of the enclosing span.
+        start (float): Wall-clock start time (epoch seconds).
+        duration (float): Duration in seconds, set when the span ends.
+        attrs (dict): Stage attributes such as row or token counts.
+
+    """
+
+    def __init__(self, name: str, parent=None, **attrs):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self.duration = None
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        """Add or replace attributes of the span."""
+        self.attrs.update(attrs)
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_ms": None if self.duration is None else self.duration * 1000,
+            "attrs": self.attrs,
+        }
+
+
+class _NullSpan:
+    """Span returned while tracing is disabled."""
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class SamplingProfiler:
+    """Samples the Python stacks of all threads at a fixed interval.
+
+    Sampling runs in its own daemon thread through ``sys._current_frames``,
+    so the work on the Streamlit thread, the shared event loop and worker
+    threads is all captured without instrumenting it.
+
+    Attributes:
+        interval (float): Seconds between samples.
+        stacks (Counter): Sample count per folded stack.
+
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start sampling in a daemon thread."""
+        self._thread = threading.Thread(target=self._sample, name="excel-query-bot-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the sampling thread."""
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            names.update((thread.ident, thread.name) for thread in threading.enumerate())
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write(self, path: str):
+        """Write the samples as folded stacks (``frame;frame count`` lines)."""
+        with open(path, "w", encoding="utf-8") as handle:
+            for stack, count in self.stacks.most_common():
+                handle.write(f"{stack} {count}\n")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    tracer = None
+
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.tracer.metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Tracer:
+    """Records spans, exports them and profiles slow root spans.
+
+    Attributes:
+        trace_file (Optional[str]): JSONL file finished spans are appended to.
+        metrics_port (int): Local port of the Prometheus metrics endpoint (0 disables it).
+        profile_slow_seconds (float): Root spans at least this slow keep their
+            profile (0 disables profiling).
+        profile_sample_rate (float): Fraction of root spans that are profiled.
+            Sampling slows the profiled request down, so keep it small.
+        profile_interval (float): Seconds between profiler samples.
+        profile_dir (str): Directory the folded stack profiles are written to.
+        stats (Dict[str, List[float]]): ``[count, total seconds, max seconds]`` per span name.
+        dropped (int): Spans not written because the write buffer was full.
+
+    """
+
+    # Finished spans waiting for the writer thread; beyond this they are dropped.
+    MAX_BUFFERED_SPANS = 10000
+
+    def __init__(
+        self,
+        trace_file=None,
+        metrics_port: int = 0,
+        profile_slow_seconds: float = 0.0,
+        profile_sample_rate: float = 0.01,
+        profile_interval: float = 0.005,
+        profile_dir: str = ".cache/profiles",
+    ):
+        """Initialize the tracer and start the metrics endpoint if enabled.
+
+        Args:
+            trace_file (str, optional): JSONL file for finished spans.
+            metrics_port (int, optional): Local metrics port, 0 to disable.
+            profile_slow_seconds (float, optional): Profile threshold, 0 to disable.
+            profile_sample_rate (float, optional): Fraction of root spans profiled.
+                Defaults to 0.01.
+            profile_interval (float, optional): Seconds between profiler samples.
+            profile_dir (str, optional): Directory for folded stack profiles.
+
+        """
+        self.trace_file = trace_file
+        self.metrics_port = metrics_port
+        self.profile_slow_seconds = profile_slow_seconds
+        self.profile_sample_rate = profile_sample_rate
+        self.profile_interval = profile_interval
+        self.profile_dir = profile_dir
+        self.stats = defaultdict(lambda: [0, 0.0, 0.0])
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._spans = queue.Queue(maxsize=self.MAX_BUFFERED_SPANS)
+        if trace_file:
+            os.makedirs(os.path.dirname(trace_file) or ".", exist_ok=True)
+            threading.Thread(target=self._write_spans, name="excel-query-bot-traces", daemon=True).start()
+            atexit.register(self.flush)
+        if metrics_port:
+            handler = type("MetricsHandler", (_MetricsHandler,), {"tracer": self})
+            server = ThreadingHTTPServer(("127.0.0.1", metrics_port), handler)
+            threading.Thread(target=server.serve_forever, name="excel-query-bot-metrics", daemon=True).start()
+
+    @classmethod
+    def from_config(cls, cfg):
+        """Build a tracer from the ``TRACING`` configuration section.
+
+        Args:
+            cfg (dynaconf.Dynaconf): Configuration object. Optional keys:
+                - TRACING.ENABLED (default true)
+                - TRACING.FILE (default ".cache/traces.jsonl", empty to disable)
+                - TRACING.METRICS_PORT (default 0, disabled)
+                - TRACING.PROFILE_SLOW_SECONDS (default 0, disabled)
+                - TRACING.PROFILE_SAMPLE_RATE (default 0.01)
+                - TRACING.PROFILE_INTERVAL (default 0.005)
+                - TRACING.PROFILE_DIR (default ".cache/profiles")
+
+        Returns:
+            Optional[Tracer]: Configured tracer, or None when disabled.
+
+        """
+        tracing_cfg = cfg.get("TRACING", {})
+        if not tracing_cfg.get("ENABLED", True):
+            return None
+        return cls(
+            trace_file=tracing_cfg.get("FILE", ".cache/traces.jsonl") or None,
+            metrics_port=int(tracing_cfg.get("METRICS_PORT", 0)),
+            profile_slow_seconds=float(tracing_cfg.get("PROFILE_SLOW_SECONDS", 0)),
+            profile_sample_rate=float(tracing_cfg.get("PROFILE_SAMPLE_RATE", 0.01)),
+            profile_interval=float(tracing_cfg.get("PROFILE_INTERVAL", 0.005)),
+            profile_dir=tracing_cfg.get("PROFILE_DIR", ".cache/profiles"),
+        )
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Time a stage as a child of the current span.
+
+        Args:
+            name (str): Stage name.
+            **attrs: Initial span attributes.
+
+        Yields:
+            Span: The open span; add attributes with ``Span.set``.
+
+        """
+        current = Span(name, parent=_current_span.get(), **attrs)
+        token = _current_span.set(current)
+        profiler = None
+        if (
+            current.parent_id is None
+            and self.profile_slow_seconds
+            and random.random() < self.profile_sample_rate
+        ):
+            profiler = SamplingProfiler(self.profile_interval)
+            profiler.start()
+        started = time.perf_counter()
+        try:
+            yield current
+        except BaseException as e:
+            current.set(error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            current.duration = time.perf_counter() - started
+            _current_span.reset(token)
+            if profiler is not None:
+                profiler.stop()
+                if current.duration >= self.profile_slow_seconds:
+                    os.makedirs(self.profile_dir, exist_ok=True)
+                    path = os.path.join(self.profile_dir, f"{current.name}-{current.trace_id}.folded")
+                    profiler.write(path)
+                    current.set(profile=path)
+            self.export(current)
+
+    def record(self, name: str, duration: float, **attrs):
+        """Record a stage that was timed elsewhere (e.g. by callbacks) under the current span.
+
+        Args:
+            name (str): Stage name.
+            duration (float): Duration in seconds.
+            **attrs: Span attributes.
+
+        """
+        recorded = Span(name, parent=_current_span.get(), **attrs)
+        recorded.start -= duration
+        recorded.duration = duration
+        self.export(recorded)
+
+    def export(self, finished: Span):
+        """Aggregate a finished span and queue it for the trace file."""
+        with self._lock:
+            entry = self.stats[finished.name]
+            entry[0] += 1
+            entry[1] += finished.duration
+            entry[2] = max(entry[2], finished.duration)
+        if self.trace_file:
+            try:
+                self._spans.put_nowait(finished)
+            except queue.Full:
+                with self._lock:
+                    self.dropped += 1
+
+    def flush(self):
+        """Wait until every queued span is written to the trace file."""
+        if self.trace_file:
+            self._spans.join()
+
+    def _write_spans(self):
+        """Append queued spans to the trace file in batches; runs on the writer thread."""
+        with open(self.trace_file, "a", encoding="utf-8") as handle:
+            while True:
+                batch = [self._spans.get()]
+                while True:
+                    try:
+                        batch.append(self._spans.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    handle.write("".join(json.dumps(finished.to_dict(), default=str) + "\n" for finished in batch))
+                    handle.flush()
+                finally:
+                    for _ in batch:
+                        self._spans.task_done()
+
+    def metrics(self) -> str:
+        """Render the per-stage counters in Prometheus text format."""
+        lines = [
+            "# TYPE excel_query_bot_stage_seconds summary",
+            "# TYPE excel_query_bot_stage_max_seconds gauge",
+        ]
+        with self._lock:
+            for name, (count, total, longest) in sorted(self.stats.items()):
+                lines.append(f'excel_query_bot_stage_seconds_count{{stage="{name}"}} {count}')
+                lines.append(f'excel_query_bot_stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+                lines.append(f'excel_query_bot_stage_max_seconds{{stage="{name}"}} {longest:.6f}')
+        return "\n".join(lines) + "\n"
+
+
+def set_tracer(tracer):
+    """Install the process-wide tracer used by ``span`` and ``record_span``.
+
+    Args:
+        tracer (Optional[Tracer]): Tracer to install, or None to disable tracing.
+
+    """
+    global _tracer
+    _tracer = tracer
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Time a stage with the process-wide tracer; a no-op when none is installed.
+
+    Args:
+        name (str): Stage name.
+        **attrs: Initial span attributes.
+
+    Yields:
+        Span: The open span (a no-op span when tracing is disabled).
+
+    """
+    if _tracer is None:
+        yield _NULL_SPAN
+        return
+    with _tracer.span(name, **attrs) as current:
+        yield current
+
+
+def record_span(name: str, duration: float, **attrs):
+    """Record an already timed stage with the process-wide tracer, if any.
+
+    Args:
+        name (str): Stage name.
+        duration (float): Duration in seconds.
+        **attrs: Span attributes.
+
+    """
+    if _tracer is not None:
+        _tracer.record(name, duration, **attrs)
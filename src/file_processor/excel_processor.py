@@ -4,7 +4,47 @@ Classes:
     ExcelProcessor: Main class for Excel file processing and database storage.
 """
 
+import hashlib
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextvars import copy_context
+from itertools import islice
+
 import pandas as pd
+from openpyxl import load_workbook
+
+from src.core.database import ROW_HASH_COLUMN
+from src.core.tracing import record_span, span
+from src.file_processor.type_inference import TypeInferrer
+from src.file_processor.workbook_cache import WorkbookCache
+
+# PostgreSQL truncates identifiers longer than this many bytes.
+MAX_TABLE_NAME_LENGTH = 63
+
+
+def _read_sheet(file_path, sheet_name, header_row, inferrer=None):
+    """Read and clean one worksheet; runs inside a worker process.
+
+    Args:
+        file_path (str): Path to the Excel file.
+        sheet_name (str): Worksheet to read.
+        header_row (int): Row index to use as column headers.
+        inferrer (TypeInferrer, optional): Compacts the column dtypes, so
+            less data is sent back to the parent process.
+
+    Returns:
+        Tuple[pandas.DataFrame, float]: Sheet data with cleaned column names
+            and the parse time in seconds.
+
+    """
+    started = time.perf_counter()
+    df = pd.read_excel(file_path, sheet_name=sheet_name, header=header_row)
+    df.columns = ExcelProcessor.clean_column_names(df.columns)
+    if inferrer is not None:
+        df = inferrer.compact(df)
+    return df, time.perf_counter() - started
 
 
 class ExcelProcessor:
@@ -13,6 +53,15 @@ class ExcelProcessor:
     Attributes:
         db: Database interface object for data persistence.
         cfg: Configuration object containing processing settings.
+        chunk_size (int): Number of rows read and written per chunk in
+            streaming mode.
+        max_workers (int): Worker processes used to parse sheets in parallel.
+        cache (Optional[WorkbookCache]): Cache of parsed workbooks, or None if disabled.
+        inferrer (Optional[TypeInferrer]): Column type inference, or None if disabled.
+        incremental (bool): Store row hashes and reload changed files as a delta.
+        key_columns (List[str]): Default key columns identifying a row in deltas.
+        max_delta_ratio (float): Share of changed rows above which a reload
+            replaces the table instead of applying a delta.
         
     """
     
@@ -25,12 +74,94 @@ class ExcelProcessor:
         Args:
             db: Database interface object with save_df method.
             cfg: Configuration object containing processing settings.
+                Optional keys:
+                - INGEST.CHUNK_SIZE: Rows per chunk in streaming mode.
+                - INGEST.MAX_WORKERS: Parser processes for multi-sheet
+                  ingestion (default: CPU count).
+                - INGEST.INCREMENTAL: Store row hashes and reload changed
+                  files as a delta (default: true).
+                - INGEST.KEY_COLUMNS: Columns identifying a row, used to
+                  tell updated rows from inserted and deleted ones.
+                - INGEST.MAX_DELTA_RATIO: Changed row share above which the
+                  table is replaced instead (default: 0.5).
+                - INGEST.INFER_TYPES, INGEST.CATEGORY_MAX_RATIO: Column
+                  type inference, see ``TypeInferrer.from_config``.
+                - CACHE.*: Parsed workbook cache settings, see
+                  ``WorkbookCache.from_config``.
                 
         """
         self.db = db
         self.cfg = cfg
+        self.chunk_size = int(cfg.get("INGEST", {}).get("CHUNK_SIZE", 50000))
+        self.max_workers = int(cfg.get("INGEST", {}).get("MAX_WORKERS", 0)) or os.cpu_count() or 1
+        self.cache = WorkbookCache.from_config(cfg)
+        self.inferrer = TypeInferrer.from_config(cfg)
+        self.incremental = bool(cfg.get("INGEST", {}).get("INCREMENTAL", True))
+        self.key_columns = list(cfg.get("INGEST", {}).get("KEY_COLUMNS", []))
+        self.max_delta_ratio = float(cfg.get("INGEST", {}).get("MAX_DELTA_RATIO", 0.5))
     
-    def process_excel(self, file_path: str, header_row=0):
+    @staticmethod
+    def clean_column_names(columns):
+        """Normalize column names for use as SQL identifiers.
+
+        Strips whitespace, replaces spaces with underscores and lowercases
+        each name. Empty or missing headers are named after their position.
+
+        Args:
+            columns (Iterable): Raw header values.
+
+        Returns:
+            List[str]: Cleaned column names.
+
+        """
+        cleaned = []
+        for idx, col in enumerate(columns):
+            name = "" if col is None else str(col).strip()
+            cleaned.append(name.replace(' ', '_').lower() or f"column_{idx}")
+        return cleaned
+
+    @staticmethod
+    def row_hashes(df):
+        """Hash every row of a DataFrame from its values.
+
+        Numbers are hashed as float64, so a row hashes the same whichever
+        integer or float dtype inference picked for its columns.
+
+        Args:
+            df (pandas.DataFrame): Sheet data.
+
+        Returns:
+            pandas.Series: Signed 64-bit hash per row, aligned with ``df``.
+
+        """
+        if len(df.columns):
+            df = pd.concat(
+                [
+                    series.astype("float64") if pd.api.types.is_numeric_dtype(series.dtype) else series
+                    for _, series in df.items()
+                ],
+                axis=1,
+            )
+        hashes = pd.util.hash_pandas_object(df, index=False).values.view("int64")
+        return pd.Series(hashes, index=df.index, name=ROW_HASH_COLUMN)
+
+    def _sql_types(self, df):
+        """SQL column types inferred for a DataFrame, or None to keep the pandas mapping."""
+        return self.inferrer.sql_types(df) if self.inferrer else None
+
+    def _cache_key(self, content_hash: str, header_row, sheet_name=None) -> str:
+        """Workbook cache key of one sheet; typed frames are cached apart from those parsed without inference."""
+        key = f"{content_hash}-{header_row}"
+        if sheet_name is not None:
+            # Sheet names may hold characters that are not valid in file names.
+            key += "-" + hashlib.sha256(str(sheet_name).encode()).hexdigest()[:16]
+        return key + ("-typed" if self.inferrer else "")
+
+    def _with_row_hashes(self, df):
+        """Add the hidden row hash column when incremental reloads are enabled."""
+        return df.assign(**{ROW_HASH_COLUMN: self.row_hashes(df)}) if self.incremental else df
+    
+    def process_excel(self, file_path: str, header_row=0, table_name=None):
         """Process Excel file and save cleaned data to database.
         
         Args:
@@ -38,20 +169,422 @@ class ExcelProcessor:
                 Must be a valid Excel file (.xlsx, .xls).
             header_row (int, optional): Row index to use as column headers.
                 Defaults to 0 (first row).
+            table_name (str, optional): Target table. Defaults to
+                ``EXCEL_TABLE_NAME``.
                 
         Returns:
-            pandas.DataFrame: Processed DataFrame with cleaned column names
-                and normalized data structure.
+            pandas.DataFrame: Processed DataFrame with cleaned column names,
+                compact column dtypes and normalized data structure.
                 
         """
-        # Read Excel file
-        df = pd.read_excel(file_path, header=header_row)
-        
-        # Clean column names (strip whitespace, replace spaces with underscores, lowercase)
-        df.columns = [col.strip().replace(' ', '_').lower() for col in df.columns]
+        df = self._parse(file_path, header_row)
         
         # Save to database
-        self.db.save_df(df, table_name=self.cfg["EXCEL_TABLE_NAME"])
+        self.db.save_df(
+            self._with_row_hashes(df),
+            table_name=table_name or self.cfg["EXCEL_TABLE_NAME"],
+            dtype=self._sql_types(df),
+        )
         
         return df
-    
+
+    def _parse(self, file_path: str, header_row=0):
+        """Read the first sheet of an Excel file into a DataFrame with cleaned column names and compact dtypes."""
+        with span("excel.parse", file=os.path.basename(file_path)) as parse_span:
+            # Read Excel file
+            df = pd.read_excel(file_path, header=header_row)
+
+            # Clean column names (strip whitespace, replace spaces with underscores, lowercase)
+            df.columns = self.clean_column_names(df.columns)
+            parse_span.set(rows=len(df), columns=len(df.columns))
+        return self.inferrer.compact(df) if self.inferrer else df
+
+    def process_excel_cached(
+        self, file_path: str, header_row=0, streaming=False, progress_callback=None, table_name=None,
+        base_table=None, key_columns=None,
+    ):
+        """Load an Excel file unless the same content is already in the database.
+
+        The file content hash is compared with the hash recorded for the target
+        table; if they match the reload is skipped entirely. Otherwise the
+        cleaned DataFrame is taken from the on-disk cache when present, and on
+        a miss the file is parsed and the result cached for the next upload.
+        With ``streaming`` a miss is ingested through
+        ``process_excel_streaming``, which caches the chunks as it writes them.
+
+        With incremental reloads, a file replacing an earlier version that is
+        still loaded (``base_table``, or the target table itself) is applied
+        as a delta instead, see ``apply_delta``; the base table then becomes
+        the target table.
+
+        Args:
+            file_path (str): Path to the Excel file to process.
+            header_row (int, optional): Row index to use as column headers.
+                Defaults to 0 (first row).
+            streaming (bool, optional): Stream the file in chunks on a cache
+                miss. Defaults to False.
+            progress_callback (Callable[[int, int], None], optional): Passed
+                to ``process_excel_streaming`` when streaming; otherwise called
+                once as ``(1, rows)`` after the whole table is written.
+            table_name (str, optional): Target table, e.g. the content-named
+                table from ``TableRegistry.table_name``. Defaults to
+                ``EXCEL_TABLE_NAME``.
+            base_table (str, optional): Table holding an earlier version of
+                the file, renamed to ``table_name`` after a delta.
+            key_columns (List[str], optional): Columns identifying a row.
+                Defaults to ``self.key_columns``.
+
+        Returns:
+            Optional[int]: Number of rows loaded (inserted, for a delta), or
+                None if the table was already up to date.
+
+        """
+        table_name = table_name or self.cfg["EXCEL_TABLE_NAME"]
+        with span("excel.ingest", file=os.path.basename(file_path), table=table_name) as ingest_span:
+            content_hash = WorkbookCache.content_hash(file_path)
+            if self.db.table_content_hash(table_name) == content_hash:
+                self.db.register_table(table_name)
+                ingest_span.set(source="unchanged")
+                return None
+
+            cache_key = self._cache_key(content_hash, header_row)
+            df = self.cache.get(cache_key) if self.cache else None
+            source = "cache" if df is not None else None
+            base_table = base_table or table_name
+            delta = None
+            # Only a completed earlier load can be diffed against.
+            if self.incremental and self.db.table_content_hash(base_table) is not None:
+                if df is None:
+                    df, source = self._parse(file_path, header_row=header_row), "parse"
+                    if self.cache:
+                        self.cache.put(cache_key, df)
+                delta = self.apply_delta(df, base_table, key_columns)
+            if delta is not None:
+                ingest_span.set(source="delta", **delta)
+                if base_table != table_name:
+                    self.db.rename_table(base_table, table_name)
+                rows = delta["inserted"] + delta["updated"]
+            elif df is not None:
+                ingest_span.set(source=source)
+                self.db.save_df(self._with_row_hashes(df), table_name=table_name, dtype=self._sql_types(df))
+                rows = len(df)
+            elif streaming:
+                ingest_span.set(source="stream")
+                rows = self.process_excel_streaming(
+                    file_path, header_row=header_row, progress_callback=progress_callback, table_name=table_name,
+                    cache_key=cache_key,
+                )
+            else:
+                ingest_span.set(source="parse")
+                df = self.process_excel(file_path, header_row=header_row, table_name=table_name)
+                if self.cache:
+                    self.cache.put(cache_key, df)
+                rows = len(df)
+            if df is not None and progress_callback:
+                progress_callback(1, rows)
+
+            self.db.record_content_hash(table_name, content_hash)
+            ingest_span.set(rows=rows)
+            return rows
+
+    def apply_delta(self, df, table_name: str, key_columns=None):
+        """Apply a new version of a sheet to the table holding the previous one, row by row.
+
+        Rows are compared by hash as multisets, so duplicate rows are kept
+        right: a hash occurring more often than before is inserted the extra
+        number of times, one occurring less often has its stored rows deleted
+        and its remaining copies inserted again. Deletes and inserts are
+        applied in one transaction. Key columns only classify the change:
+        keys both deleted and inserted count as updated rows.
+
+        Args:
+            df (pandas.DataFrame): New version with cleaned column names.
+            table_name (str): Table holding the previous version with row hashes.
+            key_columns (List[str], optional): Columns identifying a row.
+                Defaults to ``self.key_columns``.
+
+        Returns:
+            Optional[Dict[str, int]]: Inserted, updated and deleted row counts,
+                or None if the table must be replaced instead: it has no row
+                hashes or other columns, more than ``max_delta_ratio`` of its
+                rows changed, or the delta could not be written.
+
+        """
+        key_columns = list(self.key_columns if key_columns is None else key_columns)
+        stored = self.db.stored_row_hashes(table_name, key_columns)
+        if stored is None or stored[0] != list(df.columns):
+            return None
+
+        with span("excel.diff", table=table_name, rows=len(df)) as diff_span:
+            old = pd.DataFrame.from_records(stored[1], columns=[ROW_HASH_COLUMN, *key_columns])
+            hashes = self.row_hashes(df)
+            old_counts = old[ROW_HASH_COLUMN].value_counts()
+            shrunk = old_counts.index[old_counts > hashes.value_counts().reindex(old_counts.index, fill_value=0)]
+            inserted = hashes.isin(shrunk) | (hashes.groupby(hashes).cumcount() >= hashes.map(old_counts).fillna(0))
+            deleted = old[ROW_HASH_COLUMN].isin(shrunk)
+            diff_span.set(inserted=int(inserted.sum()), deleted=int(deleted.sum()))
+        if inserted.sum() + deleted.sum() > self.max_delta_ratio * max(len(old), len(df), 1):
+            return None
+
+        if key_columns:
+            new_keys = set(df.loc[inserted, key_columns].itertuples(index=False, name=None))
+            old_keys = set(old.loc[deleted, key_columns].itertuples(index=False, name=None))
+            counts = {
+                "inserted": len(new_keys - old_keys),
+                "updated": len(new_keys & old_keys),
+                "deleted": len(old_keys - new_keys),
+            }
+        else:
+            counts = {"inserted": int(inserted.sum()), "updated": 0, "deleted": int(deleted.sum())}
+        with span("excel.delta", table=table_name, **counts) as delta_span:
+            try:
+                self.db.apply_delta(
+                    table_name,
+                    df[inserted].assign(**{ROW_HASH_COLUMN: hashes[inserted]}),
+                    [int(row_hash) for row_hash in shrunk],
+                    dtype=self._sql_types(df),
+                )
+            except Exception as error:
+                # E.g. a new value that does not fit the stored column type;
+                # the transaction rolled back and the table is replaced instead.
+                delta_span.set(error=type(error).__name__)
+                return None
+        return counts
+
+    def process_excel_streaming(
+        self, file_path: str, header_row=0, chunk_size=None, progress_callback=None, table_name=None, cache_key=None,
+    ):
+        """Stream an Excel file into the database in fixed-size row chunks.
+
+        The sheet is read with openpyxl in read-only mode so only one chunk of
+        rows is held in memory at a time. Column names are normalized once from
+        the header row; the first chunk replaces the target table and every
+        following chunk is appended to it. Legacy ``.xls`` files are not
+        supported by openpyxl and are loaded through ``process_excel`` instead.
+
+        With type inference, column types are inferred from the first chunk
+        (without dictionary encoding) and later chunks are converted to them;
+        if a later chunk does not fit, e.g. text in a numeric column, the
+        file is reloaded whole through ``process_excel``.
+
+        With a ``cache_key``, every chunk is also appended to a workbook cache
+        entry, published once the last chunk is written, so the next upload
+        of the same file is served from the cache.
+
+        Args:
+            file_path (str): Path to the Excel file to process.
+            header_row (int, optional): Row index to use as column headers.
+                Defaults to 0 (first row).
+            chunk_size (int, optional): Rows per chunk. Defaults to
+                ``self.chunk_size``.
+            progress_callback (Callable[[int, int], None], optional): Called
+                after each chunk is written with the 1-based chunk number and
+                the total number of rows written so far.
+            table_name (str, optional): Target table. Defaults to
+                ``EXCEL_TABLE_NAME``.
+            cache_key (str, optional): Workbook cache entry to fill. Defaults
+                to None (not cached).
+
+        Returns:
+            int: Total number of data rows written to the database.
+
+        """
+        table_name = table_name or self.cfg["EXCEL_TABLE_NAME"]
+        if file_path.lower().endswith('.xls'):
+            df = self.process_excel(file_path, header_row=header_row, table_name=table_name)
+            if self.cache and cache_key:
+                self.cache.put(cache_key, df)
+            if progress_callback:
+                progress_callback(1, len(df))
+            return len(df)
+
+        chunk_size = chunk_size or self.chunk_size
+        entry = self.cache.writer(cache_key) if self.cache and cache_key else None
+
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = next(islice(rows, header_row, None), None)
+            if header is None:
+                raise ValueError(f"No header row found at index {header_row} in {file_path}")
+            columns = self.clean_column_names(header)
+            width = len(columns)
+
+            total_rows = 0
+            chunk_number = 0
+            dtypes = sql_types = None
+            while True:
+                with span("excel.parse", file=os.path.basename(file_path), chunk=chunk_number + 1) as parse_span:
+                    chunk = [
+                        row[:width] + (None,) * (width - len(row))
+                        for row in islice(rows, chunk_size)
+                    ]
+                    parse_span.set(rows=len(chunk))
+                if not chunk and chunk_number > 0:
+                    break
+                df = pd.DataFrame.from_records(chunk, columns=columns)
+                if self.inferrer and chunk_number == 0:
+                    df = self.inferrer.compact(df, categories=False)
+                    dtypes, sql_types = list(df.dtypes), self.inferrer.sql_types(df)
+                elif self.inferrer:
+                    df = self.inferrer.conform(df, dtypes)
+                    if df is None:
+                        break
+                if entry:
+                    entry.write(df)
+                self.db.save_df(
+                    self._with_row_hashes(df),
+                    table_name=table_name,
+                    if_exists='replace' if chunk_number == 0 else 'append',
+                    dtype=sql_types,
+                )
+                chunk_number += 1
+                total_rows += len(df)
+                if progress_callback:
+                    progress_callback(chunk_number, total_rows)
+                if len(chunk) < chunk_size:
+                    break
+        except BaseException:
+            if entry:
+                entry.abort()
+            raise
+        finally:
+            workbook.close()
+
+        if df is None:
+            # A later chunk does not fit the types inferred from the first one.
+            if entry:
+                entry.abort()
+            with span("excel.reload", file=os.path.basename(file_path), chunk=chunk_number + 1):
+                df = self.process_excel(file_path, header_row=header_row, table_name=table_name)
+            if self.cache and cache_key:
+                self.cache.put(cache_key, df)
+            if progress_callback:
+                progress_callback(chunk_number + 1, len(df))
+            return len(df)
+        if entry:
+            entry.commit()
+        return total_rows
+
+    def _write_sheet(self, df, table_name: str, cache_key=None):
+        """Save one parsed sheet to its table, then cache it under ``cache_key`` if given."""
+        self.db.save_df(df, table_name, dtype=self._sql_types(df))
+        if self.cache and cache_key:
+            self.cache.put(cache_key, df)
+
+    def sheet_table_name(self, source_name, sheet_name, taken=(), prefix=None):
+        """Build a unique SQL table name for one sheet of one file.
+
+        Args:
+            source_name (str): File name the sheet came from.
+            sheet_name (str): Worksheet name.
+            taken (Collection[str], optional): Names already assigned in this batch.
+            prefix (str, optional): Name prefix. Defaults to ``EXCEL_TABLE_NAME``.
+
+        Returns:
+            str: Lowercase identifier starting with ``prefix``.
+
+        """
+        stem = os.path.splitext(os.path.basename(source_name))[0]
+        slug = re.sub(r'[^0-9a-z]+', '_', f"{stem}_{sheet_name}".lower()).strip('_')
+        base = f"{prefix or self.cfg['EXCEL_TABLE_NAME']}_{slug}"[:MAX_TABLE_NAME_LENGTH]
+
+        table_name, suffix = base, 1
+        while table_name in taken:
+            suffix += 1
+            table_name = f"{base[:MAX_TABLE_NAME_LENGTH - len(str(suffix)) - 1]}_{suffix}"
+        return table_name
+
+    def process_workbooks(self, file_paths, header_row=0, source_names=None, progress_callback=None, table_prefixes=None):
+        """Ingest every sheet of every file, one table per sheet, in parallel.
+
+        Sheets are parsed in a process pool so parsing scales with the number
+        of cores; each parsed sheet is written to its own table by a thread
+        pool sized to the database connection pool as soon as it is ready.
+        Every table is registered on the database so ``extract_schemas`` and
+        the agent can see it. Sheets whose table was already loaded from the
+        same file content are not parsed again, and sheets found in the
+        workbook cache are written straight from it; parsed sheets are
+        cached as they are written.
+
+        Args:
+            file_paths (List[str]): Paths of the Excel files to ingest.
+            header_row (int, optional): Row index to use as column headers.
+                Defaults to 0 (first row).
+            source_names (List[str], optional): Original file names used to
+                name the tables, aligned with ``file_paths``. Defaults to the
+                file paths themselves.
+            progress_callback (Callable[[str, int, int], None], optional):
+                Called after each table is written with the table name, the
+                number of tables done and the total number of tables.
+            table_prefixes (List[str], optional): Table name prefix per file,
+                aligned with ``file_paths``, e.g. the content-named tables from
+                ``TableRegistry.table_name``. Defaults to ``EXCEL_TABLE_NAME``.
+
+        Returns:
+            Dict[str, Optional[int]]: Row count per table, in completion order;
+                None for tables that already held the file's content.
+
+        """
+        source_names = source_names or file_paths
+        table_prefixes = table_prefixes or [None] * len(file_paths)
+        jobs, taken, row_counts = [], set(), {}
+        for file_path, source_name, prefix in zip(file_paths, source_names, table_prefixes):
+            content_hash = WorkbookCache.content_hash(file_path)
+            with pd.ExcelFile(file_path) as workbook:
+                sheet_names = workbook.sheet_names
+            for sheet_name in sheet_names:
+                table_name = self.sheet_table_name(source_name, sheet_name, taken, prefix=prefix)
+                taken.add(table_name)
+                if self.db.table_content_hash(table_name) == content_hash:
+                    self.db.register_table(table_name)
+                    row_counts[table_name] = None
+                    continue
+                jobs.append((file_path, sheet_name, table_name, content_hash))
+
+        total = len(row_counts) + len(jobs)
+        if progress_callback:
+            for done, table_name in enumerate(row_counts, 1):
+                progress_callback(table_name, done, total)
+        if not jobs:
+            return row_counts
+
+        parse_workers = min(self.max_workers, len(jobs)) or 1
+        write_workers = min(self.db.pool_size, len(jobs)) or 1
+        with span("excel.ingest", files=len(file_paths), sheets=len(jobs), unchanged=len(row_counts)) as ingest_span, \
+                ProcessPoolExecutor(max_workers=parse_workers) as parsers, \
+                ThreadPoolExecutor(max_workers=write_workers) as writers:
+            parsed, written = {}, {}
+            for file_path, sheet_name, table_name, content_hash in jobs:
+                cache_key = self._cache_key(content_hash, header_row, sheet_name)
+                df = self.cache.get(cache_key) if self.cache else None
+                if df is None:
+                    parsed[parsers.submit(_read_sheet, file_path, sheet_name, header_row, self.inferrer)] = (
+                        table_name, content_hash, cache_key,
+                    )
+                    continue
+                # Each write runs in a copy of this context so its span nests under the ingest span.
+                written[writers.submit(copy_context().run, self._write_sheet, df, table_name)] = (
+                    table_name, len(df), content_hash,
+                )
+            ingest_span.set(cached=len(written))
+            del df
+
+            for future in as_completed(parsed):
+                table_name, content_hash, cache_key = parsed[future]
+                df, parse_seconds = future.result()
+                record_span("excel.parse", parse_seconds, table=table_name, rows=len(df), columns=len(df.columns))
+                written[writers.submit(copy_context().run, self._write_sheet, df, table_name, cache_key)] = (
+                    table_name, len(df), content_hash,
+                )
+                del df
+
+            for future in as_completed(written):
+                future.result()
+                table_name, rows, content_hash = written[future]
+                self.db.record_content_hash(table_name, content_hash)
+                row_counts[table_name] = rows
+                if progress_callback:
+                    progress_callback(table_name, len(row_counts), total)
+
+        return row_counts
@@ -0,0 +1,251 @@
+"""Column type inference module for Excel Query Bot.
+
+Classes:
+    TypeInferrer: Shrinks DataFrame dtypes and maps them to the tightest SQL column types.
+"""
+
+import re
+import warnings
+
+import numpy as np
+import pandas as pd
+from pandas.api import types as ptypes
+from sqlalchemy.types import REAL, BigInteger, Boolean, Date, DateTime, Double, Integer, SmallInteger
+
+from src.core.tracing import span
+
+# Text read as booleans, compared stripped and lowercased.
+_BOOLEAN_STRINGS = {"true": True, "false": False, "yes": True, "no": False}
+
+# Numbers written with leading zeros (zip codes, account numbers) stay text.
+_LEADING_ZERO = re.compile(r"^\s*[+-]?0\d")
+
+_INT_DTYPES = (np.int8, np.int16, np.int32, np.int64)
+
+
+def _nullable(dtype):
+    """Nullable pandas counterpart of a NumPy integer dtype, e.g. ``Int8`` for int8."""
+    return ptypes.pandas_dtype(np.dtype(dtype).name.capitalize())
+
+
+class TypeInferrer:
+    """Shrinks DataFrame dtypes and maps them to the tightest SQL column types.
+
+    ``read_excel`` leaves many columns as ``object`` and integer columns with
+    gaps as float64, which ``to_sql`` turns into TEXT and DOUBLE columns.
+    ``compact`` converts every column to the smallest dtype holding its
+    values exactly:
+
+    - text holding only numbers, booleans ("true"/"false", "yes"/"no") or
+      dates is parsed into them, unless numbers have leading zeros;
+    - integers, and floats holding only whole numbers, become the smallest
+      integer dtype (nullable when the column has gaps);
+    - floats become float32 only when every value survives the round trip;
+    - remaining text with few distinct values is dictionary-encoded as a
+      ``category``.
+
+    ``sql_types`` then gives the column types to create the table with:
+    SMALLINT/INTEGER/BIGINT, REAL/DOUBLE, BOOLEAN, and DATE for timestamps
+    that are all at midnight. Text columns are left to the backend.
+
+    Attributes:
+        category_max_ratio (float): Maximum share of distinct values for a
+            text column to be dictionary-encoded.
+        date_sample_size (int): Values tried as dates before parsing a whole
+            text column.
+
+    """
+
+    def __init__(self, category_max_ratio: float = 0.5, date_sample_size: int = 100):
+        """Initialize the inferrer.
+
+        Args:
+            category_max_ratio (float, optional): Maximum share of distinct
+                values for dictionary encoding. Defaults to 0.5.
+            date_sample_size (int, optional): Values tried as dates first.
+                Defaults to 100.
+
+        """
+        self.category_max_ratio = category_max_ratio
+        self.date_sample_size = date_sample_size
+
+    @classmethod
+    def from_config(cls, cfg):
+        """Build an inferrer from the ``INGEST`` configuration section.
+
+        Args:
+            cfg (dynaconf.Dynaconf): Configuration object. Optional keys:
+                - INGEST.INFER_TYPES: Whether types are inferred (default true)
+                - INGEST.CATEGORY_MAX_RATIO: See ``category_max_ratio`` (default 0.5)
+
+        Returns:
+            Optional[TypeInferrer]: The inferrer, or None when it is disabled.
+
+        """
+        ingest_cfg = cfg.get("INGEST", {})
+        if not ingest_cfg.get("INFER_TYPES", True):
+            return None
+        return cls(category_max_ratio=float(ingest_cfg.get("CATEGORY_MAX_RATIO", 0.5)))
+
+    def compact(self, df, categories: bool = True):
+        """Convert every column to the smallest dtype holding its values exactly.
+
+        Args:
+            df (pandas.DataFrame): Sheet data as read.
+            categories (bool, optional): Dictionary-encode low-cardinality
+                text. Off for streamed chunks, whose later chunks may hold
+                values the first one has not seen. Defaults to True.
+
+        Returns:
+            pandas.DataFrame: The same data with compact dtypes.
+
+        """
+        if not len(df.columns):
+            return df
+        with span("excel.infer", rows=len(df), columns=len(df.columns)) as infer_span:
+            compacted = pd.concat([self._compact_column(series, categories) for _, series in df.items()], axis=1)
+            infer_span.set(
+                bytes_before=int(df.memory_usage(index=False, deep=True).sum()),
+                bytes_after=int(compacted.memory_usage(index=False, deep=True).sum()),
+            )
+        return compacted
+
+    def conform(self, df, dtypes):
+        """Convert a chunk to the dtypes inferred for an earlier chunk of the same sheet.
+
+        Args:
+            df (pandas.DataFrame): Chunk as read.
+            dtypes (List): Dtype of every column, by position.
+
+        Returns:
+            Optional[pandas.DataFrame]: The converted chunk, or None if a
+                value does not fit its column's dtype.
+
+        """
+        columns = []
+        for (_, series), dtype in zip(df.items(), dtypes):
+            converted = self._conform_column(series, dtype)
+            if converted is None:
+                return None
+            columns.append(converted)
+        return pd.concat(columns, axis=1) if columns else df
+
+    @staticmethod
+    def sql_types(df):
+        """Map compact dtypes to the tightest SQL column types.
+
+        Args:
+            df (pandas.DataFrame): Data returned by ``compact``.
+
+        Returns:
+            Dict[str, sqlalchemy.types.TypeEngine]: Column type per non-text
+                column, as accepted by ``DataFrame.to_sql``.
+
+        """
+        types = {}
+        for name, series in df.items():
+            dtype = series.dtype
+            if ptypes.is_bool_dtype(dtype):
+                types[name] = Boolean()
+            elif ptypes.is_integer_dtype(dtype):
+                size = dtype.itemsize * (2 if ptypes.is_unsigned_integer_dtype(dtype) else 1)
+                types[name] = SmallInteger() if size <= 2 else Integer() if size <= 4 else BigInteger()
+            elif ptypes.is_float_dtype(dtype):
+                types[name] = REAL() if dtype.itemsize <= 4 else Double()
+            elif ptypes.is_datetime64_dtype(dtype):
+                values = series.dropna()
+                types[name] = Date() if (values == values.dt.normalize()).all() else DateTime()
+        return types
+
+    def _compact_column(self, series, categories: bool):
+        if series.dtype == object:
+            series = self._parse_text(series)
+        if ptypes.is_bool_dtype(series.dtype):
+            return series
+        if ptypes.is_integer_dtype(series.dtype) or ptypes.is_float_dtype(series.dtype):
+            return self._compact_number(series)
+        if categories and series.dtype == object:
+            values = series.dropna()
+            if len(values) and ptypes.infer_dtype(values, skipna=False) == "string" \
+                    and values.nunique() <= self.category_max_ratio * len(values):
+                return series.astype("category")
+        return series
+
+    def _parse_text(self, series):
+        """Parse an object column holding only booleans, numbers or dates; other columns are returned as is."""
+        values = series.dropna()
+        if not len(values):
+            return series
+        kind = ptypes.infer_dtype(values, skipna=False)
+        if kind == "boolean":
+            return series.astype("boolean")
+        if kind in ("integer", "floating", "mixed-integer-float", "decimal"):
+            return pd.to_numeric(series)
+        if kind in ("datetime", "datetime64", "date"):
+            return self._as_datetime(series, sample=False)
+        if kind != "string":
+            return series
+
+        text = values.str.strip().str.lower()
+        if text.isin(_BOOLEAN_STRINGS).all():
+            return series.str.strip().str.lower().map(_BOOLEAN_STRINGS).astype("boolean")
+        if not values.str.match(_LEADING_ZERO).any():
+            numbers = pd.to_numeric(series, errors="coerce")
+            if numbers.notna().sum() == len(values):
+                return numbers
+        return self._as_datetime(series, sample=True)
+
+    def _as_datetime(self, series, sample: bool):
+        """Parse a column as timestamps, or return it unchanged if any value is not a date."""
+        values = series.dropna()
+        with warnings.catch_warnings():
+            # Formats pandas cannot infer fall back to per-value parsing, with a warning.
+            warnings.simplefilter("ignore")
+            if sample and pd.to_datetime(values.iloc[:self.date_sample_size], errors="coerce").isna().any():
+                return series
+            parsed = pd.to_datetime(series, errors="coerce")
+        return parsed if parsed.notna().sum() == len(values) else series
+
+    @staticmethod
+    def _compact_number(series):
+        values = series.dropna()
+        if ptypes.is_float_dtype(series.dtype):
+            whole = len(values) and np.isfinite(values).all() and (values % 1 == 0).all()
+            if not whole:
+                exact = (values.to_numpy(np.float32).astype(np.float64) == values.to_numpy(np.float64)).all()
+                return series.astype(np.float32) if exact else series
+        if not len(values):
+            return series
+        for dtype in _INT_DTYPES:
+            info = np.iinfo(dtype)
+            if info.min <= values.min() and values.max() <= info.max:
+                nullable = series.isna().any() or ptypes.is_extension_array_dtype(series.dtype)
+                return series.astype(_nullable(dtype) if nullable else dtype)
+        return series
+
+    def _conform_column(self, series, dtype):
+        present = series.notna()
+        try:
+            if ptypes.is_bool_dtype(dtype):
+                converted = self._parse_text(series.astype(object)) if series.dtype == object else series.astype(dtype)
+                if not ptypes.is_bool_dtype(converted.dtype):
+                    return None
+            elif ptypes.is_datetime64_dtype(dtype):
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    converted = pd.to_datetime(series, errors="coerce")
+            elif ptypes.is_integer_dtype(dtype) or ptypes.is_float_dtype(dtype):
+                numbers = pd.to_numeric(series, errors="coerce")
+                if ptypes.is_integer_dtype(dtype) and not ptypes.is_extension_array_dtype(dtype) and numbers.isna().any():
+                    # Gaps in a later chunk only need the nullable dtype; the SQL type is the same.
+                    dtype = _nullable(dtype)
+                converted = numbers.astype(dtype)
+                # Casting wraps or rounds values that do not fit instead of failing.
+                values = numbers[numbers.notna()].astype(np.float64)
+                if not (converted[numbers.notna()].astype(np.float64) == values).all():
+                    return None
+            else:
+                converted = series
+        except (TypeError, ValueError, OverflowError):
+            return None
+        return converted if (converted.notna() == present).all() else None
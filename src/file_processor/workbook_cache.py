@@ -0,0 +1,261 @@
+"""Content-addressed on-disk cache of parsed workbooks for Excel Query Bot.
+
+Classes:
+    WorkbookCache: Size-bounded LRU cache of cleaned DataFrames stored as Arrow IPC files.
+    CacheEntryWriter: Writes one cache entry chunk by chunk.
+"""
+
+import hashlib
+import os
+import threading
+
+import pyarrow as pa
+from pyarrow import feather
+
+
+class WorkbookCache:
+    """Size-bounded LRU cache of parsed workbooks keyed by file content hash.
+
+    Entries are written as uncompressed Arrow IPC (Feather v2) files so they
+    can be memory-mapped on read. The modification time of an entry is
+    refreshed on every hit and used as its recency for LRU eviction.
+
+    Attributes:
+        directory (str): Directory holding the cached ``.arrow`` files.
+        max_bytes (int): Upper bound on the total size of cached files.
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups that found no entry.
+
+    """
+
+    SUFFIX = ".arrow"
+
+    def __init__(self, directory: str, max_bytes: int):
+        """Initialize the cache and create its directory if needed.
+
+        Args:
+            directory (str): Directory holding the cached files.
+            max_bytes (int): Upper bound on the total size of cached files.
+
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, cfg):
+        """Build a cache from the ``CACHE`` configuration section.
+
+        Args:
+            cfg (dynaconf.Dynaconf): Configuration object. Optional keys:
+                - CACHE.ENABLED: Whether the cache is used (default true)
+                - CACHE.DIRECTORY: Cache directory (default '.cache/workbooks')
+                - CACHE.MAX_BYTES: Size bound in bytes (default 2 GiB)
+
+        Returns:
+            Optional[WorkbookCache]: The cache, or None when it is disabled.
+
+        """
+        cache_cfg = cfg.get("CACHE", {})
+        if not cache_cfg.get("ENABLED", True):
+            return None
+        return cls(
+            directory=cache_cfg.get("DIRECTORY", ".cache/workbooks"),
+            max_bytes=int(cache_cfg.get("MAX_BYTES", 2 * 1024 ** 3)),
+        )
+
+    @staticmethod
+    def content_hash(file_path: str, block_size: int = 1 << 20) -> str:
+        """Compute the SHA-256 hex digest of a file's content.
+
+        Args:
+            file_path (str): File to hash.
+            block_size (int, optional): Bytes read per block. Defaults to 1 MiB.
+
+        Returns:
+            str: Hex digest of the file content.
+
+        """
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as handle:
+            for block in iter(lambda: handle.read(block_size), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}{self.SUFFIX}")
+
+    def get(self, key: str):
+        """Load a cached DataFrame, memory-mapping the Arrow file.
+
+        Args:
+            key (str): Cache key, usually derived from the content hash.
+
+        Returns:
+            Optional[pandas.DataFrame]: The cached DataFrame, or None on a miss.
+
+        """
+        path = self._path(key)
+        try:
+            df = feather.read_feather(path, memory_map=True)
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return df
+
+    def put(self, key: str, df) -> bool:
+        """Store a DataFrame and evict least recently used entries over budget.
+
+        Frames that Arrow cannot represent (e.g. columns mixing numbers and
+        text) are not cached.
+
+        Args:
+            key (str): Cache key, usually derived from the content hash.
+            df (pandas.DataFrame): Parsed and cleaned DataFrame to store.
+
+        Returns:
+            bool: True if the entry was written.
+
+        """
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            feather.write_feather(df, temp_path, compression="uncompressed")
+        except (pa.ArrowException, ValueError, TypeError):
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            return False
+        os.replace(temp_path, path)
+        self.evict()
+        return True
+
+    def writer(self, key: str):
+        """Start writing an entry one chunk at a time, e.g. while streaming a file.
+
+        Args:
+            key (str): Cache key, usually derived from the content hash.
+
+        Returns:
+            CacheEntryWriter: Writer whose ``commit`` publishes the entry.
+
+        """
+        return CacheEntryWriter(self, key)
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits ``max_bytes``."""
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.name.endswith(self.SUFFIX):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def stats(self):
+        """Return hit/miss counters of this cache instance.
+
+        Returns:
+            Dict[str, float]: ``hits``, ``misses`` and ``hit_rate``.
+
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class CacheEntryWriter:
+    """Writes one cache entry chunk by chunk, so streamed loads are cached too.
+
+    Chunks are appended as record batches to a temporary Arrow IPC file,
+    which is the Feather v2 format ``WorkbookCache.get`` reads. Every chunk
+    is cast to the schema of the first; a chunk that cannot be, or that Arrow
+    cannot represent, abandons the entry. Nothing is visible to readers
+    until ``commit``.
+
+    Attributes:
+        failed (bool): True once the entry has been abandoned.
+
+    """
+
+    def __init__(self, cache: WorkbookCache, key: str):
+        """Initialize the writer; the file is created with the first chunk.
+
+        Args:
+            cache (WorkbookCache): Cache the entry belongs to.
+            key (str): Cache key of the entry.
+
+        """
+        self.cache = cache
+        self.failed = False
+        self._path = cache._path(key)
+        self._temp_path = f"{self._path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self._schema = None
+        self._writer = None
+
+    def write(self, df):
+        """Append a chunk to the entry.
+
+        Args:
+            df (pandas.DataFrame): Next chunk, with the columns of the first.
+
+        """
+        if self.failed:
+            return
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._schema = table.schema
+                self._writer = pa.ipc.new_file(self._temp_path, self._schema)
+            else:
+                table = table.cast(self._schema)
+            self._writer.write_table(table)
+        except (pa.ArrowException, ValueError, TypeError):
+            self.abort()
+
+    def commit(self) -> bool:
+        """Publish the entry and evict least recently used entries over budget.
+
+        Returns:
+            bool: True if the entry was written.
+
+        """
+        if self.failed or self._writer is None:
+            self.abort()
+            return False
+        self._writer.close()
+        self._writer = None
+        os.replace(self._temp_path, self._path)
+        self.cache.evict()
+        return True
+
+    def abort(self):
+        """Abandon the entry and delete its temporary file."""
+        self.failed = True
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except (pa.ArrowException, OSError):
+                pass
+            self._writer = None
+        if os.path.exists(self._temp_path):
+            os.unlink(self._temp_path)
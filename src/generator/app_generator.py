@@ -2,19 +2,41 @@
 Azure OpenAI generator module for Excel Query Bot.
 
 Classes:
-    AppGenerator: Azure OpenAI wrapper with retry logic for robust AI interactions.
+    StreamInterruptedError: A streamed response failed after some of it was delivered.
+    AppGenerator: Azure OpenAI wrapper with shared scheduling and retries for robust AI interactions.
 """
 
 from __future__ import annotations
+import asyncio
+import hashlib
+import json
+from typing import Any, Optional
 from src.generator.base_generator import AbstractGenrator
 from langchain_community.chat_models.azure_openai import AzureChatOpenAI
-from tenacity import retry, stop_after_attempt, wait_random_exponential
 from openai import BadRequestError
+from src.core.event_loop import run_sync
+
+
+class StreamInterruptedError(RuntimeError):
+    """A streamed response failed after some of it was delivered.
+
+    The scheduler does not retry it: the delivered chunks already reached the
+    caller and its callbacks, so a new attempt would repeat them.
+    """
 
 
 class AppGenerator(AbstractGenrator, AzureChatOpenAI):
     """
-    Azure OpenAI wrapper with retry logic for robust interactions.
+    Azure OpenAI wrapper with shared scheduling and retries for robust interactions.
+
+    When a scheduler is given, every model call (single-shot and agent, plain
+    and streamed) is admitted by it: rate limits, concurrency, priority,
+    retries and coalescing of identical in-flight prompts are then shared by
+    all sessions using this generator, and the OpenAI client's own retries
+    are turned off. Callers that join another caller's streamed request get
+    its tokens once that request completes. A streamed call is only retried
+    when it fails before its first chunk; later failures raise
+    ``StreamInterruptedError``.
 
     Attributes:
         azure_endpoint (str): Azure OpenAI service endpoint URL.
@@ -23,9 +45,12 @@ class AppGenerator(AbstractGenrator, AzureChatOpenAI):
         openai_api_version (str): API version for Azure OpenAI service.
         temperature (float): Sampling temperature controlling response randomness (0.0–1.0).
         max_tokens (int): Maximum number of tokens in generated responses.
+        scheduler (Optional[LlmScheduler]): Shared scheduler admitting every call.
     """
 
-    def __init__(self: AppGenerator, cfg) -> None:
+    scheduler: Optional[Any] = None
+
+    def __init__(self: AppGenerator, cfg, scheduler=None) -> None:
         """
         Initialize the Azure OpenAI generator with configuration settings.
 
@@ -38,6 +63,10 @@ class AppGenerator(AbstractGenrator, AzureChatOpenAI):
                     - GENERATOR.OPENAI_API_VERSION (str)
                     - GENERATOR.TEMPERATURE (float)
                     - GENERATOR.MAX_TOKENS (int)
+                    - GENERATOR.STREAMING (bool, optional): Stream tokens to
+                      callback handlers. Defaults to True.
+            scheduler (LlmScheduler, optional): Shared scheduler admitting,
+                retrying and coalescing every call.
 
         """
         azure_endpoint: str = cfg["GENERATOR"]["AZURE_ENDPOINT"]
@@ -46,6 +75,7 @@ class AppGenerator(AbstractGenrator, AzureChatOpenAI):
         openai_api_version: str = cfg["GENERATOR"]["OPENAI_API_VERSION"]
         temperature: float = cfg["GENERATOR"]["TEMPERATURE"]
         max_tokens: int = cfg["GENERATOR"]["MAX_TOKENS"]
+        streaming: bool = cfg["GENERATOR"].get("STREAMING", True)
 
         super().__init__(
             azure_endpoint=azure_endpoint,
@@ -54,12 +84,131 @@ class AppGenerator(AbstractGenrator, AzureChatOpenAI):
             openai_api_version=openai_api_version,
             temperature=temperature,
             max_tokens=max_tokens,
+            streaming=streaming,
+            scheduler=scheduler,
+            # Retries are the scheduler's job, so all sessions back off together.
+            **({"max_retries": 0} if scheduler is not None else {}),
+        )
+
+    def _schedule_key(self: AppGenerator, kind: str, messages, stop, kwargs) -> str:
+        """Identity of a request: same key, same upstream response.
+
+        ``kind`` ("generate" or "stream") keeps plain and streamed calls
+        apart, since they return different results (a ``ChatResult`` or a
+        list of chunks) and cannot join each other.
+        """
+        payload = json.dumps(
+            [
+                kind,
+                self.deployment_name,
+                self.temperature,
+                self.max_tokens,
+                [(message.type, message.content) for message in messages],
+                stop,
+                kwargs,
+            ],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _schedule_tokens(self: AppGenerator, messages) -> int:
+        """Tokens a request counts against the quota: ~4 characters per prompt token plus ``max_tokens``."""
+        return sum(len(str(message.content)) for message in messages) // 4 + (self.max_tokens or 0)
+
+    def _generate(self: AppGenerator, messages, stop=None, run_manager=None, **kwargs):
+        if self.scheduler is None or self.scheduler.is_scheduled():
+            return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        return run_sync(self.scheduler.run(
+            self._schedule_key("generate", messages, stop, kwargs),
+            self._schedule_tokens(messages),
+            lambda: asyncio.to_thread(super(AppGenerator, self)._generate, messages, stop, run_manager, **kwargs),
+        ))
+
+    async def _agenerate(self: AppGenerator, messages, stop=None, run_manager=None, **kwargs):
+        if self.scheduler is None or self.scheduler.is_scheduled():
+            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        return await self.scheduler.run(
+            self._schedule_key("generate", messages, stop, kwargs),
+            self._schedule_tokens(messages),
+            lambda: super(AppGenerator, self)._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs),
         )
 
-    @retry(wait=wait_random_exponential(min=1, max=60), stop=stop_after_attempt(10))
+    async def _astream(self: AppGenerator, messages, stop=None, run_manager=None, **kwargs):
+        if self.scheduler is None or self.scheduler.is_scheduled():
+            async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
+            return
+
+        # The upstream stream runs as the scheduler's call; its chunks are
+        # relayed through a queue so this caller still streams them live.
+        chunks = asyncio.Queue()
+
+        async def call():
+            received = []
+            try:
+                async for chunk in super(AppGenerator, self)._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    received.append(chunk)
+                    chunks.put_nowait(chunk)
+            except Exception as error:
+                if received:
+                    # A retry would relay the delivered prefix a second time.
+                    raise StreamInterruptedError(
+                        f"Response stream failed after {len(received)} chunks: {type(error).__name__}: {error}"
+                    ) from error
+                raise
+            return received
+
+        request = asyncio.ensure_future(self.scheduler.run(
+            self._schedule_key("stream", messages, stop, kwargs),
+            self._schedule_tokens(messages),
+            call,
+        ))
+        relayed = 0
+        try:
+            while not request.done():
+                next_chunk = asyncio.ensure_future(chunks.get())
+                await asyncio.wait({request, next_chunk}, return_when=asyncio.FIRST_COMPLETED)
+                if next_chunk.done():
+                    relayed += 1
+                    yield next_chunk.result()
+                else:
+                    next_chunk.cancel()
+            while not chunks.empty():
+                relayed += 1
+                yield chunks.get_nowait()
+            received = request.result()
+        finally:
+            request.cancel()
+        # Joined another caller's request: replay its chunks.
+        for chunk in received[relayed:]:
+            if run_manager is not None:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
     def generate_response(self: AppGenerator, input_text: str) -> str:
         """
-        Generate a response using Azure OpenAI with retry logic.
+        Generate a response using Azure OpenAI.
+
+        Thin synchronous wrapper around ``agenerate_response`` that runs it on
+        the shared background event loop.
+
+        Args:
+            input_text (str): Prompt text to send to the model. Must not be None or empty.
+
+        Returns:
+            str: The generated response content, or None if a BadRequestError occurs
+                 (e.g., due to prompt filtering or validation failure).
+
+        """
+        return run_sync(self.agenerate_response(input_text))
+
+    async def agenerate_response(self: AppGenerator, input_text: str) -> str:
+        """
+        Generate a response asynchronously using Azure OpenAI.
+
+        Rate limits and transient errors are retried by the scheduler (or by
+        the OpenAI client when no scheduler is configured).
 
         Args:
             input_text (str): Prompt text to send to the model. Must not be None or empty.
@@ -73,7 +222,7 @@ class AppGenerator(AbstractGenrator, AzureChatOpenAI):
             if not input_text:
                 raise ValueError("Input text cannot be None or empty.")
 
-            response = self.invoke(input_text)
+            response = await self.ainvoke(input_text)
             return response.content
 
         except BadRequestError:
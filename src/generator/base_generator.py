@@ -6,6 +6,7 @@ Classes:
 
 from __future__ import annotations
 
+import asyncio
 from abc import ABC, abstractmethod
 
 
@@ -37,3 +38,19 @@ class AbstractGenrator(ABC):
                 The format and content depend on the specific implementation.
 
         """
+
+    async def agenerate_response(self: AbstractGenrator, input_text: str) -> str:
+        """Asynchronously generate a response for the given input text.
+
+        The default implementation runs ``generate_response`` in a worker
+        thread; implementations backed by an async client should override it.
+
+        Args:
+            input_text (str): The input text prompt for which a response needs
+                to be generated. Should not be None or empty.
+
+        Returns:
+            str: The generated response text for the given input prompt.
+
+        """
+        return await asyncio.to_thread(self.generate_response, input_text)
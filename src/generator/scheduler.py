@@ -0,0 +1,339 @@
+"""Client-side language model scheduler module for Excel Query Bot.
+
+Classes:
+    LlmScheduler: Shared rate limiter, concurrency pool and request coalescer
+        in front of the language model.
+
+Attributes:
+    llm_priority (ContextVar[str]): Priority class of the calls made in the
+        current context, 'interactive' (default) or 'batch'.
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from src.core.tracing import record_span
+
+llm_priority = ContextVar("llm_priority", default="interactive")
+
+# Set inside a scheduled call, so nested model methods (e.g. ``_agenerate``
+# delegating to ``_astream``) are not scheduled twice.
+_scheduled = ContextVar("llm_scheduled", default=False)
+
+_PRIORITIES = {"interactive": 0, "batch": 1}
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+_RETRYABLE_ERRORS = {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError"}
+
+
+def _retry_after(error):
+    """Seconds the server asked to wait, None when it did not say."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        try:
+            return float(headers[header]) * scale
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+
+class _InFlight:
+    """An upstream call and the number of callers waiting for it."""
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class LlmScheduler:
+    """Shared rate limiter, concurrency pool and request coalescer in front of the language model.
+
+    Every model call of the process goes through one scheduler:
+
+    - Admission: a call starts only when a concurrency slot is free and two
+      token buckets, one of requests and one of tokens per minute, hold its
+      cost. Buckets refill continuously and hold ``burst_seconds`` of
+      budget, so the deployment quota is spread over the minute instead of
+      being spent in a burst that Azure answers with 429s.
+    - Priority: waiting calls are admitted interactive first, then batch, in
+      arrival order within a class. Batch calls hold at most
+      ``batch_concurrency`` slots, so interactive questions always find one.
+    - Coalescing: a call whose key matches a call already in flight waits
+      for that call's result instead of sending a second identical request.
+    - Retries: rate-limit and transient errors are retried here, up to
+      ``max_retries`` times with capped, jittered backoff. A 429 pauses all
+      admissions for the time the server asked for, so every session backs
+      off together instead of each retrying on its own schedule.
+
+    The scheduler may be used from several event loops; coalescing only
+    joins calls made on the same loop.
+
+    Attributes:
+        requests_per_minute (float): Request budget (0 disables the limit).
+        tokens_per_minute (float): Token budget (0 disables the limit).
+        burst_seconds (float): Seconds of budget each bucket can hold.
+        max_concurrency (int): Maximum calls in flight.
+        batch_concurrency (int): Maximum batch calls in flight.
+        max_retries (int): Retries of a failed call.
+        max_backoff_seconds (float): Longest wait between retries.
+        coalesce (bool): Whether identical in-flight calls are merged.
+        coalesced (int): Number of calls answered by another call's request.
+        retried (int): Number of retried upstream requests.
+
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        burst_seconds: float = 10,
+        max_concurrency: int = 8,
+        batch_concurrency: int = None,
+        max_retries: int = 5,
+        max_backoff_seconds: float = 30,
+        coalesce: bool = True,
+    ):
+        """Initialize the scheduler with full buckets.
+
+        Args:
+            requests_per_minute (float, optional): Request budget, 0 for none.
+            tokens_per_minute (float, optional): Token budget, 0 for none.
+            burst_seconds (float, optional): Seconds of budget each bucket can hold.
+            max_concurrency (int, optional): Maximum calls in flight.
+            batch_concurrency (int, optional): Maximum batch calls in flight.
+                Defaults to half of ``max_concurrency``.
+            max_retries (int, optional): Retries of a failed call.
+            max_backoff_seconds (float, optional): Longest wait between retries.
+            coalesce (bool, optional): Merge identical in-flight calls.
+
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.burst_seconds = burst_seconds
+        self.max_concurrency = max(1, max_concurrency)
+        self.batch_concurrency = max(1, batch_concurrency or self.max_concurrency // 2)
+        self.max_retries = max_retries
+        self.max_backoff_seconds = max_backoff_seconds
+        self.coalesce = coalesce
+        self.coalesced = 0
+        self.retried = 0
+
+        self._lock = threading.Lock()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._active = [0] * len(_PRIORITIES)
+        self._request_tokens = self._request_capacity
+        self._token_tokens = self._token_capacity
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0
+        self._wakeup = None
+        self._inflight = {}
+
+    @classmethod
+    def from_config(cls, cfg):
+        """Build a scheduler from the ``LLM_SCHEDULER`` configuration section.
+
+        Args:
+            cfg (dynaconf.Dynaconf): Configuration object. Optional keys:
+                - LLM_SCHEDULER.ENABLED (default true)
+                - LLM_SCHEDULER.REQUESTS_PER_MINUTE (default 0, unlimited)
+                - LLM_SCHEDULER.TOKENS_PER_MINUTE (default 0, unlimited)
+                - LLM_SCHEDULER.BURST_SECONDS (default 10)
+                - LLM_SCHEDULER.MAX_CONCURRENCY (default 8)
+                - LLM_SCHEDULER.BATCH_CONCURRENCY (default half of MAX_CONCURRENCY)
+                - LLM_SCHEDULER.MAX_RETRIES (default 5)
+                - LLM_SCHEDULER.MAX_BACKOFF_SECONDS (default 30)
+                - LLM_SCHEDULER.COALESCE (default true)
+
+        Returns:
+            Optional[LlmScheduler]: The scheduler, or None when it is disabled.
+
+        """
+        scheduler_cfg = cfg.get("LLM_SCHEDULER", {})
+        if not scheduler_cfg.get("ENABLED", True):
+            return None
+        return cls(
+            requests_per_minute=float(scheduler_cfg.get("REQUESTS_PER_MINUTE", 0)),
+            tokens_per_minute=float(scheduler_cfg.get("TOKENS_PER_MINUTE", 0)),
+            burst_seconds=float(scheduler_cfg.get("BURST_SECONDS", 10)),
+            max_concurrency=int(scheduler_cfg.get("MAX_CONCURRENCY", 8)),
+            batch_concurrency=int(scheduler_cfg.get("BATCH_CONCURRENCY", 0)) or None,
+            max_retries=int(scheduler_cfg.get("MAX_RETRIES", 5)),
+            max_backoff_seconds=float(scheduler_cfg.get("MAX_BACKOFF_SECONDS", 30)),
+            coalesce=bool(scheduler_cfg.get("COALESCE", True)),
+        )
+
+    @property
+    def _request_capacity(self) -> float:
+        return max(1.0, self.requests_per_minute / 60 * self.burst_seconds) if self.requests_per_minute else 0.0
+
+    @property
+    def _token_capacity(self) -> float:
+        return self.tokens_per_minute / 60 * self.burst_seconds if self.tokens_per_minute else 0.0
+
+    @staticmethod
+    def is_scheduled() -> bool:
+        """Whether the current context is already inside a scheduled call."""
+        return _scheduled.get()
+
+    async def run(self, key, tokens: int, call):
+        """Run a model call once it is admitted, sharing it with identical callers.
+
+        Args:
+            key (Optional[str]): Identity of the request; calls with the same
+                key in flight at the same time share one upstream request.
+                None disables coalescing for this call.
+            tokens (int): Estimated tokens the request counts against the quota.
+            call (Callable[[], Awaitable[Any]]): Starts the upstream request.
+
+        Returns:
+            Any: The call's result.
+
+        """
+        loop = asyncio.get_running_loop()
+        key = (loop, key) if self.coalesce and key is not None else None
+        entry = self._inflight.get(key) if key is not None else None
+        if entry is None:
+            entry = _InFlight(asyncio.ensure_future(self._execute(tokens, call)))
+            if key is not None:
+                self._inflight[key] = entry
+                entry.task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        entry.waiters += 1
+        try:
+            return await asyncio.shield(entry.task)
+        finally:
+            entry.waiters -= 1
+            if not entry.waiters and not entry.task.done():
+                # Nobody waits for the answer any more.
+                entry.task.cancel()
+
+    async def _execute(self, tokens: int, call):
+        """Admit, run and retry one upstream request."""
+        _scheduled.set(True)
+        rank = _PRIORITIES.get(llm_priority.get(), 0)
+        for attempt in range(self.max_retries + 1):
+            queued = time.perf_counter()
+            await self._acquire(rank, tokens)
+            waited = time.perf_counter() - queued
+            if waited > 0.001:
+                record_span("llm.wait", waited, priority=llm_priority.get(), attempt=attempt)
+            try:
+                return await call()
+            except Exception as error:
+                delay = self._backoff(error, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self._release(rank)
+            self.retried += 1
+            await asyncio.sleep(delay)
+
+    def _backoff(self, error, attempt: int):
+        """Seconds to wait before retrying after ``error``, None if it must not be retried."""
+        status = getattr(error, "status_code", None)
+        name = type(error).__name__
+        if attempt == self.max_retries or (status not in _RETRYABLE_STATUS and name not in _RETRYABLE_ERRORS):
+            return None
+        delay = _retry_after(error)
+        if delay is None:
+            delay = random.uniform(0, min(self.max_backoff_seconds, 2 ** attempt))
+        if status == 429 or name == "RateLimitError":
+            # Hold back every caller, not just this one; admission waits out the pause.
+            self._pause(delay)
+            return 0.0
+        return delay
+
+    async def _acquire(self, rank: int, tokens: int):
+        """Wait until a call of priority ``rank`` and cost ``tokens`` is admitted."""
+        waiter = asyncio.get_running_loop().create_future()
+        with self._lock:
+            heapq.heappush(self._queue, (rank, next(self._sequence), tokens, waiter))
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.done() and not waiter.cancelled()
+            if granted:
+                self._release(rank)
+            raise
+
+    def _release(self, rank: int):
+        """Free the slot of a finished call and admit waiting calls."""
+        with self._lock:
+            self._active[rank] -= 1
+        self._dispatch()
+
+    def _pause(self, seconds: float):
+        """Stop admitting calls for ``seconds``."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _refill(self, now: float):
+        elapsed, self._refilled = now - self._refilled, now
+        if self.requests_per_minute:
+            self._request_tokens = min(self._request_capacity, self._request_tokens + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._token_tokens = min(self._token_capacity, self._token_tokens + elapsed * self.tokens_per_minute / 60)
+
+    def _delay(self, now: float, tokens: float) -> float:
+        """Seconds until the buckets and any pause allow a call of ``tokens``."""
+        delay = self._paused_until - now
+        if self.requests_per_minute and self._request_tokens < 1:
+            delay = max(delay, (1 - self._request_tokens) * 60 / self.requests_per_minute)
+        if self.tokens_per_minute and self._token_tokens < tokens:
+            delay = max(delay, (tokens - self._token_tokens) * 60 / self.tokens_per_minute)
+        return delay
+
+    def _dispatch(self):
+        """Admit waiting calls in priority order while slots and budget allow."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            while self._queue:
+                rank, _, tokens, waiter = self._queue[0]
+                if waiter.done():
+                    heapq.heappop(self._queue)
+                    continue
+                if sum(self._active) >= self.max_concurrency or (rank and self._active[rank] >= self.batch_concurrency):
+                    return
+                # A call larger than the bucket would never fit; let it drain the bucket instead.
+                tokens = min(tokens, self._token_capacity)
+                delay = self._delay(now, tokens)
+                if delay > 0:
+                    self._schedule_wakeup(waiter.get_loop(), now + delay)
+                    return
+                heapq.heappop(self._queue)
+                self._request_tokens -= 1
+                self._token_tokens -= tokens
+                self._active[rank] += 1
+                waiter.get_loop().call_soon_threadsafe(self._grant, waiter, rank)
+
+    def _grant(self, waiter, rank: int):
+        """Wake an admitted caller on its loop, or give the slot back if it left."""
+        if waiter.done():
+            self._release(rank)
+        else:
+            waiter.set_result(None)
+
+    def _schedule_wakeup(self, loop, when: float):
+        """Run ``_dispatch`` again at monotonic time ``when``; caller holds the lock."""
+        if self._wakeup is not None and self._wakeup[0] <= when:
+            return
+        if self._wakeup is not None:
+            self._wakeup[1].cancel()
+        timer = threading.Timer(when - time.monotonic(), self._on_wakeup)
+        timer.daemon = True
+        self._wakeup = (when, timer)
+        timer.start()
+
+    def _on_wakeup(self):
+        with self._lock:
+            self._wakeup = None
+        self._dispatch()
@@ -0,0 +1,63 @@
+"""A streamed call is retried only until its first chunk has been delivered."""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain_community")
+pytest.importorskip("openai")
+
+from langchain_community.chat_models.azure_openai import AzureChatOpenAI
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGenerationChunk
+
+from src.generator.app_generator import AppGenerator, StreamInterruptedError
+from src.generator.scheduler import LlmScheduler
+
+CFG = {
+    "GENERATOR": {
+        "AZURE_ENDPOINT": "https://example.openai.azure.com",
+        "AZURE_DEPLOYMENT": "deployment",
+        "OPENAI_API_VERSION": "2024-02-01",
+        "TEMPERATURE": 0,
+        "MAX_TOKENS": 16,
+    },
+    "AZURE": {"AZURE_GENERATOR_KEY": "key"},
+}
+
+
+class RateLimitError(Exception):
+    """Named like the OpenAI error the scheduler retries."""
+
+
+def _stream(monkeypatch, fail_after):
+    """Replace the upstream stream with one that fails once after ``fail_after`` chunks."""
+    attempts = []
+
+    async def upstream(self, messages, stop=None, run_manager=None, **kwargs):
+        attempts.append(None)
+        for text in ("a", "b"):
+            if len(attempts) == 1 and text == "ab"[fail_after]:
+                raise RateLimitError()
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+
+    monkeypatch.setattr(AzureChatOpenAI, "_astream", upstream)
+    generator = AppGenerator(CFG, scheduler=LlmScheduler(max_backoff_seconds=0))
+
+    async def collect():
+        return [chunk.text async for chunk in generator._astream([HumanMessage(content="question")])]
+
+    return attempts, collect
+
+
+def test_stream_failing_before_the_first_chunk_is_retried(monkeypatch):
+    attempts, collect = _stream(monkeypatch, fail_after=0)
+    assert asyncio.run(collect()) == ["a", "b"]
+    assert len(attempts) == 2
+
+
+def test_stream_failing_after_the_first_chunk_is_not_retried(monkeypatch):
+    attempts, collect = _stream(monkeypatch, fail_after=1)
+    with pytest.raises(StreamInterruptedError):
+        asyncio.run(collect())
+    assert len(attempts) == 1
@@ -0,0 +1,117 @@
+"""The scheduler coalesces identical calls, admits interactive calls first and retries transient errors."""
+
+import asyncio
+
+import pytest
+
+from src.generator.scheduler import LlmScheduler, llm_priority
+
+
+class RateLimitError(Exception):
+    """Named like the OpenAI error the scheduler retries."""
+
+
+class ServerError(Exception):
+    status_code = 503
+
+
+def test_identical_calls_in_flight_share_one_request():
+    scheduler = LlmScheduler()
+    calls = []
+
+    async def call():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(scheduler.run("key", 1, call) for _ in range(3)))
+
+    assert asyncio.run(main()) == ["answer"] * 3
+    assert len(calls) == 1
+    assert scheduler.coalesced == 2
+
+
+@pytest.mark.parametrize("keys, coalesce", [
+    (["a", "b"], True),
+    ([None, None], True),
+    (["a", "a"], False),
+])
+def test_calls_are_not_shared_across_keys_or_when_disabled(keys, coalesce):
+    scheduler = LlmScheduler(coalesce=coalesce)
+    calls = []
+
+    async def call():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(scheduler.run(key, 1, call) for key in keys))
+
+    asyncio.run(main())
+    assert len(calls) == 2
+    assert scheduler.coalesced == 0
+
+
+def test_waiting_interactive_calls_are_admitted_before_batch_calls():
+    scheduler = LlmScheduler(max_concurrency=1)
+    order = []
+
+    async def submit(name, priority, release=None):
+        llm_priority.set(priority)
+
+        async def call():
+            order.append(name)
+            if release is not None:
+                await release.wait()
+
+        await scheduler.run(None, 1, call)
+
+    async def main():
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(submit("holder", "interactive", release))
+        await asyncio.sleep(0.01)
+        queued = [
+            asyncio.ensure_future(submit("batch", "batch")),
+            asyncio.ensure_future(submit("interactive", "interactive")),
+        ]
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(holder, *queued)
+
+    asyncio.run(main())
+    assert order == ["holder", "interactive", "batch"]
+
+
+@pytest.mark.parametrize("error", [RateLimitError(), ServerError()])
+def test_transient_errors_are_retried(error):
+    scheduler = LlmScheduler(max_backoff_seconds=0)
+    attempts = []
+
+    async def call():
+        attempts.append(None)
+        if len(attempts) < 3:
+            raise error
+        return "answer"
+
+    assert asyncio.run(scheduler.run(None, 1, call)) == "answer"
+    assert len(attempts) == 3
+    assert scheduler.retried == 2
+
+
+def test_other_errors_and_exhausted_retries_are_raised():
+    scheduler = LlmScheduler(max_retries=2, max_backoff_seconds=0)
+    attempts = []
+
+    async def fail(error):
+        attempts.append(None)
+        raise error
+
+    with pytest.raises(ValueError):
+        asyncio.run(scheduler.run(None, 1, lambda: fail(ValueError())))
+    assert len(attempts) == 1
+
+    attempts.clear()
+    with pytest.raises(ServerError):
+        asyncio.run(scheduler.run(None, 1, lambda: fail(ServerError())))
+    assert len(attempts) == 3
@@ -0,0 +1,74 @@
+"""Queries may only read the tables of the session that runs them."""
+
+from contextvars import copy_context
+
+import pytest
+
+from src.agents.sql_validator import SqlValidationError, referenced_tables
+
+SESSION_TABLE = "excel_data_0123456789abcdef"
+OTHER_TABLE = "excel_data_fedcba9876543210"
+
+
+@pytest.mark.parametrize("query", [
+    f"SELECT * FROM {OTHER_TABLE}",
+    f"SELECT * FROM {SESSION_TABLE} JOIN {OTHER_TABLE} ON TRUE",
+    f"WITH {OTHER_TABLE} AS (SELECT * FROM {OTHER_TABLE}) SELECT * FROM {OTHER_TABLE}",
+    f"WITH a AS (SELECT * FROM b), b AS (SELECT * FROM {SESSION_TABLE}) SELECT * FROM a",
+    f"SELECT * FROM ONLY {OTHER_TABLE}",
+    f"SELECT * FROM {SESSION_TABLE} JOIN ONLY {OTHER_TABLE} ON TRUE",
+    f"TABLE {OTHER_TABLE}",
+    f"SELECT * FROM {SESSION_TABLE} UNION TABLE {OTHER_TABLE}",
+    f"SELECT * FROM ({OTHER_TABLE} CROSS JOIN {SESSION_TABLE})",
+    f"SELECT * FROM {SESSION_TABLE} s JOIN {SESSION_TABLE} t ON s.id = t.id, {OTHER_TABLE}",
+    f"SELECT * FROM {SESSION_TABLE} JOIN ({SESSION_TABLE} a JOIN {OTHER_TABLE} b ON a.id = b.id) ON TRUE",
+    f"SELECT * FROM (SELECT * FROM {SESSION_TABLE}) s, {OTHER_TABLE}",
+])
+def test_referenced_tables_include_tables_read_through_ctes_and_join_lists(query):
+    assert referenced_tables(query) - {SESSION_TABLE}
+
+
+@pytest.mark.parametrize("query", [
+    f"WITH totals AS (SELECT * FROM {SESSION_TABLE}) SELECT * FROM totals",
+    "WITH RECURSIVE r AS (SELECT 1 AS n UNION ALL SELECT n + 1 FROM r WHERE n < 5) SELECT * FROM r",
+    f"SELECT EXTRACT(YEAR FROM day), COUNT(*) FROM {SESSION_TABLE} GROUP BY 1",
+    f"SELECT * FROM {SESSION_TABLE} a JOIN {SESSION_TABLE} b USING (id) WHERE a.x IN (1, 2)",
+    f"SELECT * FROM {SESSION_TABLE} ORDER BY 1 FETCH FIRST 5 ROWS ONLY",
+])
+def test_referenced_tables_resolve_ctes_in_scope(query):
+    assert referenced_tables(query) <= {SESSION_TABLE}
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT * FROM read_csv_auto('/etc/passwd')",
+    "SELECT * FROM read_parquet('data.parquet')",
+    "SELECT pg_read_file('/etc/passwd')",
+    "SELECT lo_import('/etc/passwd')",
+    f"SELECT * FROM {SESSION_TABLE} WHERE pg_sleep(10) IS NULL",
+    f"SELECT * FROM {SESSION_TABLE}, LATERAL generate_series(1, 10)",
+])
+def test_file_and_table_functions_are_refused(query):
+    with pytest.raises(SqlValidationError):
+        referenced_tables(query)
+
+
+def test_tool_refuses_tables_outside_query_tables():
+    pytest.importorskip("langchain")
+    from src.agents.tools import SqlQueryTool, query_tables
+
+    def check(query):
+        query_tables.set([SESSION_TABLE])
+        SqlQueryTool._check_query(query)
+
+    copy_context().run(check, f"SELECT * FROM {SESSION_TABLE}")
+    for query in (
+        f"SELECT * FROM {OTHER_TABLE}",
+        f"SELECT * FROM ONLY {OTHER_TABLE}",
+        f"TABLE {OTHER_TABLE}",
+        f"SELECT * FROM ({OTHER_TABLE} CROSS JOIN {SESSION_TABLE})",
+        f"DELETE FROM {SESSION_TABLE}",
+        f"WITH {OTHER_TABLE} AS (SELECT * FROM {OTHER_TABLE}) SELECT * FROM {OTHER_TABLE}",
+        "SELECT * FROM read_csv_auto('/etc/passwd')",
+    ):
+        with pytest.raises(SqlValidationError):
+            copy_context().run(check, query)
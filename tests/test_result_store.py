@@ -0,0 +1,74 @@
+"""Results expire after their TTL however recently read, and the least recently used go over budget."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.agents import result_store
+from src.agents.result_store import ResultStore
+
+
+class Frame:
+    """Stands in for a DataFrame of ``size`` bytes."""
+
+    def __init__(self, size):
+        self.size = size
+
+    def memory_usage(self, index, deep):
+        return SimpleNamespace(sum=lambda: self.size)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(result_store, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_expired_results_are_dropped_even_when_recently_read(clock):
+    store = ResultStore(max_bytes=1000, ttl_seconds=10)
+    old = store.put(Frame(100))
+    clock[0] = 5
+    fresh = store.put(Frame(100))
+    clock[0] = 9
+    assert store.get(old) is not None
+
+    clock[0] = 11
+    store.put(Frame(100))
+    assert store.current_bytes == 200
+    assert store.get(old) is None
+    assert store.get(fresh) is not None
+
+
+def test_get_returns_none_after_the_ttl(clock):
+    store = ResultStore(ttl_seconds=10)
+    handle = store.put(Frame(100))
+    clock[0] = 11
+    assert store.get(handle) is None
+    assert store.current_bytes == 0
+
+
+def test_least_recently_used_results_are_evicted_over_budget(clock):
+    store = ResultStore(max_bytes=250, ttl_seconds=10)
+    first = store.put(Frame(100))
+    second = store.put(Frame(100))
+    assert store.get(first) is not None
+
+    third = store.put(Frame(100))
+    assert store.get(second) is None
+    assert store.get(first) is not None
+    assert store.get(third) is not None
+    assert store.current_bytes == 200
+
+
+def test_a_result_over_budget_is_kept_until_the_next_put(clock):
+    store = ResultStore(max_bytes=250, ttl_seconds=10)
+    small = store.put(Frame(100))
+    large = store.put(Frame(1000))
+    assert store.get(small) is None
+    assert store.get(large) is not None
+    assert store.current_bytes == 1000
+
+    store.put(Frame(100))
+    assert store.get(large) is None
+    assert store.current_bytes == 100
@@ -0,0 +1,63 @@
+"""Generated SQL is only executed when it is a single read-only query over loaded tables and columns."""
+
+import pytest
+
+from src.agents.sql_validator import SqlValidationError, check_statement, extract_sql, validate_sql
+
+COLUMNS = {"sales": ["region", "amount", "name", "set", "load"], "regions": ["region", "manager"]}
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT region, SUM(amount) AS total FROM sales GROUP BY region ORDER BY total DESC",
+    "SELECT replace(name, 'a', 'b') AS cleaned FROM sales",
+    "SELECT set, load FROM sales WHERE set > 1",
+    'SELECT s.region AS "update" FROM sales s',
+    "SELECT * FROM sales WHERE name = 'DELETE FROM sales; DROP TABLE sales'",
+    "SELECT r.manager, COUNT(*) AS n FROM sales s JOIN regions r ON s.region = r.region GROUP BY r.manager",
+    "WITH totals AS (SELECT region, SUM(amount) AS total FROM sales GROUP BY region) SELECT * FROM totals",
+    "SELECT region FROM sales ORDER BY amount FETCH FIRST 5 ROWS ONLY;",
+    "SELECT region FROM sales -- ; DROP TABLE sales",
+    "SELECT region /* ; DELETE FROM sales */ FROM sales",
+    'SELECT region AS "a;b" FROM sales',
+])
+def test_read_only_queries_are_accepted(query):
+    assert validate_sql(query, COLUMNS) == query.rstrip(";")
+
+
+@pytest.mark.parametrize("query", [
+    "",
+    "DELETE FROM sales",
+    "/* note */ DELETE FROM sales",
+    "-- note\ndelete from sales",
+    "TABLE sales",
+    "SET search_path = other",
+    "COPY sales TO '/tmp/sales.csv'",
+    "SELECT 1; DROP TABLE sales",
+    "SELECT 1 /* */; DROP TABLE sales",
+    "WITH gone AS (DELETE FROM sales RETURNING *) SELECT * FROM gone",
+    "SELECT * INTO copied FROM sales",
+    "SELECT * FROM sales FOR UPDATE",
+    "SELECT pg_sleep(10)",
+    "SELECT * FROM read_csv_auto('/etc/passwd')",
+])
+def test_statements_other_than_a_single_select_are_refused(query):
+    with pytest.raises(SqlValidationError):
+        check_statement(query)
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT * FROM customers",
+    "SELECT missing_column FROM sales",
+])
+def test_unknown_tables_and_columns_are_refused(query):
+    with pytest.raises(SqlValidationError):
+        validate_sql(query, COLUMNS)
+
+
+@pytest.mark.parametrize("response", [
+    '{"sql": "SELECT 1"}',
+    "```sql\nSELECT 1\n```",
+    "  SELECT 1  ",
+])
+def test_extract_sql(response):
+    assert extract_sql(response) == "SELECT 1"